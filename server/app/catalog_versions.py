@@ -0,0 +1,125 @@
+import secrets
+import threading
+from typing import Callable, Hashable, Iterable
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .cache import ByteLRUCache
+from .config import settings
+from .models import City, Movie, Screen, Show, Theater
+
+# Catalog resource whose version a write to each model bumps
+_RESOURCES = {City: "cities", Movie: "movies", Theater: "theaters", Screen: "screens", Show: "shows"}
+_PENDING_KEY = "catalog_versions_pending"
+
+
+class CatalogVersions:
+    """Per-resource change counters for the catalog, used to build ETags.
+
+    Counters start at 0 in every process, so ETags also carry a random per-process epoch:
+    a tag issued by one worker never matches in another (a miss, never a wrong 304).
+    Writes made in another process are not seen here; see the single-worker note in config.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self.epoch = secrets.token_hex(4)
+
+    def get(self, resource: str) -> int:
+        return self._versions.get(resource, 0)
+
+    def bump(self, *resources: str) -> None:
+        with self._lock:
+            for resource in resources:
+                self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def etag(self, *resources: str, extra: str | None = None) -> str:
+        """Tag for the resources' current versions; `extra` adds what else the body depends on."""
+        parts = [str(self.get(r)) for r in resources] + ([extra] if extra is not None else [])
+        return f'W/"{self.epoch}-{"-".join(parts)}"'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+
+
+catalog_versions = CatalogVersions()
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag == "*" or tag.removeprefix("W/") == opaque
+        for tag in (t.strip() for t in if_none_match.split(","))
+    )
+
+
+def conditional_get(request: Request, response: Response, *resources: str) -> Response | None:
+    """Tag the response with the resources' versions; return a 304 if the client is current.
+
+    Call before querying: if a write lands while the response is built, the tag is older
+    than the data, so the client revalidates next time instead of keeping stale data.
+    """
+    etag = catalog_versions.etag(*resources)
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
+# Final JSON bodies of catalog reads per (route, params), valid for the version tag they
+# were built under; a committed catalog write moves the tag and so invalidates them.
+response_cache = ByteLRUCache(max_bytes=settings.catalog_response_cache_max_bytes)
+
+
+def cached_json_response(
+    request: Request,
+    route: str,
+    params: Hashable,
+    resources: Iterable[str],
+    adapter: TypeAdapter,
+    load: Callable[[], object],
+    tag_extra: str | None = None,
+) -> Response:
+    """Answer a catalog read from cached bytes, or load, validate and encode it once.
+
+    Hits skip the ORM, Pydantic validation and JSON encoding; If-None-Match still gets 304.
+    Bodies that also change without a catalog write (e.g. with the date) pass that in
+    `tag_extra`, so it is part of the ETag as well as the cache key.
+    """
+    etag = catalog_versions.etag(*resources, extra=tag_extra)
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    key = (route, params)
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = adapter.dump_json(adapter.validate_python(load(), from_attributes=True))
+        response_cache.set(key, etag, body)  # Tag read before loading: a racing write just misses next time
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+def _record_change(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(_RESOURCES[type(target)])
+
+
+for _model in _RESOURCES:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _record_change)
+
+
+# Versions move only once the change is committed, so a reader can't be handed a new tag
+# for data it could not see yet. Changes flushed and then rolled back are published with
+# the session's next commit: a spurious bump only costs clients one full response.
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed:
+        catalog_versions.bump(*changed)
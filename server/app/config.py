@@ -17,6 +17,64 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = Field(default=60 * 24)  # 24 hours
     # IMPORTANT: defaults above are convenient for local dev only. Override via env vars in prod.
     # The secret key MUST be set securely (e.g., BMS_JWT_SECRET_KEY) and never left as default.
+    auth_token_cache_ttl_seconds: int = Field(default=300)  # Verified token -> user snapshot; capped by token exp
+    auth_token_cache_max_entries: int = Field(default=50_000)
+    # bcrypt runs in its own process pool and register/login await it, so login bursts hold
+    # no request threadpool threads while hashing
+    password_hash_workers: int = Field(default=2)  # 0 hashes in a thread of the event loop's executor
+    password_hash_max_pending: int = Field(default=64)  # Queued + running hashes before 503s
+    # Login throttling (token buckets per client IP and per email)
+    login_rate_limit_enabled: bool = Field(default=True)
+    login_rate_limit_backend: str = Field(default="memory")  # "memory" (per process) or "sqlite" (shared by local workers)
+    login_rate_limit_sqlite_path: str = Field(default="login_rate_limit.sqlite3")
+    login_ip_per_minute: float = Field(default=30)
+    login_ip_burst: int = Field(default=20)
+    login_email_per_minute: float = Field(default=5)
+    login_email_burst: int = Field(default=5)
+
+    # Seat holds
+    # Holds, seat maps and per-show writer locks live in this process's memory only. With
+    # more than one worker (uvicorn --workers N, several pods) each worker sees only its own
+    # holds and maps, so run a single worker until this state moves to a shared store.
+    # The seat_reservations unique index still prevents double bookings across workers.
+    seat_hold_ttl_seconds: int = Field(default=600)  # How long a seat hold lasts before it expires
+    seat_hold_max_seats: int = Field(default=10)  # Most seats one hold may cover
+    seat_hold_sweep_interval_seconds: float = Field(default=1.0)  # Background expiry tick
+
+    # Per-show seat maps and writer locks kept in memory (least recently used are evicted)
+    seat_map_max_shows: int = Field(default=5_000)
+    show_lock_shards: int = Field(default=16)  # Independent lock-table shards for per-show writer locks
+
+    # GET /shows/{id}/booking_seats/stream (Server-Sent Events)
+    seat_stream_keepalive_seconds: float = Field(default=15.0)  # Idle comment frame interval
+    seat_stream_queue_size: int = Field(default=256)  # Frames a slow client may lag before it is dropped
+
+    # Virtual waiting room for hot on-sales. When enabled, seat selection and checkout
+    # require an admitted X-Admission-Token from POST /shows/{id}/admission.
+    admission_enabled: bool = Field(default=False)
+    admission_scope: str = Field(default="show")  # "show" or "movie": one queue per show or per movie
+    admission_rate_per_second: float = Field(default=20.0)  # Users let in per second, per queue
+    admission_pass_ttl_seconds: int = Field(default=15 * 60)  # How long an admission stays valid
+    admission_max_queue: int = Field(default=200_000)  # Joiners waiting per queue before new ones are turned away
+    admission_max_tickets: int = Field(default=1_000_000)
+
+    # Pending-payment booking sweeper. Off by default: nothing confirms payment yet, so
+    # enabling it expires every booking (and frees its seats) once the TTL passes.
+    pending_booking_sweeper_enabled: bool = Field(default=False)
+    pending_booking_ttl_seconds: int = Field(default=15 * 60)  # Unpaid bookings expire after this
+    pending_booking_sweep_interval_seconds: float = Field(default=30.0)
+    pending_booking_sweep_batch_size: int = Field(default=500)  # Bookings per transaction
+
+    # Idempotency-Key replay store for booking writes
+    idempotency_ttl_seconds: int = Field(default=60 * 60 * 24)
+    idempotency_max_keys: int = Field(default=100_000)
+    search_index_enabled: bool = Field(default=True)  # In-memory trigram index for /search (queries of 3+ chars)
+    theater_grid_cell_degrees: float = Field(default=0.05)  # Nearest-theater grid cell (~5.5 km of latitude)
+    catalog_response_cache_max_bytes: int = Field(default=32 * 1024 * 1024)  # Encoded catalog JSON kept in memory
+
+    # GET /bookings keyset pagination
+    bookings_page_size: int = Field(default=50)
+    bookings_max_page_size: int = Field(default=200)
 
     # Pydantic v2 settings config
     model_config = SettingsConfigDict(
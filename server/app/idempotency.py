@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+
+from .cache import TTLCache
+from .config import settings
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class IdempotencyStore:
+    """Remembers the response of a write per (route, Idempotency-Key) for replay.
+
+    Entries expire after a TTL and the store is LRU-capped. Concurrent requests with the
+    same key are serialized so only the first one reaches the write path. Only successful
+    responses are stored; a failed attempt can be retried with the same key.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._responses = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._in_flight: dict[tuple[str, str], list] = {}  # key -> [lock, waiters]
+        self._guard = threading.Lock()
+
+    def run(
+        self,
+        scope: str,
+        key: str | None,
+        payload: BaseModel,
+        response: Response,
+        out_model: type[ModelT],
+        write: Callable[[], object],
+    ) -> ModelT | object:
+        if not key:
+            return write()
+
+        cache_key = (scope, key)
+        fingerprint = hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+        with self._guard:
+            slot = self._in_flight.setdefault(cache_key, [threading.Lock(), 0])
+            slot[1] += 1
+        with slot[0]:
+            try:
+                cached = self._responses.get(cache_key)
+                if cached is not None:
+                    stored_fingerprint, body = cached
+                    if stored_fingerprint != fingerprint:
+                        raise HTTPException(
+                            status_code=422,  # Same key, different request
+                            detail="Idempotency-Key was already used with a different request body",
+                        )
+                    response.headers["Idempotent-Replayed"] = "true"
+                    return body
+
+                body = out_model.model_validate(write())
+                self._responses.set(cache_key, (fingerprint, body))
+                return body
+            finally:
+                with self._guard:
+                    slot[1] -= 1
+                    if slot[1] == 0:
+                        del self._in_flight[cache_key]
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    def stats(self) -> dict[str, float]:
+        return self._responses.stats()
+
+
+idempotency_store = IdempotencyStore(
+    maxsize=settings.idempotency_max_keys,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+)
@@ -2,7 +2,9 @@ from pydoc import importfile
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .db import Base, engine
+from .db import Base, SessionLocal, engine
+from .migrations import run_startup_migrations
+from .security import password_hash_pool
 from routers import theaters as theaters_router
 from routers import auth as auth_router
 from routers import movies as movies_router
@@ -12,6 +14,11 @@ from routers import screens as screens_router
 from routers import bookings as bookings_router
 from routers import search as search_router
 from routers import theater_memberships as theater_memberships_router
+from routers import admission as admission_router
+from routers import metrics as metrics_router
+from useage.hold_service import start_hold_expiry_worker, stop_hold_expiry_worker
+from useage.booking_service import start_pending_booking_sweeper, stop_pending_booking_sweeper
+from useage.theater_geo_service import warm_theater_grids
 
 app = FastAPI(title="BookMyShow Backend")
 
@@ -22,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],  # Let browser clients read paging/replay headers
 )
 
 @app.on_event("startup")
@@ -29,6 +37,17 @@ def on_startup():
     # Dev convenience: auto-creates tables if missing.
     # Use proper migrations for schema changes in staging/prod.
     Base.metadata.create_all(bind=engine)
+    run_startup_migrations()  # Backfill seat_reservations from legacy JSONB booking_seats rows
+    start_hold_expiry_worker()  # Expires timed seat holds in the background
+    start_pending_booking_sweeper()  # Expires unpaid bookings (when enabled in settings)
+    with SessionLocal() as db:
+        warm_theater_grids(db)  # Nearest-theater grids per city; rebuilt lazily after theater writes
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_hold_expiry_worker()
+    stop_pending_booking_sweeper()
+    password_hash_pool.shutdown()
 
 @app.get("/healthz")
 def healthz():
@@ -44,3 +63,5 @@ app.include_router(screens_router.router)  # Screens by theater
 app.include_router(bookings_router.router)  # Booking APIs and seat holds/status
 app.include_router(search_router.router)  # Unified search across movies/theaters
 app.include_router(theater_memberships_router.router)  # Theater admin memberships
+app.include_router(admission_router.router)  # Waiting room for hot on-sales
+app.include_router(metrics_router.router)  # Lock contention metrics
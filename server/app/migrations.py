@@ -0,0 +1,180 @@
+"""Data migrations that create_all() cannot express.
+
+Run on startup (idempotent) or manually: `python -m app.migrations [backfill|reconcile-seats|now-playing|show-listings]`.
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import inspect, text, update
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, engine
+from .models import Booking, BookingSeat, CityNowPlaying, SeatReservation, Show, ShowListing
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_seat_reservations(db: Session, batch_size: int = 1000) -> int:
+    """Copy legacy JSONB `booking_seats.seat_id` arrays into one-row-per-seat reservations.
+
+    Skips seats that already have a reservation, so it is safe to re-run. When legacy data
+    double-booked a seat, the earliest booking_seats row keeps it and the rest are logged.
+    Returns the number of reservations inserted.
+    """
+    reserved = {
+        (show_id, seat_number)
+        for show_id, seat_number in db.query(SeatReservation.show_id, SeatReservation.seat_number)
+    }
+    inserted = 0
+    last_id = 0
+    migrated: set[tuple[int, int]] = set()
+    while True:
+        rows = (
+            db.query(BookingSeat)
+            .filter(BookingSeat.id > last_id)
+            .order_by(BookingSeat.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            seat_numbers = row.seat_id if isinstance(row.seat_id, list) else []
+            for seat_number in seat_numbers:
+                if not isinstance(seat_number, int) or seat_number <= 0:
+                    continue
+                key = (row.show_id, seat_number)
+                if key in reserved or key in migrated:
+                    if key in migrated:
+                        logger.warning(
+                            "Seat %s of show %s is double-booked in booking_seats; keeping the earliest, skipping booking %s",
+                            seat_number, row.show_id, row.booking_id,
+                        )
+                    continue
+                migrated.add(key)
+                db.add(SeatReservation(show_id=row.show_id, seat_number=seat_number, booking_id=row.booking_id))
+                inserted += 1
+        last_id = rows[-1].id
+        db.commit()  # One transaction per batch keeps locks short on large tables
+    if inserted:
+        logger.info("Backfilled %d seat reservations from booking_seats", inserted)
+    return inserted
+
+
+def needs_seat_reservation_backfill(db: Session) -> bool:
+    """True when legacy booking_seats rows exist but no reservation has been written yet."""
+    return (
+        db.query(BookingSeat.id).first() is not None
+        and db.query(SeatReservation.id).first() is None
+    )
+
+
+# Columns added to existing tables after release: (table, column, DDL type and default)
+_ADDED_COLUMNS = [
+    ("users", "claims_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("theaters", "latitude", "FLOAT"),
+    ("theaters", "longitude", "FLOAT"),
+]
+
+
+def add_missing_columns() -> list[str]:
+    """Add columns that databases created before them lack; returns the ones added."""
+    inspector = inspect(engine)
+    added = []
+    for table, column, ddl in _ADDED_COLUMNS:
+        if column in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        added.append(f"{table}.{column}")
+        logger.info("Added %s.%s", table, column)
+    return added
+
+
+# Stand-in creation time for legacy bookings that have none: they page last, oldest first
+LEGACY_BOOKING_CREATED_AT = datetime(1970, 1, 1)
+
+
+def backfill_booking_created_at(db: Session) -> int:
+    """Fill NULL `bookings.created_at` so keyset cursors always have a value, then enforce NOT NULL.
+
+    Returns the number of bookings backfilled.
+    """
+    result = db.execute(
+        update(Booking).where(Booking.created_at.is_(None)).values(created_at=LEGACY_BOOKING_CREATED_AT)
+    )
+    db.commit()
+    if result.rowcount:
+        logger.info("Backfilled created_at for %d legacy bookings", result.rowcount)
+    created_at = next(c for c in inspect(engine).get_columns("bookings") if c["name"] == "created_at")
+    if created_at["nullable"] and engine.dialect.name == "postgresql":  # SQLite can't alter a column
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE bookings ALTER COLUMN created_at SET NOT NULL"))
+        logger.info("Made bookings.created_at NOT NULL")
+    return result.rowcount
+
+
+def rebuild_now_playing(db: Session) -> None:
+    """Recompute the whole city_now_playing index from show_listings, repairing any drift."""
+    from useage.now_playing_service import rebuild
+
+    rebuild(db.connection())
+    db.commit()
+    logger.info("Rebuilt city_now_playing")
+
+
+def needs_now_playing_backfill(db: Session) -> bool:
+    return db.query(Show.id).first() is not None and db.query(CityNowPlaying.city_id).first() is None
+
+
+def rebuild_show_listings(db: Session) -> None:
+    """Recompute show_listings from shows, screens and theaters, repairing any drift."""
+    from useage.show_listing_service import rebuild
+
+    rebuild(db.connection())
+    db.commit()
+    logger.info("Rebuilt show_listings")
+
+
+def needs_show_listings_backfill(db: Session) -> bool:
+    return db.query(Show.id).first() is not None and db.query(ShowListing.id).first() is None
+
+
+def run_startup_migrations() -> None:
+    add_missing_columns()
+    with SessionLocal() as db:
+        backfill_booking_created_at(db)
+        if needs_seat_reservation_backfill(db):
+            backfill_seat_reservations(db)
+        if needs_show_listings_backfill(db):
+            rebuild_show_listings(db)
+        if needs_now_playing_backfill(db):  # Derived from show_listings, so after them
+            rebuild_now_playing(db)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument(
+        "job",
+        nargs="?",
+        default="backfill",
+        choices=["backfill", "reconcile-seats", "now-playing", "show-listings"],
+        help="backfill: copy legacy booking_seats into seat_reservations; "
+        "reconcile-seats: recompute drifted shows.available_seats counters; "
+        "now-playing: rebuild the city_now_playing index from show_listings; "
+        "show-listings: rebuild the show_listings table",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        if args.job == "backfill":
+            backfill_seat_reservations(db)
+        elif args.job == "now-playing":
+            rebuild_now_playing(db)
+        elif args.job == "show-listings":
+            rebuild_show_listings(db)
+        else:
+            from useage.booking_service import reconcile_available_seats
+
+            reconcile_available_seats(db)
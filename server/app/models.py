@@ -1,14 +1,19 @@
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timezone
 
-from sqlalchemy import String, Text, Date, BigInteger, Integer, ForeignKey, Time, Numeric, Boolean
+from sqlalchemy import String, Text, Date, BigInteger, Integer, Float, ForeignKey, Time, Numeric, Boolean
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.schema import UniqueConstraint
-from sqlalchemy import DateTime, func
+from sqlalchemy.schema import CheckConstraint, Index, UniqueConstraint
+from sqlalchemy import DateTime, func, text
 
 from .db import Base
 
 
+def _utcnow_naive() -> datetime:
+    # Microsecond-precision naive UTC; stored and bound in the same format on every dialect
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(Base):
     __tablename__ = "users"
     __table_args__ = (
@@ -23,6 +28,8 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(Text, nullable=False)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    # Bumped whenever the user's theater memberships change; tokens carry the version they were issued at
+    claims_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -62,6 +69,9 @@ class Theater(Base):
     city_id: Mapped[int] = mapped_column(Integer, ForeignKey("cities.id"), index=True)
     amenities: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # JSONB for arbitrary amenity flags
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # WGS84 degrees; theaters without coordinates are left out of nearest-first ranking
+    latitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    longitude: Mapped[float | None] = mapped_column(Float, nullable=True)
 
 
 class Screen(Base):
@@ -79,6 +89,7 @@ class Show(Base):
     __tablename__ = "shows"
     __table_args__ = (
         UniqueConstraint("screen_id", "show_date", "show_time", name="uq_shows_screen_date_time"),  # Prevent duplicate show slots
+        CheckConstraint("available_seats >= 0", name="ck_shows_available_seats_non_negative"),  # Last line of oversell defence
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
@@ -90,8 +101,59 @@ class Show(Base):
     available_seats: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
+class CityNowPlaying(Base):
+    """Denormalized city -> movie index behind GET /movies/playing.
+
+    One row per movie with at least one show at an active theater in the city, carrying
+    the date of its last show there. Derived from show_listings by useage.now_playing_service.
+    """
+    __tablename__ = "city_now_playing"
+    __table_args__ = (
+        Index("ix_city_now_playing_city_last_show_date", "city_id", "last_show_date"),
+    )
+
+    city_id: Mapped[int] = mapped_column(Integer, ForeignKey("cities.id"), primary_key=True)
+    movie_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("movies.id"), primary_key=True)
+    last_show_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+
+class ShowListing(Base):
+    """Denormalized copy of a show with its city and theater, for showtime queries.
+
+    Same column names as Show (id is the show id) so it serializes as ShowOut. Only shows
+    at active theaters are listed. Maintained by useage.show_listing_service.
+    """
+    __tablename__ = "show_listings"
+    __table_args__ = (
+        # Showtimes page: one range scan per (movie, city, day), already in time order
+        Index("ix_show_listings_movie_city_date_time", "movie_id", "city_id", "show_date", "show_time"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, ForeignKey("shows.id", ondelete="CASCADE"), primary_key=True)
+    movie_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    city_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    theater_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    screen_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    show_date: Mapped[date] = mapped_column(Date, nullable=False)
+    show_time: Mapped[time] = mapped_column(Time, nullable=False)
+    base_price: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
+    available_seats: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id): per-user history and the global listing
+        Index("ix_bookings_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+        # Pending-payment sweeper: only unpaid bookings are indexed, oldest first
+        Index(
+            "ix_bookings_pending_created_at",
+            "created_at",
+            postgresql_where=text("booking_status = 'pending_payment'"),
+            sqlite_where=text("booking_status = 'pending_payment'"),
+        ),
+    )
 
     # Use Integer PK to ensure SQLite autoincrement works correctly
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -102,21 +164,39 @@ class Booking(Base):
     booking_reference: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     final_amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     booking_status: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Set in Python so keyset cursors compare against the exact stored value (SQLite's
+    # CURRENT_TIMESTAMP drops microseconds and uses a different text format). Legacy NULLs
+    # are backfilled on startup; see app.migrations.backfill_booking_created_at
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(), server_default=func.now(), nullable=True
+        DateTime(), default=_utcnow_naive, server_default=func.now(), nullable=False
     )
 
 
 class BookingSeat(Base):
     __tablename__ = "booking_seats"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
+    # Use Integer PK to ensure SQLite autoincrement works correctly
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     booking_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("bookings.id"), index=True)
     show_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("shows.id"), index=True)
     # Storing selected seat ids as an array in JSONB per table design
     seat_id: Mapped[list[int]] = mapped_column(JSONB, nullable=False)  # JSONB array of seat ids per booking
 
 
+class SeatReservation(Base):
+    __tablename__ = "seat_reservations"
+    __table_args__ = (
+        # One row per booked seat; the unique index rejects double-booking and covers seat-status scans
+        UniqueConstraint("show_id", "seat_number", name="uq_seat_reservations_show_seat"),
+    )
+
+    # Use Integer PK to ensure SQLite autoincrement works correctly
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    show_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("shows.id"), nullable=False)
+    seat_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    booking_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookings.id"), index=True, nullable=False)
+
+
 class TheaterUserMembership(Base):
     __tablename__ = "theater_user_memberships"
     __table_args__ = (
@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+from .config import settings
+
+
+class RateLimitedError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+@dataclass(frozen=True)
+class Limit:
+    per_minute: float
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        return 60.0 / self.per_minute
+
+    @property
+    def tolerance(self) -> float:
+        return (self.burst - 1) * self.interval
+
+
+def _admit(tats: list[float], limits: list[Limit], now: float) -> tuple[float, list[float]]:
+    """Token bucket in its GCRA form: each key is one float, the time its bucket is next full.
+
+    Returns (retry_after, new_tats). All buckets are charged or none is.
+    """
+    retry_after = 0.0
+    updated = []
+    for tat, limit in zip(tats, limits):
+        tat = max(tat, now)
+        retry_after = max(retry_after, tat - now - limit.tolerance)
+        updated.append(tat + limit.interval)
+    return retry_after, updated
+
+
+class BucketBackend(Protocol):
+    def take(self, keys: list[str], limits: list[Limit], now: float) -> float:
+        """Charge one token from every key's bucket; return 0, or seconds to wait if any is empty."""
+        ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryBucketBackend:
+    """Buckets for this process only: key -> full-at timestamp.
+
+    A bucket whose full-at time has passed holds no information (it is full), so it is
+    dropped by a sweep that runs at most every `sweep_interval` seconds.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self._lock = threading.Lock()
+        self._tats: dict[str, float] = {}
+        self._sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def take(self, keys: list[str], limits: list[Limit], now: float) -> float:
+        with self._lock:
+            if now >= self._next_sweep:
+                self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+                self._next_sweep = now + self._sweep_interval
+            retry_after, updated = _admit([self._tats.get(k, now) for k in keys], limits, now)
+            if retry_after <= 0:
+                self._tats.update(zip(keys, updated))
+            return retry_after
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tats.clear()
+            self._next_sweep = 0.0
+
+
+class SQLiteBucketBackend:
+    """Buckets in a local SQLite file, shared by every worker process on the host.
+
+    A stand-in for a networked store: each take() is one IMMEDIATE transaction, so
+    concurrent workers see each other's charges.
+    """
+
+    def __init__(self, path: str, sweep_interval: float = 60.0):
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def take(self, keys: list[str], limits: list[Limit], now: float) -> float:
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if now >= self._next_sweep:
+                    cur.execute("DELETE FROM rate_buckets WHERE tat <= ?", (now,))
+                    self._next_sweep = now + self._sweep_interval
+                stored = dict(
+                    cur.execute(
+                        f"SELECT key, tat FROM rate_buckets WHERE key IN ({','.join('?' * len(keys))})", keys
+                    ).fetchall()
+                )
+                retry_after, updated = _admit([stored.get(k, now) for k in keys], limits, now)
+                if retry_after <= 0:
+                    cur.executemany(
+                        "INSERT INTO rate_buckets (key, tat) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                        list(zip(keys, updated)),
+                    )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            return retry_after
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_buckets")
+
+
+class LoginRateLimiter:
+    """Per-IP and per-email login throttling, checked before any DB or bcrypt work."""
+
+    def __init__(self, backend: BucketBackend, per_ip: Limit, per_email: Limit):
+        self.backend = backend
+        self.per_ip = per_ip
+        self.per_email = per_email
+        self.rejected = 0
+
+    def check(self, ip: str | None, email: str, now: float | None = None) -> None:
+        keys, limits = [f"email:{email.strip().lower()}"], [self.per_email]
+        if ip:
+            keys.append(f"ip:{ip}")
+            limits.append(self.per_ip)
+        retry_after = self.backend.take(keys, limits, time.time() if now is None else now)
+        if retry_after > 0:
+            self.rejected += 1
+            raise RateLimitedError("Too many login attempts; try again later", retry_after=int(retry_after) + 1)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.rejected = 0
+
+
+def _backend() -> BucketBackend:
+    if settings.login_rate_limit_backend == "sqlite":
+        return SQLiteBucketBackend(settings.login_rate_limit_sqlite_path)
+    return MemoryBucketBackend()
+
+
+login_rate_limiter = LoginRateLimiter(
+    backend=_backend(),
+    per_ip=Limit(per_minute=settings.login_ip_per_minute, burst=settings.login_ip_burst),
+    per_email=Limit(per_minute=settings.login_email_per_minute, burst=settings.login_email_burst),
+)
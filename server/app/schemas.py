@@ -64,6 +64,9 @@ class TheaterOut(BaseModel):
     city_id: int
     amenities: list[str] | None = None
     is_active: bool
+    latitude: float | None = None
+    longitude: float | None = None
+    distance_km: float | None = None  # Set only when the request gave latitude/longitude
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -77,6 +80,23 @@ class ScreenOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LayoutRowOut(BaseModel):
+    section: str
+    row: int
+    first_seat: int
+    last_seat: int
+    category: str
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ScreenLayoutOut(BaseModel):
+    # Compiled form of layout_config: seats are numbered row-major, 1..capacity
+    screen_id: int
+    capacity: int
+    rows: list[LayoutRowOut]
+    model_config = ConfigDict(from_attributes=True)
+
+
 class ShowOut(BaseModel):
     id: int
     movie_id: int
@@ -88,6 +108,40 @@ class ShowOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ShowtimeOut(BaseModel):
+    id: int
+    show_time: time
+    base_price: float
+    available_seats: int
+    fill_ratio: float  # Share of the screen's seats already taken, 0..1
+    availability: str  # "available" | "filling_fast" | "almost_full" | "sold_out"
+
+
+class ScreenShowtimesOut(BaseModel):
+    screen_id: int
+    name: str
+    screen_type: str | None = None
+    shows: list[ShowtimeOut]
+
+
+class TheaterShowtimesOut(BaseModel):
+    theater_id: int
+    name: str
+    screens: list[ScreenShowtimesOut]
+
+
+class DayShowtimesOut(BaseModel):
+    date: date
+    theaters: list[TheaterShowtimesOut]
+
+
+class ShowtimeMatrixOut(BaseModel):
+    # Every requested day is present, in order, even when it has no shows
+    movie_id: int
+    city_id: int
+    days: list[DayShowtimesOut]
+
+
 class ShowCreate(BaseModel):
     movie_id: int
     screen_id: int
@@ -116,18 +170,48 @@ class BookingOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Checkout: booking + seat reservation in one call
+class CheckoutRequest(BaseModel):
+    show_id: int
+    seat_numbers: list[int]
+    user_id: int
+    hold_id: str | None = None  # Hold being converted, if the seats were held first
+
+
+class CheckoutOut(BaseModel):
+    booking: BookingOut
+    seat_numbers: list[int]
+
+
 # Booking Seats (per-seat reservations)
 class BookingSeatsHoldRequest(BaseModel):
     show_id: int
     seat_numbers: list[int]
 
 
+class BestAvailableHoldRequest(BaseModel):
+    show_id: int
+    count: int  # How many seats to pick
+    section: str | None = None  # Layout section to pick from; any section when omitted
+    preferred_row: int | None = None  # 1-based row (within section, if given); defaults to the sweet spot
+    allow_split: bool = True  # Split the group across rows when no single row fits it
+
+
 class BookingSeatsHoldResponse(BaseModel):
     show_id: int
+    hold_id: str | None = None  # None when no requested seat could be held
+    expires_at: datetime | None = None
     held_seat_numbers: list[int]
     unavailable_seat_numbers: list[int]
 
 
+class AdmissionTicketOut(BaseModel):
+    token: str | None = None  # None when the waiting room is disabled
+    admitted: bool
+    position: int  # Users ahead in the queue
+    estimated_wait_seconds: int
+
+
 class BookingSeatsStatusResponse(BaseModel):
     show_id: int
     # Seats that are currently not available for selection (held or booked)
@@ -139,6 +223,7 @@ class BookingSeatCreate(BaseModel):
     show_id: int
     booking_id: int
     seat_id: list[int]
+    hold_id: str | None = None  # Hold being converted into this booking, if any
 
 
 class BookingSeatOut(BaseModel):
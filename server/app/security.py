@@ -5,11 +5,16 @@ try:
     from passlib.context import CryptContext  # type: ignore
 except Exception:  # pragma: no cover - fallback when passlib missing
     CryptContext = None  # type: ignore
+import asyncio
 import base64
 import hmac
 import json
 import hashlib
+import multiprocessing
 import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from .config import settings
 
@@ -37,15 +42,113 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
-def create_access_token(subject: str | int, expires_minutes: Optional[int] = None) -> str:
+class PasswordHashBusyError(Exception):
+    pass
+
+
+def _timed(func, *args) -> tuple[Any, float]:
+    """Run func in a pool worker and report how long it took there."""
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+class PasswordHashPool:
+    """Runs hash_password/verify_password in a small dedicated process pool.
+
+    bcrypt is deliberately slow CPU work; inline it would hold a request thread and the GIL
+    for each call. Callers await the worker's future, so no request thread is held while
+    it runs either. At most `max_pending` calls may be queued or running; beyond that
+    callers get PasswordHashBusyError straight away instead of piling up. With `workers=0`
+    hashing runs in a thread instead (tests, tiny deployments).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending > 0 else None
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0  # Seconds spent queued for a worker
+        self.wait_max = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads can copy held locks
+                self._executor = ProcessPoolExecutor(self._workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    async def _run(self, func, *args):
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashBusyError("Too many sign-ins in progress; try again shortly")
+        try:
+            with self._lock:
+                self.pending += 1
+            started = time.perf_counter()
+            if self._workers > 0:
+                result, ran = await asyncio.wrap_future(self._pool().submit(_timed, func, *args))
+            else:
+                result, ran = await asyncio.to_thread(_timed, func, *args)
+            waited = max(time.perf_counter() - started - ran, 0.0)
+            with self._lock:
+                self.completed += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            return result
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_avg": round(self.wait_total / self.completed, 6) if self.completed else 0.0,
+                "wait_seconds_max": round(self.wait_max, 6),
+            }
+
+
+password_hash_pool = PasswordHashPool(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+
+def create_access_token(
+    subject: str | int,
+    expires_minutes: Optional[int] = None,
+    claims: Optional[dict[str, Any]] = None,
+) -> str:
     """Create a minimal HMAC-signed token (homegrown JWT-like) without external deps.
     
     Format: base64url(payload_json).base64url(HMAC-SHA256(secret, payload_json_bytes))
+    Extra `claims` are signed along with `sub` and `exp`.
     NOTE: Only use for simple projects; for production, prefer a vetted JWT library.
     """
     expire_minutes = expires_minutes or settings.access_token_expire_minutes
     expire = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
-    payload: dict[str, Any] = {"sub": str(subject), "exp": int(expire.timestamp())}
+    payload: dict[str, Any] = {**(claims or {}), "sub": str(subject), "exp": int(expire.timestamp())}
     payload_bytes = json.dumps(payload, separators=(",", ":")).encode("utf-8")
     # Use HMAC-SHA256 to sign the payload
     sig = hmac.new(settings.jwt_secret_key.encode("utf-8"), payload_bytes, hashlib.sha256).digest()  # HMAC-SHA256 signature
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app import schemas
+from useage.admission_service import (
+    join_queue as join_queue_svc,
+    get_ticket_status as get_ticket_status_svc,
+    QueueFullError,
+)
+from useage.booking_errors import ShowNotFoundError
+
+router = APIRouter(tags=["admission"])  # Virtual waiting room for hot on-sales
+
+@router.post(
+    "/shows/{show_id}/admission",
+    response_model=schemas.AdmissionTicketOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def join_admission_queue(show_id: int, db: Session = Depends(get_db)):  # Read once per show, then cached
+    """Join the waiting room for a show; the token is admitted after the estimated wait."""
+    try:
+        return join_queue_svc(show_id, db)
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # No waiting room for shows that don't exist
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})  # Shed load early
+
+@router.get("/admission/{token}", response_model=schemas.AdmissionTicketOut)
+def get_admission_status(token: str):
+    """Poll a waiting room token; no database access."""
+    ticket = get_ticket_status_svc(token)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Admission token not found or expired")
+    return ticket
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Request, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 import logging
 from sqlalchemy.orm import Session
 
 from app import schemas
+from app.config import settings
 from app.db import get_db
-from app.models import User
+from app.rate_limit import RateLimitedError, login_rate_limiter
 from useage.auth_service import (
+    AuthenticatedUser,
     register_user,
     login_user,
     get_current_user_from_token,
     EmailAlreadyRegisteredError,
     InvalidCredentialsError,
     InvalidTokenError,
+    PasswordHashBusyError,
     UserNotFoundError,
 )
 
@@ -25,32 +29,50 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")  # Expects Bearer <
 
 # Register a new user
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     try:
-        # Attempt to register the user
-        return register_user(user_in, db)
+        # Attempt to register the user; awaits bcrypt without holding a threadpool thread
+        return await register_user(user_in, db)
     except EmailAlreadyRegisteredError as e:
         # Map domain error to 400 Bad Request
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PasswordHashBusyError as e:
+        # Shed load while the hashing pool is saturated
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         # Generic 500 Internal Server Error fallback
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
 
 # Login an existing user
 @router.post("/login", response_model=schemas.Token)
-def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: schemas.UserLogin, request: Request, db: Session = Depends(get_db)):
+    if settings.login_rate_limit_enabled:
+        try:
+            # Throttle before the user lookup and bcrypt so stuffing waves stay cheap
+            await run_in_threadpool(
+                login_rate_limiter.check, request.client.host if request.client else None, credentials.email
+            )
+        except RateLimitedError as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
     try:
         # Attempt to login the user
-        return login_user(credentials, db)
+        return await login_user(credentials, db)
     except InvalidCredentialsError as e:
         # Do not leak which field failed, return 401 Unauthorized
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except PasswordHashBusyError as e:
+        # Shed load while the hashing pool is saturated
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         # Generic 500 Internal Server Error fallback
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
 
 # Get the current authenticated user
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> AuthenticatedUser:
     try:
         # Validate token signature/exp and load user
         return get_current_user_from_token(token, db)
@@ -63,5 +85,5 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 
 # Return the authenticated user's profile
 @router.get("/me", response_model=schemas.UserOut)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: AuthenticatedUser = Depends(get_current_user)):
     return current_user
@@ -1,23 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db import get_db  # Dependency for database session
+from app.config import settings
+from app.db import SessionLocal, get_db  # Dependency for database session
 from app import schemas
+from app.idempotency import idempotency_store
+from useage.auth_service import AuthenticatedUser
+from .auth import get_current_user  # Auth dependency for protected endpoints
 from useage.booking_service import (
     create_booking as create_booking_svc,
     list_bookings as list_bookings_svc,
     create_booking_seats as create_booking_seats_svc,
+    cancel_booking as cancel_booking_svc,
+    checkout as checkout_svc,
     get_booking_seats_status as get_booking_seats_status_svc,
-    ShowNotFoundError,
+    open_seat_stream as open_seat_stream_svc,
     BookingNotFoundError,
-    InvalidSeatNumbersError,
     InvalidSeatIdListError,
+    SeatsUnavailableError,
+    NotEnoughSeatsError,
+    InvalidCursorError,
+    BookingAccessDeniedError,
+    BookingNotPendingError,
+)
+from useage.booking_errors import ShowNotFoundError, InvalidSeatNumbersError, HoldNotFoundError, NotEnoughFreeSeatsError
+from useage.layout_service import InvalidLayoutError
+from useage.admission_service import require_admission as require_admission_svc, AdmissionRequiredError
+from useage.hold_service import (
+    hold_seats as hold_seats_svc,
+    hold_best_available as hold_best_available_svc,
+    release_hold as release_hold_svc,
 )
 
 router = APIRouter(tags=["bookings"])  # Booking flows and per-seat persistence endpoints
 
+def _admit(show_id: int, admission_token: str | None, db: Session) -> None:
+    # Checked before any query so waiting users never take a pooled connection
+    try:
+        require_admission_svc(show_id, admission_token, db)
+    except AdmissionRequiredError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Missing show
+
 @router.post("/bookings", response_model=schemas.BookingOut, status_code=status.HTTP_201_CREATED)
-def create_booking(payload: schemas.BookingCreate, db: Session = Depends(get_db)):  # Database session dependency
+def create_booking(
+    payload: schemas.BookingCreate,
+    response: Response,
+    db: Session = Depends(get_db),  # Database session dependency
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),  # Client retries replay the first response
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),  # Waiting room pass, when enabled
+):
+    _admit(payload.show_id, admission_token, db)
+    return idempotency_store.run(
+        "POST /bookings", idempotency_key, payload, response, schemas.BookingOut,
+        lambda: _create_booking(payload, db),
+    )
+
+def _create_booking(payload: schemas.BookingCreate, db: Session):
     try:
         return create_booking_svc(payload, db)
     except ShowNotFoundError as e:
@@ -31,24 +75,104 @@ def create_booking(payload: schemas.BookingCreate, db: Session = Depends(get_db)
     "/bookings",
     response_model=list[schemas.BookingOut],
 )
-def list_bookings(user_id: int | None = None, db: Session = Depends(get_db)):  # Database session dependency
-    """List bookings, optionally filtered by user_id via query param."""
-    return list_bookings_svc(user_id, db)
+def list_bookings(
+    response: Response,
+    user_id: int | None = None,
+    limit: int = Query(settings.bookings_page_size, ge=1, le=settings.bookings_max_page_size),  # Page size
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),  # Resume point
+    db: Session = Depends(get_db),  # Database session dependency
+):
+    """List bookings newest first, optionally filtered by user_id via query param.
+
+    The body stays a plain list; when more rows exist, the cursor for the next page is
+    returned in the X-Next-Cursor header.
+    """
+    try:
+        rows, next_cursor = list_bookings_svc(user_id, db, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))  # Tampered or stale cursor
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.post("/checkout", response_model=schemas.CheckoutOut, status_code=status.HTTP_201_CREATED)
+def checkout(
+    payload: schemas.CheckoutRequest,
+    response: Response,
+    db: Session = Depends(get_db),  # Database session dependency
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),  # Client retries replay the first response
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),  # Waiting room pass, when enabled
+):
+    """Create a booking and reserve its seats in a single round trip and transaction."""
+    _admit(payload.show_id, admission_token, db)
+    return idempotency_store.run(
+        "POST /checkout", idempotency_key, payload, response, schemas.CheckoutOut,
+        lambda: _checkout(payload, db),
+    )
+
+def _checkout(payload: schemas.CheckoutRequest, db: Session):
+    try:
+        return checkout_svc(payload, db)
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Missing show
+    except InvalidSeatNumbersError as e:
+        raise HTTPException(status_code=400, detail=str(e))  # Client error in seat selection
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Seats taken by another booking or hold
+    except NotEnoughSeatsError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Counter guard: show would be oversold
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/bookings/{booking_id}/cancel", response_model=schemas.BookingOut)
+def cancel_booking(
+    booking_id: int,
+    db: Session = Depends(get_db),  # Database session dependency
+    current_user: AuthenticatedUser = Depends(get_current_user),  # Protected: owner or theater admin
+):
+    """Cancel a booking and release its seats back to the show."""
+    try:
+        return cancel_booking_svc(booking_id, current_user, db)
+    except BookingNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Booking must exist
+    except BookingAccessDeniedError as e:
+        raise HTTPException(status_code=403, detail=str(e))  # Someone else's booking
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post(
     "/booking-seats",
     response_model=schemas.BookingSeatOut,
     status_code=status.HTTP_201_CREATED,
 )
-def create_booking_seats(payload: schemas.BookingSeatCreate, db: Session = Depends(get_db)):  # Database session dependency
+def create_booking_seats(
+    payload: schemas.BookingSeatCreate,
+    response: Response,
+    db: Session = Depends(get_db),  # Database session dependency
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),  # Client retries replay the first response
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),  # Waiting room pass, when enabled
+):
+    _admit(payload.show_id, admission_token, db)
+    return idempotency_store.run(
+        "POST /booking-seats", idempotency_key, payload, response, schemas.BookingSeatOut,
+        lambda: _create_booking_seats(payload, db),
+    )
+
+def _create_booking_seats(payload: schemas.BookingSeatCreate, db: Session):
     try:
         return create_booking_seats_svc(payload, db)
     except BookingNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))  # Booking must exist
     except ShowNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))  # Show must exist
+    except BookingNotPendingError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Booking already expired or cancelled
     except InvalidSeatIdListError as e:
         raise HTTPException(status_code=400, detail=str(e))  # Validation error
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Seats taken by another booking or hold
+    except NotEnoughSeatsError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Counter guard: show would be oversold
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -58,8 +182,80 @@ def create_booking_seats(payload: schemas.BookingSeatCreate, db: Session = Depen
     response_model=schemas.BookingSeatOut,
     status_code=status.HTTP_201_CREATED,
 )
-def create_booking_seats_alias(payload: schemas.BookingSeatCreate, db: Session = Depends(get_db)):  # Database session dependency
-    return create_booking_seats(payload, db)  # Same handler, different path shape
+def create_booking_seats_alias(
+    payload: schemas.BookingSeatCreate,
+    response: Response,
+    db: Session = Depends(get_db),  # Database session dependency
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),
+):
+    return create_booking_seats(payload, response, db, idempotency_key, admission_token)  # Same handler, different path shape
+
+@router.post(
+    "/booking-seats/hold",
+    response_model=schemas.BookingSeatsHoldResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def hold_booking_seats(
+    payload: schemas.BookingSeatsHoldRequest,
+    db: Session = Depends(get_db),  # Database session dependency
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),  # Waiting room pass, when enabled
+):
+    """Temporarily hold free seats; held seats expire after the configured TTL."""
+    _admit(payload.show_id, admission_token, db)
+    try:
+        return hold_seats_svc(payload, db)
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Show not found
+    except InvalidSeatNumbersError as e:
+        raise HTTPException(status_code=400, detail=str(e))  # Client error in seat selection
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Alias with underscore for frontend compatibility
+@router.post(
+    "/booking_seats/hold",
+    response_model=schemas.BookingSeatsHoldResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def hold_booking_seats_alias(
+    payload: schemas.BookingSeatsHoldRequest,
+    db: Session = Depends(get_db),  # Database session dependency
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),
+):
+    return hold_booking_seats(payload, db, admission_token)  # Same handler, different path shape
+
+@router.post(
+    "/booking-seats/hold/best-available",
+    response_model=schemas.BookingSeatsHoldResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def hold_best_available_seats(
+    payload: schemas.BestAvailableHoldRequest,
+    db: Session = Depends(get_db),  # Database session dependency
+    admission_token: str | None = Header(None, alias="X-Admission-Token"),  # Waiting room pass, when enabled
+):
+    """Pick and hold the best `count` free seats, contiguous where the layout allows."""
+    _admit(payload.show_id, admission_token, db)
+    try:
+        return hold_best_available_svc(payload, db)
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Show not found
+    except (InvalidSeatNumbersError, InvalidLayoutError) as e:
+        raise HTTPException(status_code=400, detail=str(e))  # Bad count or unknown section
+    except NotEnoughFreeSeatsError as e:
+        raise HTTPException(status_code=409, detail=str(e))  # Show too full for this group
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.delete("/booking-seats/hold/{hold_id}", status_code=status.HTTP_204_NO_CONTENT)
+def release_booking_seats_hold(hold_id: str):
+    """Release a hold early (e.g. the user deselected seats or left the page)."""
+    try:
+        release_hold_svc(hold_id)
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Unknown or already expired hold
+    return None
 
 @router.get(
     "/shows/{show_id}/booking_seats",
@@ -72,3 +268,24 @@ def get_booking_seats_status(show_id: int, db: Session = Depends(get_db)):  # Da
         raise HTTPException(status_code=404, detail=str(e))  # Show not found
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _open_seat_stream(show_id: int, loop: asyncio.AbstractEventLoop):
+    # Own short-lived session: a Depends(get_db) session would stay checked out (idle in
+    # transaction) until the stream ends, so every open seat map would pin a pooled connection
+    with SessionLocal() as db:
+        return open_seat_stream_svc(show_id, db, loop)
+
+@router.get("/shows/{show_id}/booking_seats/stream")
+async def stream_booking_seats(show_id: int, request: Request):
+    """Server-Sent Events: a `snapshot` of unavailable seats, then `delta` events
+    ({"unavailable": [...], "available": [...]}) for every booking, hold, expiry or release.
+    """
+    try:
+        subscriber = await run_in_threadpool(_open_seat_stream, show_id, asyncio.get_running_loop())
+    except ShowNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))  # Show not found
+    return StreamingResponse(
+        subscriber.frames(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # Don't let proxies buffer the stream
+    )
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app import schemas
+from app.catalog_versions import cached_json_response
 from app.models import City
 from useage.city_service import list_cities as list_cities_svc
 
 router = APIRouter(tags=["cities"])  # City listing endpoints
+_cities_adapter = TypeAdapter(list[schemas.CityOut])
 
 @router.get("/cities", response_model=list[schemas.CityOut])
-def list_cities(db: Session = Depends(get_db)):
+def list_cities(request: Request, db: Session = Depends(get_db)):
     try:
-        return list_cities_svc(db)
+        return cached_json_response(request, "cities", None, ["cities"], _cities_adapter, lambda: list_cities_svc(db))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")  # Generic 500 fallback
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Query
+
+from app.catalog_versions import response_cache
+from app.idempotency import idempotency_store
+from app.rate_limit import login_rate_limiter
+from app.security import password_hash_pool
+from useage.auth_service import token_user_cache
+from useage.seat_map_service import show_locks
+
+router = APIRouter(tags=["metrics"])  # In-process runtime metrics
+
+@router.get("/metrics/locks")
+def get_lock_metrics(top: int = Query(10, ge=1, le=100)):  # How many hot shows to list
+    """Per-show writer lock statistics for this process: totals and the shows with the most queueing."""
+    return show_locks.stats(top=top)
+
+@router.get("/metrics/caches")
+def get_cache_metrics():
+    """Size and hit rate of the in-process caches."""
+    return {
+        "auth_tokens": token_user_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+        "catalog_responses": response_cache.stats(),
+    }
+
+@router.get("/metrics/password-hashing")
+def get_password_hashing_metrics():
+    """bcrypt pool load: calls in flight, shed calls and time spent queued for a worker."""
+    return {**password_hash_pool.stats(), "login_attempts_throttled": login_rate_limiter.rejected}
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app import schemas
+from app.catalog_versions import cached_json_response
 from routers.auth import get_current_user  # Protect write ops via auth dependency
 from useage.movie_service import (
     create_movie as create_movie_svc,
@@ -12,6 +16,7 @@ from useage.movie_service import (
 )
 
 router = APIRouter(prefix="/movies", tags=["movies"])
+_movies_adapter = TypeAdapter(list[schemas.MovieOut])
 
 # Auth-protected write operation
 @router.post("", response_model=schemas.MovieOut, status_code=status.HTTP_201_CREATED)
@@ -22,22 +27,29 @@ def create_movie(movie_in: schemas.MovieCreate, db: Session = Depends(get_db), u
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")  # Generic 500 fallback
 
 @router.get("", response_model=list[schemas.MovieOut])
-def list_movies(db: Session = Depends(get_db)):
-    return list_movies_svc(db)
+def list_movies(request: Request, db: Session = Depends(get_db)):
+    return cached_json_response(request, "movies", None, ["movies"], _movies_adapter, lambda: list_movies_svc(db))
 
 # Query parameter: city_id is required for filtering
 @router.get("/playing", response_model=list[schemas.MovieOut])
 def list_playing_movies(
+    request: Request,
     city_id: int = Query(..., description="City ID"),  # Required filter
     db: Session = Depends(get_db),
 ):
-    """Return distinct movies that have at least one show in the specified city.
+    """Return distinct movies that have a show today or later in the specified city.
 
     - Filters theaters by city and active status only.
-    - No date, language, or genre filters applied.
+    - No language or genre filters applied.
     """
     try:
-        return list_playing_movies_svc(city_id, db)
+        # Depends on which theaters are active, what their screens show and on the day:
+        # yesterday's tag must not 304 a list that still has movies whose last show was yesterday
+        today = date.today()
+        return cached_json_response(
+            request, "movies/playing", (city_id, today), ["movies", "theaters", "screens", "shows"],
+            _movies_adapter, lambda: list_playing_movies_svc(city_id, db, today), tag_extra=today.isoformat(),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
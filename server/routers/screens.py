@@ -1,27 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app import schemas
+from app.catalog_versions import conditional_get
 from useage.screen_service import (
     list_screens_for_theater as list_screens_for_theater_svc,
     get_screen as get_screen_svc,
+    get_screen_layout as get_screen_layout_svc,
     ScreenNotFoundError,
 )
 
 router = APIRouter(tags=["screens"])  # Screen read endpoints
 
 @router.get("/theaters/{theater_id}/screens", response_model=list[schemas.ScreenOut])
-def list_screens_for_theater(theater_id: int, db: Session = Depends(get_db)):
+def list_screens_for_theater(theater_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """List all screens for a given theater."""
+    not_modified = conditional_get(request, response, "screens")
+    if not_modified is not None:
+        return not_modified
     return list_screens_for_theater_svc(theater_id, db)
 
 @router.get("/screens/{screen_id}", response_model=schemas.ScreenOut)
-def get_screen(screen_id: int, db: Session = Depends(get_db)):
+def get_screen(screen_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get a single screen by ID."""
+    not_modified = conditional_get(request, response, "screens")
+    if not_modified is not None:
+        return not_modified
     try:
         return get_screen_svc(screen_id, db)
     except ScreenNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))  # Resource not found
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
+
+@router.get("/screens/{screen_id}/layout", response_model=schemas.ScreenLayoutOut)
+def get_screen_layout(screen_id: int, db: Session = Depends(get_db)):
+    """Get the screen's compiled seat layout (sections, rows and seat number ranges)."""
+    try:
+        return get_screen_layout_svc(screen_id, db)
+    except ScreenNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))  # Resource not found
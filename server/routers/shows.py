@@ -6,10 +6,11 @@ from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app import schemas
-from app.models import User
+from useage.auth_service import AuthenticatedUser
 from .auth import get_current_user  # Auth dependency for protected endpoints
 from useage.show_service import (
     get_movie_shows as get_movie_shows_svc,
+    get_showtime_matrix as get_showtime_matrix_svc,
     get_show as get_show_svc,
     create_show as create_show_svc,
     delete_show as delete_show_svc,
@@ -34,6 +35,20 @@ def get_movie_shows(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
 
+@router.get("/movies/{movie_id}/showtimes", response_model=schemas.ShowtimeMatrixOut)
+def get_showtime_matrix(
+    movie_id: int,
+    city_id: int = Query(..., description="City ID"),  # Required city filter
+    start_date: Optional[dt_date] = Query(None, description="First day (YYYY-MM-DD), default today"),
+    days: int = Query(7, ge=1, le=14, description="Number of consecutive days"),
+    db: Session = Depends(get_db),
+):
+    """All date tabs of the movie page at once: days -> theaters -> screens -> shows with fill levels."""
+    try:
+        return get_showtime_matrix_svc(movie_id, city_id, start_date, days, db)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
+
 @router.get("/shows/{show_id}", response_model=schemas.ShowOut)
 def get_show(show_id: int, db: Session = Depends(get_db)):
     try:
@@ -47,7 +62,7 @@ def get_show(show_id: int, db: Session = Depends(get_db)):
 def create_show(
     payload: schemas.ShowCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),  # Protected: requires authenticated user
+    current_user: AuthenticatedUser = Depends(get_current_user),  # Protected: requires authenticated user
 ):
     try:
         return create_show_svc(payload, current_user, db)
@@ -64,7 +79,7 @@ def create_show(
 def delete_show(
     show_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),  # Protected: requires authenticated user
+    current_user: AuthenticatedUser = Depends(get_current_user),  # Protected: requires authenticated user
 ):
     try:
         return delete_show_svc(show_id, current_user, db)
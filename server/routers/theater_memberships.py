@@ -6,6 +6,7 @@ from typing import Optional
 from app.db import get_db
 from app import schemas
 from app.models import TheaterUserMembership
+from useage.auth_service import bump_claims_version
 
 router = APIRouter(tags=["theater_admins"])  # Theater admin membership management
 
@@ -26,6 +27,7 @@ def create_membership(
         is_active=payload.is_active,
     )
     db.add(membership)
+    bump_claims_version(payload.user_id, db)  # Tokens issued before this carry stale admin claims
     try:
         db.commit()
     except IntegrityError:
@@ -84,6 +86,7 @@ def update_membership(
         membership.is_active = payload.is_active
 
     db.add(membership)
+    bump_claims_version(membership.user_id, db)  # Tokens issued before this carry stale admin claims
     db.commit()
     db.refresh(membership)
     return membership
@@ -97,5 +100,6 @@ def delete_membership(membership_id: int, db: Session = Depends(get_db)):
     if not membership:
         raise HTTPException(status_code=404, detail="Membership not found")  # 404 when resource absent
     db.delete(membership)
+    bump_claims_version(membership.user_id, db)  # Tokens issued before this carry stale admin claims
     db.commit()
     return None
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.db import get_db
 from app import schemas
-from app.models import City, Theater, Show, Screen
+from app.catalog_versions import conditional_get
+from app.models import City, Theater, ShowListing
+from useage.theater_geo_service import nearest_theaters
 
 router = APIRouter(tags=["theaters"])  # Theater listing endpoints
 
@@ -14,22 +16,35 @@ router = APIRouter(tags=["theaters"])  # Theater listing endpoints
 
 @router.get("/theaters", response_model=list[schemas.TheaterOut])
 def list_theaters(
+    request: Request,
+    response: Response,
     city_id: int = Query(..., description="City ID"),  # Required: only active theaters in this city
     movie_id: Optional[int] = Query(None, description="Filter by movie id"),  # Optional: filter theaters that play the movie
-    latitude: Optional[float] = None,  # Accepted but not used for sorting yet
-    longitude: Optional[float] = None,  # Accepted but not used for sorting yet
+    latitude: Optional[float] = Query(None, ge=-90, le=90),  # With longitude: nearest theaters first
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    limit: int = Query(20, ge=1, le=100, description="How many nearest theaters to return (with latitude/longitude)"),
     db: Session = Depends(get_db),  # DB session dependency
 ):
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(status_code=422, detail="latitude and longitude must be given together")
+
+    # The movie filter goes through screens and shows, so their writes change this list too
+    not_modified = conditional_get(request, response, "theaters", "screens", "shows")
+    if not_modified is not None:
+        return not_modified
+
+    if latitude is not None and longitude is not None:
+        # k nearest from the city's in-memory grid instead of sorting every theater
+        return nearest_theaters(city_id, latitude, longitude, limit, movie_id, db)
+
     q = db.query(Theater).filter(Theater.city_id == city_id, Theater.is_active == True)
 
     if movie_id is not None:
-        # Join shows via screens to filter theaters that have a show for the movie
+        # Theaters with a listed show for the movie in this city (show_listings is per movie and city)
         q = (
-            q.join(Screen, Screen.theater_id == Theater.id)
-             .join(Show, Show.screen_id == Screen.id)
-             .filter(Show.movie_id == movie_id)
+            q.join(ShowListing, ShowListing.theater_id == Theater.id)
+             .filter(ShowListing.movie_id == movie_id, ShowListing.city_id == city_id)
              .distinct()
         )
 
-    # Note: latitude/longitude are accepted but distance sorting is not implemented yet
     return q.all()
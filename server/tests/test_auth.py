@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -21,6 +22,9 @@ from server.routers import auth
 from app.db import get_db
 from app.models import Base, User
 from app import security
+from app.rate_limit import Limit, LoginRateLimiter, MemoryBucketBackend, RateLimitedError, SQLiteBucketBackend, login_rate_limiter
+from useage import auth_service
+from useage.auth_service import bump_claims_version, get_current_user_from_token, token_user_cache
 
 
 @pytest.fixture()
@@ -35,6 +39,8 @@ def test_app_client():
 
     # Create only the tables we need
     Base.metadata.create_all(bind=test_engine, tables=[User.__table__])
+    token_user_cache.clear()
+    login_rate_limiter.clear()
 
     app = FastAPI()
 
@@ -145,3 +151,89 @@ def test_me_user_not_found(test_app_client: TestClient):
     r = test_app_client.get("/auth/me", headers=headers)
     assert r.status_code == 401
     assert r.json().get("detail") == "User not found"
+
+
+def test_me_uses_token_cache_and_sees_user_changes(test_app_client: TestClient):
+    user_id = test_app_client.post("/auth/register", json=register_payload()).json()["id"]
+    headers = {"Authorization": f"Bearer {security.create_access_token(subject=user_id)}"}
+
+    assert test_app_client.get("/auth/me", headers=headers).json()["first_name"] == "Alice"
+    assert test_app_client.get("/auth/me", headers=headers).json()["first_name"] == "Alice"
+    stats = token_user_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)  # Second call skipped decode and the user query
+
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    db.get(User, user_id).first_name = "Alicia"
+    db.commit()
+    db.close()
+    assert test_app_client.get("/auth/me", headers=headers).json()["first_name"] == "Alicia"
+
+
+def test_token_cache_respects_token_expiry(test_app_client: TestClient):
+    user_id = test_app_client.post("/auth/register", json=register_payload()).json()["id"]
+    token = security.create_access_token(subject=user_id, expires_minutes=-1)  # Already expired
+    r = test_app_client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 401
+    assert token_user_cache.get(token) is None
+
+
+def test_admin_claims_are_trusted_until_memberships_change(test_app_client: TestClient):
+    user_id = test_app_client.post("/auth/register", json=register_payload()).json()["id"]
+    token = security.create_access_token(subject=user_id, claims={"adm": [[7, "admin"]], "cv": 0})
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+
+    assert get_current_user_from_token(token, db).admin_theaters == frozenset({7})
+
+    bump_claims_version(user_id, db)  # What the memberships router does on every change
+    db.commit()
+    assert get_current_user_from_token(token, db).admin_theaters is None  # Stale: fall back to the DB
+    db.close()
+
+
+def test_register_sheds_load_when_hash_pool_is_saturated(test_app_client: TestClient, monkeypatch):
+    busy = security.PasswordHashPool(workers=0, max_pending=0)  # No free slot at all
+    monkeypatch.setattr(auth_service, "password_hash_pool", busy)
+    r = test_app_client.post("/auth/register", json=register_payload())
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    assert busy.stats()["rejected"] == 1
+
+
+def test_hash_pool_runs_bcrypt_in_worker_processes():
+    pool = security.PasswordHashPool(workers=1, max_pending=4)
+    try:
+        hashed = asyncio.run(pool.hash("StrongPass1"))
+        assert asyncio.run(pool.verify("StrongPass1", hashed))
+        assert not asyncio.run(pool.verify("WrongPass", hashed))
+        stats = pool.stats()
+        assert (stats["completed"], stats["pending"], stats["rejected"]) == (3, 0, 0)
+    finally:
+        pool.shutdown()
+
+
+def test_login_is_throttled_per_email_before_any_lookup(test_app_client: TestClient, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "per_email", Limit(per_minute=1, burst=2))
+    for _ in range(2):
+        r = test_app_client.post("/auth/login", json=login_payload("victim@example.com", "guess"))
+        assert r.status_code == 401
+    r = test_app_client.post("/auth/login", json=login_payload("Victim@example.com", "guess"))
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 0
+    # Other accounts from the same client still get through
+    r = test_app_client.post("/auth/login", json=login_payload("other@example.com", "guess"))
+    assert r.status_code == 401
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_token_buckets_refill_and_decay(backend, tmp_path):
+    store = MemoryBucketBackend(sweep_interval=0) if backend == "memory" else SQLiteBucketBackend(str(tmp_path / "rl.db"), sweep_interval=0)
+    limiter = LoginRateLimiter(store, per_ip=Limit(per_minute=60, burst=3), per_email=Limit(per_minute=60, burst=100))
+    for i in range(3):
+        limiter.check("10.0.0.1", f"user{i}@example.com", now=1000.0)
+    with pytest.raises(RateLimitedError):
+        limiter.check("10.0.0.1", "user9@example.com", now=1000.0)
+    limiter.check("10.0.0.1", "user9@example.com", now=1001.0)  # One token back after a second
+    limiter.check("10.0.0.2", "user9@example.com", now=1001.0)
+    if backend == "memory":
+        limiter.check("10.0.0.3", "new@example.com", now=2000.0)  # Full buckets are swept
+        assert len(store) == 2
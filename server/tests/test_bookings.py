@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os
 import sys
 from pathlib import Path
@@ -18,12 +20,18 @@ if str(SERVER_DIR) not in sys.path:
     sys.path.insert(0, str(SERVER_DIR))
 
 from server.routers import bookings
+from server.routers.auth import get_current_user
 from app.db import get_db
-from app.models import Base, Show, Booking
+from app.models import Base, Show, Booking, BookingSeat, CityNowPlaying, Screen, SeatReservation, ShowListing, Theater, TheaterUserMembership
+from useage.seat_map_service import SeatBitset, reset_seat_maps
+from useage.hold_service import hold_store, expire_holds
+from app.idempotency import idempotency_store
+from useage.seat_events import broker
+from useage.layout_service import reset_layouts
 
 
 @pytest.fixture()
-def test_app_client():
+def test_app_client(monkeypatch):
     # Build a fresh file DB per test
     db_path = Path(tempfile.gettempdir()) / "bookings_test.db"
     if db_path.exists():
@@ -34,10 +42,24 @@ def test_app_client():
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
     # Create only the tables we need to avoid dialect issues (e.g., JSONB on SQLite)
-    Base.metadata.create_all(bind=test_engine, tables=[Show.__table__, Booking.__table__])
+    Base.metadata.create_all(
+        bind=test_engine,
+        tables=[
+            # Show writes maintain city_now_playing and show_listings
+            Theater.__table__, Screen.__table__, Show.__table__, CityNowPlaying.__table__, ShowListing.__table__,
+            Booking.__table__, BookingSeat.__table__, SeatReservation.__table__, TheaterUserMembership.__table__,
+        ],
+    )
+    # Seat maps are cached per process; the DB is recreated per test
+    reset_seat_maps()
+    hold_store.clear()
+    idempotency_store.clear()
+    broker.clear()
+    reset_layouts()
 
-    # Seed a sample show
+    # Seed a sample screen and show
     with TestingSessionLocal() as db:
+        db.add(Screen(id=1, theater_id=1, name="Screen 1", total_seats=100, layout_config={"rows": 10, "cols": 10}))
         show = Show(
             id=1,
             movie_id=1,       # referenced table not created; fine for SQLite in tests
@@ -59,7 +81,14 @@ def test_app_client():
         finally:
             db.close()
 
+    class CurrentUser:
+        def __init__(self, user_id: int):
+            self.id = user_id
+            self.admin_theaters = None  # No token claims: authorization goes through memberships
+
     app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(bookings, "SessionLocal", TestingSessionLocal)  # The seat stream opens its own session
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(42)  # Owner of booking_payload() bookings
     app.include_router(bookings.router)
 
     with TestClient(app) as client:
@@ -110,6 +139,12 @@ def test_create_booking_invalid_seats(test_app_client: TestClient):
     r2 = test_app_client.post("/bookings", json=booking_payload(seat_numbers=[0, -1]))
     assert r2.status_code == 400
     assert r2.json().get("detail") == "Invalid seat numbers"
+    r3 = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [2_000_000_000]})
+    assert r3.status_code == 400
+    assert r3.json().get("detail") == "Seat numbers out of range 1-100: 2000000000"
+    r4 = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": list(range(1, 12))})
+    assert r4.status_code == 400
+    assert r4.json().get("detail") == "At most 10 seats can be held at once"
 
 
 def test_list_bookings_all_and_filter_by_user(test_app_client: TestClient):
@@ -129,3 +164,635 @@ def test_list_bookings_all_and_filter_by_user(test_app_client: TestClient):
     u1_list = r_u1.json()
     assert len(u1_list) == 1
     assert u1_list[0]["user_id"] == 1
+
+
+def test_booking_seats_status_reflects_persisted_seats(test_app_client: TestClient):
+    r0 = test_app_client.get("/shows/1/booking_seats")
+    assert r0.status_code == 200
+    assert r0.json() == {"show_id": 1, "unavailable_seat_numbers": []}
+
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    r1 = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [12, 3, 3]})
+    assert r1.status_code == 201, r1.text
+    assert r1.json()["seat_id"] == [12, 3]
+
+    # The cached seat map is updated by the write; sorted order comes from the bitset
+    r2 = test_app_client.get("/shows/1/booking_seats")
+    assert r2.json()["unavailable_seat_numbers"] == [3, 12]
+
+
+def test_booking_seats_status_unknown_show(test_app_client: TestClient):
+    r = test_app_client.get("/shows/999/booking_seats")
+    assert r.status_code == 404
+    assert r.json().get("detail") == "Show not found"
+
+
+def test_seat_bitset_add_discard_and_bounds():
+    bits = SeatBitset(10)
+    assert bits.add(1) and bits.add(10) and bits.add(9)
+    assert not bits.add(9)
+    with pytest.raises(IndexError):
+        bits.add(17)  # never grows past the capacity it was sized for
+    assert 17 not in bits and 2 not in bits
+    assert bits.seats() == [1, 9, 10]
+    assert bits.discard(9) and not bits.discard(9) and not bits.discard(17)
+    assert bits.seats() == [1, 10]
+
+
+def test_seat_writes_reject_seats_beyond_capacity(test_app_client: TestClient):
+    r1 = test_app_client.post("/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [5, 2_000_000_000]})
+    assert r1.status_code == 400
+    assert r1.json()["detail"] == "Seat numbers out of range 1-100: 2000000000"
+
+    booking = test_app_client.post("/bookings", json=booking_payload()).json()
+    r2 = test_app_client.post("/booking-seats", json={"booking_id": booking["id"], "show_id": 1, "seat_id": [101]})
+    assert r2.status_code == 400
+    r3 = test_app_client.post("/bookings", json=booking_payload(seat_numbers=[100, 101]))
+    assert r3.status_code == 400
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+
+
+def test_seat_maps_are_bounded_and_rebuilt_after_eviction(test_app_client: TestClient, monkeypatch):
+    from useage import seat_map_service
+
+    monkeypatch.setattr(seat_map_service.settings, "seat_map_max_shows", 1)
+    test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [3]})
+    shard_mate = 1 + seat_map_service.settings.show_lock_shards
+    with seat_map_service.show_lock(shard_mate):
+        pass  # Another show in the same lock shard pushes show 1 out
+    assert 1 not in seat_map_service.show_locks.keys()
+    assert seat_map_service.peek_seat_map(1) is None
+
+    # Rebuilt from the database and the live holds
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [3]
+
+
+def test_hold_seats_marks_them_unavailable_and_reports_conflicts(test_app_client: TestClient):
+    r1 = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [5, 6]})
+    assert r1.status_code == 201, r1.text
+    first = r1.json()
+    assert first["held_seat_numbers"] == [5, 6]
+    assert first["unavailable_seat_numbers"] == []
+    assert first["hold_id"] and first["expires_at"]
+
+    # Overlapping hold only gets the free seat
+    r2 = test_app_client.post("/booking_seats/hold", json={"show_id": 1, "seat_numbers": [6, 7]})
+    assert r2.json()["held_seat_numbers"] == [7]
+    assert r2.json()["unavailable_seat_numbers"] == [6]
+
+    status_r = test_app_client.get("/shows/1/booking_seats")
+    assert status_r.json()["unavailable_seat_numbers"] == [5, 6, 7]
+
+
+def test_hold_seats_invalid_input(test_app_client: TestClient):
+    r1 = test_app_client.post("/booking-seats/hold", json={"show_id": 999, "seat_numbers": [1]})
+    assert r1.status_code == 404
+    r2 = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [0]})
+    assert r2.status_code == 400
+    assert r2.json().get("detail") == "Invalid seat numbers"
+
+
+def test_holds_expire_and_can_be_released(test_app_client: TestClient):
+    import time
+
+    hold_id = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [1, 2]}).json()["hold_id"]
+    test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [3]})
+
+    r_del = test_app_client.delete(f"/booking-seats/hold/{hold_id}")
+    assert r_del.status_code == 204
+    assert test_app_client.delete(f"/booking-seats/hold/{hold_id}").status_code == 404
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [3]
+
+    # Jump past the TTL: the remaining hold expires and its seat frees up
+    assert expire_holds(now=time.time() + 10**6) == 1
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+
+
+def test_booking_seats_converts_hold(test_app_client: TestClient):
+    hold_id = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [8, 9]}).json()["hold_id"]
+    booking_id = test_app_client.post("/bookings", json=booking_payload(seat_numbers=[8, 9])).json()["id"]
+    r = test_app_client.post(
+        "/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [8, 9], "hold_id": hold_id}
+    )
+    assert r.status_code == 201, r.text
+    assert hold_store.get(hold_id) is None
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [8, 9]
+
+
+def test_booking_seats_conflict_is_all_or_nothing(test_app_client: TestClient):
+    b1 = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    b2 = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    assert test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": b1, "seat_id": [4, 5]}).status_code == 201
+
+    r = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": b2, "seat_id": [3, 4, 5]})
+    assert r.status_code == 409
+    assert r.json().get("detail") == "Seats not available: 4, 5"
+    # Seat 3 was not reserved by the failed batch
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [4, 5]
+
+
+def test_booking_seats_rejects_seats_held_by_someone_else(test_app_client: TestClient):
+    test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [20]})
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    r = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [20, 21]})
+    assert r.status_code == 409
+    assert r.json().get("detail") == "Seats not available: 20"
+
+
+def test_concurrent_booking_seats_single_winner(test_app_client: TestClient):
+    from concurrent.futures import ThreadPoolExecutor
+
+    booking_ids = [test_app_client.post("/bookings", json=booking_payload()).json()["id"] for _ in range(8)]
+
+    def attempt(booking_id):
+        return test_app_client.post(
+            "/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [50, 51]}
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(attempt, booking_ids))
+
+    assert sorted(codes) == [201] + [409] * 7
+
+
+def test_backfill_seat_reservations_from_legacy_rows():
+    from sqlalchemy.pool import StaticPool
+    from app.migrations import backfill_seat_reservations, needs_seat_reservation_backfill
+
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[Show.__table__, Booking.__table__, BookingSeat.__table__, SeatReservation.__table__],
+    )
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([
+            BookingSeat(booking_id=1, show_id=1, seat_id=[1, 2]),
+            BookingSeat(booking_id=2, show_id=1, seat_id=[2, 3]),  # legacy double-booking of seat 2
+            BookingSeat(booking_id=3, show_id=2, seat_id=[1]),
+        ])
+        db.commit()
+
+        assert needs_seat_reservation_backfill(db)
+        assert backfill_seat_reservations(db, batch_size=2) == 4
+        rows = db.query(SeatReservation.show_id, SeatReservation.seat_number, SeatReservation.booking_id).all()
+        assert sorted(rows) == [(1, 1, 1), (1, 2, 1), (1, 3, 2), (2, 1, 3)]
+
+        # Re-running is a no-op
+        assert not needs_seat_reservation_backfill(db)
+        assert backfill_seat_reservations(db) == 0
+
+
+def test_booking_seats_unique_index_catches_writes_from_other_processes(test_app_client: TestClient):
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    # Load the seat map, then reserve seat 30 behind its back (as another worker would)
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    db.add(SeatReservation(show_id=1, seat_number=30, booking_id=booking_id))
+    db.commit()
+    db.close()
+
+    r = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [29, 30]})
+    assert r.status_code == 409
+    assert r.json().get("detail") == "Seats not available: 30"
+    # The map caught up; seat 29 stayed free
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [30]
+
+
+def _available_seats(client: TestClient) -> int:
+    db = next(client.app.dependency_overrides[get_db]())
+    try:
+        return db.get(Show, 1).available_seats
+    finally:
+        db.close()
+
+
+def test_available_seats_counter_follows_bookings_and_cancellations(test_app_client: TestClient):
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [1, 2, 3]})
+    assert _available_seats(test_app_client) == 97
+
+    r = test_app_client.post(f"/bookings/{booking_id}/cancel")
+    assert r.status_code == 200
+    assert r.json()["booking_status"] == "cancelled"
+    assert _available_seats(test_app_client) == 100
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+
+    assert test_app_client.post("/bookings/999/cancel").status_code == 404
+
+
+def test_cancel_booking_requires_owner_or_theater_admin(test_app_client: TestClient):
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [4, 5]})
+
+    class Stranger:
+        id = 7
+        admin_theaters = frozenset()
+
+    test_app_client.app.dependency_overrides[get_current_user] = lambda: Stranger()
+    r = test_app_client.post(f"/bookings/{booking_id}/cancel")
+    assert r.status_code == 403
+    assert _available_seats(test_app_client) == 98
+
+    Stranger.admin_theaters = frozenset({1})  # Admin of the show's theater
+    assert test_app_client.post(f"/bookings/{booking_id}/cancel").status_code == 200
+    assert _available_seats(test_app_client) == 100
+
+
+def test_available_seats_counter_never_goes_negative(test_app_client: TestClient):
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    db.get(Show, 1).available_seats = 1
+    db.commit()
+    db.close()
+
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    r = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [1, 2]})
+    assert r.status_code == 409
+    assert r.json().get("detail") == "Not enough seats available for this show"
+    assert _available_seats(test_app_client) == 1
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+
+
+def test_booking_seats_rejected_once_booking_is_no_longer_pending(test_app_client: TestClient):
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    assert test_app_client.post(f"/bookings/{booking_id}/cancel").status_code == 200
+
+    r = test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [9]})
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Booking is cancelled; seats can only be added while payment is pending"
+    assert _available_seats(test_app_client) == 100
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == []
+
+
+def test_reconcile_available_seats_fixes_drift(test_app_client: TestClient):
+    from useage.booking_service import reconcile_available_seats
+
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [7, 8]})
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    db.get(Show, 1).available_seats = 100  # drifted
+    db.commit()
+
+    assert reconcile_available_seats(db, batch_size=1) == 1
+    assert reconcile_available_seats(db) == 0
+    db.close()
+    assert _available_seats(test_app_client) == 98
+
+
+def test_reconcile_clamps_overbooked_show_to_zero(test_app_client: TestClient):
+    from useage.booking_service import reconcile_available_seats
+
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    test_app_client.post("/booking-seats", json={"show_id": 1, "booking_id": booking_id, "seat_id": [1, 2, 3]})
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    db.get(Screen, 1).total_seats = 2  # Layout shrank below what was already sold
+    db.commit()
+
+    assert reconcile_available_seats(db) == 1
+    db.close()
+    assert _available_seats(test_app_client) == 0
+
+
+def test_checkout_creates_booking_and_seats_in_one_call(test_app_client: TestClient):
+    r = test_app_client.post("/checkout", json={"show_id": 1, "seat_numbers": [10, 11, 10], "user_id": 7})
+    assert r.status_code == 201, r.text
+    data = r.json()
+    assert data["seat_numbers"] == [10, 11]
+    assert data["booking"]["user_id"] == 7
+    assert data["booking"]["final_amount"] == 250.0 * 2
+    assert data["booking"]["booking_reference"].startswith("BMS-")
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [10, 11]
+    assert _available_seats(test_app_client) == 98
+
+
+def test_checkout_conflict_writes_nothing(test_app_client: TestClient):
+    test_app_client.post("/checkout", json={"show_id": 1, "seat_numbers": [10], "user_id": 7})
+    r = test_app_client.post("/checkout", json={"show_id": 1, "seat_numbers": [9, 10], "user_id": 8})
+    assert r.status_code == 409
+    assert r.json().get("detail") == "Seats not available: 10"
+    # No orphan booking was left behind for user 8
+    assert test_app_client.get("/bookings", params={"user_id": 8}).json() == []
+
+    assert test_app_client.post("/checkout", json={"show_id": 999, "seat_numbers": [1], "user_id": 8}).status_code == 404
+    assert test_app_client.post("/checkout", json={"show_id": 1, "seat_numbers": [], "user_id": 8}).status_code == 400
+
+
+def test_idempotency_key_replays_booking_without_new_write(test_app_client: TestClient):
+    headers = {"Idempotency-Key": "retry-abc"}
+    r1 = test_app_client.post("/bookings", json=booking_payload(user_id=5), headers=headers)
+    r2 = test_app_client.post("/bookings", json=booking_payload(user_id=5), headers=headers)
+    assert r1.status_code == r2.status_code == 201
+    assert r2.json() == r1.json()
+    assert r2.headers.get("Idempotent-Replayed") == "true"
+    assert len(test_app_client.get("/bookings", params={"user_id": 5}).json()) == 1
+
+    # Same key, different body is rejected
+    r3 = test_app_client.post("/bookings", json=booking_payload(user_id=6), headers=headers)
+    assert r3.status_code == 422
+
+
+def test_idempotency_key_replays_booking_seats(test_app_client: TestClient):
+    booking_id = test_app_client.post("/bookings", json=booking_payload()).json()["id"]
+    body = {"show_id": 1, "booking_id": booking_id, "seat_id": [40]}
+    headers = {"Idempotency-Key": "seats-1"}
+    r1 = test_app_client.post("/booking-seats", json=body, headers=headers)
+    # A plain retry would conflict with itself; the keyed replay returns the original row
+    r2 = test_app_client.post("/booking_seats", json=body, headers=headers)
+    assert r1.status_code == r2.status_code == 201
+    assert r2.json() == r1.json()
+    assert test_app_client.post("/booking-seats", json=body).status_code == 409
+
+
+def test_ttl_cache_lru_and_expiry():
+    from app.cache import TTLCache
+
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # refreshes "a"
+    cache.set("c", 3)  # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    cache.set("d", 4, ttl_seconds=-1)  # non-positive TTL is not stored
+    assert cache.get("d") is None
+    assert cache.stats()["hits"] == 2
+
+
+def test_list_bookings_keyset_pagination(test_app_client: TestClient):
+    ids = [test_app_client.post("/bookings", json=booking_payload(user_id=3)).json()["id"] for _ in range(5)]
+
+    seen = []
+    cursor = None
+    for _ in range(10):  # Bounded: a cursor that fails to advance must fail, not hang
+        params = {"user_id": 3, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = test_app_client.get("/bookings", params=params)
+        assert r.status_code == 200
+        page = r.json()
+        assert len(page) <= 2
+        seen.extend(b["id"] for b in page)
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    else:
+        pytest.fail("pagination did not terminate")
+
+    # Newest first; created_at ties are broken by id
+    assert seen == sorted(ids, reverse=True)
+
+    assert test_app_client.get("/bookings", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert test_app_client.get("/bookings", params={"limit": 0}).status_code == 422
+
+
+def _sse_data(frame: str) -> tuple[str, dict]:
+    event_line, data_line = frame.strip().split("\n")
+    return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+
+def test_seat_stream_sends_snapshot_then_deltas(test_app_client: TestClient):
+    from useage.booking_service import open_seat_stream
+
+    test_app_client.post("/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [1]})
+
+    async def scenario():
+        db = next(test_app_client.app.dependency_overrides[get_db]())
+        subscriber = await asyncio.to_thread(open_seat_stream, 1, db, asyncio.get_running_loop())
+        frames = [await subscriber.next_frame(1)]
+        hold = await asyncio.to_thread(test_app_client.post, "/booking-seats/hold", json={"show_id": 1, "seat_numbers": [1, 4, 5]})
+        frames.append(await subscriber.next_frame(1))
+        await asyncio.to_thread(test_app_client.delete, f"/booking-seats/hold/{hold.json()['hold_id']}")
+        frames.append(await subscriber.next_frame(1))
+        frames.append(await subscriber.next_frame(0.05))  # Nothing else happened
+        broker.unsubscribe(subscriber)
+        db.close()
+        return frames
+
+    snapshot, held, released, idle = asyncio.run(scenario())
+    assert _sse_data(snapshot) == ("snapshot", {"show_id": 1, "unavailable": [1]})
+    assert _sse_data(held) == ("delta", {"unavailable": [4, 5], "available": []})
+    assert _sse_data(released) == ("delta", {"unavailable": [], "available": [4, 5]})
+    assert idle == ""
+    assert not broker.has_subscribers(1)
+
+
+def test_seat_stream_unknown_show(test_app_client: TestClient):
+    r = test_app_client.get("/shows/999/booking_seats/stream")
+    assert r.status_code == 404
+
+
+def test_seat_stream_returns_its_session_before_streaming(test_app_client: TestClient):
+    loop = asyncio.new_event_loop()
+    try:
+        subscriber = bookings._open_seat_stream(1, loop)
+        # The snapshot session is closed: nothing stays checked out while the stream is open
+        assert bookings.SessionLocal.kw["bind"].pool.checkedout() == 0
+        broker.unsubscribe(subscriber)
+    finally:
+        loop.close()
+
+
+def test_compile_layout_sections_and_capacity():
+    from useage.layout_service import compile_layout
+
+    layout = compile_layout(1, 24, {"sections": [
+        {"name": "front", "rows": 1, "cols": 10},
+        {"name": "recliner", "rows": [6, 8, 8]},
+    ]})
+    assert [(r.section, r.row, r.first_seat, r.last_seat) for r in layout.rows] == [
+        ("front", 1, 1, 10), ("recliner", 1, 11, 16), ("recliner", 2, 17, 24),
+    ]  # Truncated at total_seats
+    assert compile_layout(1, 10, {}).rows[-1].last_seat == 10  # Near-square fallback
+
+
+def test_best_available_hold_is_all_or_nothing(test_app_client: TestClient):
+    first = test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 3}).json()
+    test_app_client.delete(f"/booking-seats/hold/{first['hold_id']}")
+
+    # A hold the seat map hasn't caught up with takes one of the seats the picker will choose
+    taken = first["held_seat_numbers"][1]
+    hold_store.hold(1, [taken], is_free=lambda seat: True, ttl_seconds=float("inf"), now=0)
+    r = test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 3})
+    assert r.status_code == 409
+    assert hold_store.held_seats(1) == [taken]  # The other two picked seats were not left held
+
+    hold_store.hold(1, list(range(1, 101)), is_free=lambda seat: True, ttl_seconds=float("inf"), now=0)
+    r = test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 3})
+    assert r.status_code == 409  # Nothing could be held at all
+
+
+def test_best_available_prefers_contiguous_central_blocks():
+    from useage.layout_service import best_available, compile_layout
+
+    layout = compile_layout(1, 30, {"rows": 3, "cols": 10})  # Sweet spot is the middle row
+    assert best_available(layout, [], 4) == [14, 15, 16, 17]
+    assert best_available(layout, [], 2, preferred_row=1) == [5, 6]
+    # Middle row broken up: the next best row still has a contiguous block
+    assert best_available(layout, [13, 16, 19], 4) == [24, 25, 26, 27]
+    # Nothing contiguous anywhere: split across rows, or refuse
+    taken = [3, 6, 9, 13, 16, 19, 23, 26, 29]
+    assert best_available(layout, taken, 4, allow_split=False) is None
+    assert len(best_available(layout, taken, 4)) == 4
+    assert best_available(layout, list(range(1, 30)), 2) is None
+
+
+def test_best_available_is_fast_on_large_screens():
+    import time as _time
+    from useage.layout_service import best_available, compile_layout
+
+    layout = compile_layout(1, 1200, {"rows": 30, "cols": 40})
+    unavailable = [n for n in range(1, 1201) if n % 7 == 0]
+    started = _time.perf_counter()
+    for _ in range(100):
+        seats = best_available(layout, unavailable, 6)
+    assert (_time.perf_counter() - started) / 100 < 0.001
+    assert len(seats) == 6 and seats == list(range(seats[0], seats[0] + 6))
+
+
+def test_hold_best_available_endpoint(test_app_client: TestClient):
+    r = test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 3})
+    assert r.status_code == 201, r.text
+    assert r.json()["held_seat_numbers"] == [64, 65, 66]  # 10x10 grid, sweet spot row 7
+    again = test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 3})
+    assert not set(again.json()["held_seat_numbers"]) & {64, 65, 66}
+
+    assert test_app_client.post(
+        "/booking-seats/hold/best-available", json={"show_id": 1, "count": 2, "section": "balcony"}
+    ).status_code == 400
+    assert test_app_client.post("/booking-seats/hold/best-available", json={"show_id": 1, "count": 11}).status_code == 400
+
+
+def test_layout_index_locates_and_validates_seats():
+    from useage.layout_service import SeatLocation, compile_layout
+
+    layout = compile_layout(1, 18, {"sections": [
+        {"name": "front", "rows": 1, "cols": 8},
+        {"name": "gold", "category": "premium", "rows": [6, 6]},
+    ]})
+    assert layout.capacity == 18
+    assert layout.locate(10) == SeatLocation("gold", 1, 2, "premium")
+    assert layout.locate(18) == SeatLocation("gold", 2, 4, "premium")
+    assert layout.locate(19) is None
+    assert layout.invalid_seats([0, 1, 18, 19]) == [0, 19]
+
+
+def test_seat_validation_follows_the_screen_layout_and_its_changes(test_app_client: TestClient):
+    assert test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [95]}).status_code == 201
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    screen = db.get(Screen, 1)
+    screen.layout_config = {"rows": 9, "cols": 10}  # 90 seats laid out of total_seats=100
+    db.commit()
+    db.close()
+
+    r = test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [91]})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Seat numbers out of range 1-90: 91"
+
+
+def test_expire_pending_bookings_releases_seats_in_batches(test_app_client: TestClient):
+    from datetime import datetime, timedelta, timezone
+    from useage.booking_service import expire_pending_bookings
+
+    stale = [
+        test_app_client.post("/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [n, n + 1]}).json()
+        for n in (1, 3, 5)
+    ]
+    fresh = test_app_client.post("/checkout", json={"show_id": 1, "user_id": 2, "seat_numbers": [9]}).json()
+    db = next(test_app_client.app.dependency_overrides[get_db]())
+    for checkout in stale:
+        db.get(Booking, checkout["booking"]["id"]).created_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=1)
+    db.commit()
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [1, 2, 3, 4, 5, 6, 9]
+
+    assert expire_pending_bookings(db, batch_size=2) == 3
+    assert expire_pending_bookings(db) == 0
+    statuses = {b.id: b.booking_status for b in db.query(Booking).populate_existing()}
+    db.close()
+    assert [statuses[c["booking"]["id"]] for c in stale] == ["expired"] * 3
+    assert statuses[fresh["booking"]["id"]] == "pending_payment"
+    assert test_app_client.get("/shows/1/booking_seats").json()["unavailable_seat_numbers"] == [9]
+    assert _available_seats(test_app_client) == 99
+
+
+def test_admission_queue_gates_seat_paths(test_app_client: TestClient, monkeypatch):
+    import time as _time
+    from routers import admission
+    from useage.admission_service import admission_queue, get_ticket_status, settings as admission_settings
+
+    test_app_client.app.include_router(admission.router)
+    admission_queue.clear()
+    hold = {"show_id": 1, "seat_numbers": [1]}
+    assert test_app_client.post("/shows/1/admission").json() == {
+        "token": None, "admitted": True, "position": 0, "estimated_wait_seconds": 0,
+    }  # Disabled by default: nobody waits
+    assert test_app_client.post("/booking-seats/hold", json=hold).status_code == 201
+
+    monkeypatch.setattr(admission_settings, "admission_enabled", True)
+    monkeypatch.setattr(admission_settings, "admission_rate_per_second", 0.5)
+    first = test_app_client.post("/shows/1/admission").json()
+    second = test_app_client.post("/shows/1/admission").json()
+    assert first["admitted"] and first["position"] == 0
+    assert not second["admitted"] and second["position"] == 1 and second["estimated_wait_seconds"] == 2
+
+    assert test_app_client.post("/booking-seats/hold", json={"show_id": 1, "seat_numbers": [2]}).status_code == 429
+    waiting = test_app_client.post(
+        "/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [2]}, headers={"X-Admission-Token": second["token"]}
+    )
+    assert waiting.status_code == 429 and waiting.headers["Retry-After"] == "2"
+    admitted = test_app_client.post(
+        "/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [2]}, headers={"X-Admission-Token": first["token"]}
+    )
+    assert admitted.status_code == 201
+    assert get_ticket_status(second["token"], now=_time.time() + 3)["admitted"]
+    assert test_app_client.get("/admission/nope").status_code == 404
+
+    # Unknown shows get no waiting room, and nothing is remembered for them
+    from useage import admission_service
+    assert test_app_client.post("/shows/999/admission").status_code == 404
+    assert 999 not in admission_service._show_movies
+    assert "show:999" not in admission_queue._next_slot
+    # A queue whose next slot has passed is dropped by the next join
+    assert "show:1" in admission_queue._next_slot
+    admission_queue.join("show:2", now=_time.time() + 60)
+    assert set(admission_queue._next_slot) == {"show:2"}
+    admission_queue.clear()
+
+
+def test_show_locks_record_wait_times_per_show():
+    import threading as _threading
+    import time as _time
+    from useage.lock_manager import ShardedLockManager
+
+    locks = ShardedLockManager(shards=4, max_keys=lambda: 100)
+    entered = _threading.Event()
+
+    def slow_writer():
+        with locks.hold(7):
+            entered.set()
+            _time.sleep(0.05)
+
+    writer = _threading.Thread(target=slow_writer)
+    writer.start()
+    entered.wait()
+    with locks.hold(8):
+        pass  # Other shows never queue behind show 7
+    with locks.hold(7):
+        pass
+    writer.join()
+
+    stats = locks.stats()
+    assert stats["acquisitions"] == 3 and stats["contended"] == 1
+    hottest = stats["hottest"][0]
+    assert hottest["key"] == 7 and hottest["contended"] == 1
+    assert hottest["wait_seconds_max"] >= 0.03
+    assert {h["key"]: h["contended"] for h in stats["hottest"]}[8] == 0
+
+
+def test_lock_metrics_endpoint(test_app_client: TestClient):
+    from routers import metrics
+
+    test_app_client.app.include_router(metrics.router)
+    test_app_client.post("/checkout", json={"show_id": 1, "user_id": 1, "seat_numbers": [1]})
+    body = test_app_client.get("/metrics/locks").json()
+    assert body["acquisitions"] >= 1
+    assert body["hottest"][0]["key"] == 1
@@ -16,6 +16,7 @@ if str(SERVER_DIR) not in sys.path:
 from server.routers import cities, search, bookings  # noqa: E402
 from app import schemas  # noqa: E402
 from app.db import get_db  # noqa: E402
+from app.catalog_versions import response_cache  # noqa: E402
 
 
 # ---------- Fakes ----------
@@ -57,6 +58,7 @@ class FakeSession:
 
 @pytest.fixture()
 def app_client_cities():
+    response_cache.clear()  # Encoded catalog responses outlive a test's fake session
     app = FastAPI()
 
     # seed two fake cities (instances compatible with schemas)
@@ -93,6 +95,7 @@ def test_list_cities_success(app_client_cities: TestClient):
 
 @pytest.fixture()
 def app_client_cities_error():
+    response_cache.clear()
     app = FastAPI()
 
     class CityObj:
@@ -187,3 +190,51 @@ def test_get_db_generator_executes():
     # run the finally block
     with pytest.raises(StopIteration):
         next(gen)
+
+
+def test_search_uses_trigram_index_and_follows_commits():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base, City, CityNowPlaying, Movie, Screen, Show, ShowListing, Theater
+    from useage.search_service import search_index
+
+    search_index.clear()
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[
+        City.__table__, Movie.__table__, Theater.__table__, Screen.__table__, Show.__table__,
+        CityNowPlaying.__table__, ShowListing.__table__,
+    ])
+    with Session(engine) as db:
+        db.add_all([
+            City(id=1, name="Pune", country="IN"),
+            Movie(id=1, title="Interstellar", duration_minutes=169, language="EN"),
+            Movie(id=2, title="Inter", duration_minutes=90, language="EN"),
+            Movie(id=3, title="Winter Sleep", duration_minutes=196, language="TR"),
+            Theater(id=1, name="Cinema Hall One", address="Winter Road", city_id=1),
+            Theater(id=2, name="Inter Plex", address="MG Road", city_id=1),
+            Theater(id=3, name="Inter Closed", address="MG Road", city_id=1, is_active=False),
+        ])
+        db.commit()
+
+    app = FastAPI()
+    app.dependency_overrides[get_db] = lambda: sessionmaker(bind=engine)()
+    app.include_router(search.router)
+    with TestClient(app) as client:
+        body = client.get("/search", params={"q": "INTER", "city_id": 1}).json()
+        assert [m["title"] for m in body["movies"]] == ["Inter", "Interstellar", "Winter Sleep"]  # Shortest first, then id
+        assert [t["name"] for t in body["theaters"]] == ["Inter Plex", "Cinema Hall One"]  # Name or address
+
+        with Session(engine) as db:
+            db.get(Movie, 2).title = "Outer"
+            db.add(Movie(id=4, title="Intern", duration_minutes=121, language="EN"))
+            db.get(Theater, 2).is_active = False
+            db.commit()
+            db.add(Movie(id=5, title="Interlude", duration_minutes=100, language="EN"))
+            db.flush()
+            db.rollback()  # Never committed, never indexed
+        body = client.get("/search", params={"q": "inter", "city_id": 1, "limit_movies": 10}).json()
+        assert [m["title"] for m in body["movies"]] == ["Intern", "Interstellar", "Winter Sleep"]
+        assert [t["name"] for t in body["theaters"]] == ["Cinema Hall One"]
+    assert search_index.movies is not None
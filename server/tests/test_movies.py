@@ -1,5 +1,6 @@
 import os
 import sys
+from datetime import timedelta
 from pathlib import Path
 import pytest
 from fastapi import FastAPI
@@ -15,6 +16,7 @@ if str(SERVER_DIR) not in sys.path:
 
 from server.routers import movies
 from app import schemas
+from app.catalog_versions import catalog_versions, response_cache
 
 
 class FakeUser:
@@ -96,6 +98,7 @@ class FakeSession:
 
 @pytest.fixture()
 def test_app_client():
+    response_cache.clear()  # Encoded catalog responses outlive a test's fake session
     app = FastAPI()
 
     fake_db = FakeSession()
@@ -171,7 +174,7 @@ def test_get_movie_by_id_and_404(test_app_client: TestClient):
     assert r_missing.json().get("detail") == "Movie not found"
 
 
-def test_list_playing_movies_by_city(test_app_client: TestClient):
+def test_list_playing_movies_by_city(test_app_client: TestClient, monkeypatch):
     # Create some movies to exist in storage
     test_app_client.post("/movies", json=sample_movie_payload(title="Playable 1"))
     test_app_client.post("/movies", json=sample_movie_payload(title="Playable 2"))
@@ -213,3 +216,89 @@ def test_list_playing_movies_by_city(test_app_client: TestClient):
     assert r.status_code == 200
     data = r.json()
     assert {m["title"] for m in data} == {"Playable 1", "Playable 2"}
+
+    # The list depends on the day as well, so yesterday's tag must not get a 304 today
+    etag = r.headers["ETag"]
+    assert test_app_client.get("/movies/playing", params={"city_id": 1}, headers={"If-None-Match": etag}).status_code == 304
+    real_date = movies.date
+
+    class Tomorrow(real_date):
+        @classmethod
+        def today(cls):
+            return real_date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(movies, "date", Tomorrow)
+    r = test_app_client.get("/movies/playing", params={"city_id": 1}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_list_movies_serves_cached_bytes_until_movies_change(test_app_client: TestClient):
+    fake_db = test_app_client.fake_db  # type: ignore[attr-defined]
+    test_app_client.post("/movies", json=sample_movie_payload(title="Cached"))
+    first = test_app_client.get("/movies")
+
+    fake_db._movies.append(fake_db._movies[0])  # Not a committed ORM write: version unchanged
+    second = test_app_client.get("/movies")
+    assert second.content == first.content
+    assert response_cache.stats()["hits"] == 1
+
+    catalog_versions.bump("movies")  # What committing a Movie write does
+    third = test_app_client.get("/movies")
+    assert len(third.json()) == 2
+    assert third.headers["ETag"] != first.headers["ETag"]
+
+
+def test_now_playing_index_follows_show_screen_and_theater_writes():
+    from datetime import date, time, timedelta
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base, City, CityNowPlaying, Movie, Screen, Show, ShowListing, Theater
+    from useage.now_playing_service import playing_movies
+
+    engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[
+        City.__table__, Movie.__table__, Theater.__table__, Screen.__table__, Show.__table__,
+        CityNowPlaying.__table__, ShowListing.__table__,
+    ])
+    today = date.today()
+    with Session(engine) as db:
+        db.add_all([
+            City(id=1, name="Pune", country="IN"),
+            Movie(id=1, title="Soon", duration_minutes=100, language="EN"),
+            Movie(id=2, title="Gone", duration_minutes=100, language="EN"),
+            Theater(id=1, name="T", address="A", city_id=1, is_active=True),
+            Screen(id=1, theater_id=1, name="S", total_seats=10, layout_config={}),
+        ])
+        db.commit()
+        db.add_all([
+            Show(id=1, movie_id=1, screen_id=1, show_date=today + timedelta(days=2), show_time=time(18), base_price=100, available_seats=10),
+            Show(id=2, movie_id=1, screen_id=1, show_date=today, show_time=time(18), base_price=100, available_seats=10),
+            Show(id=3, movie_id=2, screen_id=1, show_date=today - timedelta(days=1), show_time=time(18), base_price=100, available_seats=10),
+        ])
+        db.commit()
+        assert [m.title for m in playing_movies(1, db)] == ["Soon"]  # Past-only movies drop out
+        assert db.get(CityNowPlaying, (1, 1)).last_show_date == today + timedelta(days=2)
+
+        db.delete(db.get(Show, 1))
+        db.commit()
+        assert db.get(CityNowPlaying, (1, 1)).last_show_date == today
+
+        db.get(Show, 2).available_seats = 9  # Seat counter churn leaves the index alone
+        db.get(Theater, 1).is_active = False
+        db.commit()
+        assert playing_movies(1, db) == []
+        db.get(Theater, 1).is_active = True
+        db.commit()
+        assert [m.title for m in playing_movies(1, db)] == ["Soon"]
+
+        # A screen moved to a theater in another city takes its movies along
+        db.add_all([City(id=2, name="Mumbai", country="IN"), Theater(id=2, name="U", address="B", city_id=2, is_active=True)])
+        db.commit()
+        db.get(Screen, 1).theater_id = 2
+        db.commit()
+        assert playing_movies(1, db) == []
+        assert [m.title for m in playing_movies(2, db)] == ["Soon"]
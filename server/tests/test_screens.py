@@ -13,7 +13,13 @@ SERVER_DIR = Path(__file__).resolve().parents[1]
 if str(SERVER_DIR) not in sys.path:
     sys.path.insert(0, str(SERVER_DIR))
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
 from server.routers import screens
+from app.models import Base, City, Screen, Theater
+from useage.layout_service import reset_layouts
 
 
 class FakeScreen:
@@ -57,6 +63,7 @@ class FakeSession:
 
 @pytest.fixture()
 def test_app_client():
+    reset_layouts()  # Compiled layouts are cached per screen id across tests
     app = FastAPI()
     fake_db = FakeSession()
 
@@ -102,3 +109,46 @@ def test_get_screen_by_id_and_404(test_app_client: TestClient):
     r_missing = test_app_client.get("/screens/9999")
     assert r_missing.status_code == 404
     assert r_missing.json().get("detail") == "Screen not found"
+
+
+def test_get_screen_layout_compiles_sections(test_app_client: TestClient):
+    fake_db = test_app_client.fake_db  # type: ignore[attr-defined]
+    fake_db._screens.append(FakeScreen(id=5, theater_id=1, total_seats=26, layout_config={"sections": [
+        {"name": "classic", "rows": 2, "cols": 8},
+        {"name": "prime", "category": "recliner", "rows": [5, 5]},
+    ]}))
+
+    r = test_app_client.get("/screens/5/layout")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["capacity"] == 26
+    assert [(row["section"], row["row"], row["first_seat"], row["last_seat"], row["category"]) for row in body["rows"]] == [
+        ("classic", 1, 1, 8, "standard"),
+        ("classic", 2, 9, 16, "standard"),
+        ("prime", 1, 17, 21, "recliner"),
+        ("prime", 2, 22, 26, "recliner"),
+    ]
+    assert test_app_client.get("/screens/9999/layout").status_code == 404
+
+
+def test_screen_reads_answer_304_until_a_screen_change_is_committed(test_app_client: TestClient):
+    fake_db = test_app_client.fake_db  # type: ignore[attr-defined]
+    fake_db._screens.append(FakeScreen(id=10, theater_id=1, name="Main"))
+
+    r = test_app_client.get("/screens/10")
+    etag = r.headers["ETag"]
+    r = test_app_client.get("/screens/10", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert test_app_client.get("/theaters/1/screens", headers={"If-None-Match": etag}).status_code == 304
+
+    # A committed Screen write through a real session moves the version
+    engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[City.__table__, Theater.__table__, Screen.__table__])
+    with Session(engine) as db:
+        db.add(Screen(id=1, theater_id=1, name="New", total_seats=10, layout_config={}))
+        db.flush()
+        assert test_app_client.get("/screens/10", headers={"If-None-Match": etag}).status_code == 304
+        db.commit()
+    r = test_app_client.get("/screens/10", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["name"] == "Main"
+    assert r.headers["ETag"] != etag
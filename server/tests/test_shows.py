@@ -45,8 +45,8 @@ class FakeQuery:
         return data[0] if data else None
 
     def all(self):
-        if self.model.__name__ == "Show":
-            # Compute filtering used by get_movie_shows
+        if self.model.__name__ in ("Show", "ShowListing"):
+            # Compute filtering used by get_movie_shows (listings mirror shows at active theaters)
             target_date = self.db._forced_date or dt_date.today()
             city_id = self.db._forced_city_id
             theater_filter = self.db._forced_theater_id
@@ -240,6 +240,7 @@ def test_app_client():
     class CurrentUser:
         def __init__(self, user_id: int):
             self.id = user_id
+            self.admin_theaters = None  # No token claims: authorization goes through memberships
 
     # Default current user is manager (authorized)
     def override_get_current_user_manager():
@@ -394,3 +395,105 @@ def test_list_movie_shows_filters_by_city_date_and_theater_and_orders_by_time(te
     assert r_tom.status_code == 200
     data_tom = r_tom.json()
     assert len(data_tom) == 1
+
+
+def test_show_listings_follow_show_seat_and_theater_writes():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base, CityNowPlaying, ShowListing
+    from useage.booking_service import _return_available_seats, _take_available_seats
+    from useage.show_service import get_movie_shows
+
+    engine = create_engine("sqlite+pysqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[
+        City.__table__, Theater.__table__, Screen.__table__, Show.__table__, CityNowPlaying.__table__, ShowListing.__table__,
+    ])
+    day = dt_date(2030, 1, 1)
+    with Session(engine) as db:
+        db.add_all([
+            City(id=1, name="Pune", country="IN"),
+            Theater(id=1, name="T", address="A", city_id=1, is_active=True),
+            Screen(id=1, theater_id=1, name="S", total_seats=50, layout_config={}),
+        ])
+        db.commit()
+        db.add_all([
+            Show(id=1, movie_id=7, screen_id=1, show_date=day, show_time=dt_time(21), base_price=200, available_seats=50),
+            Show(id=2, movie_id=7, screen_id=1, show_date=day, show_time=dt_time(18), base_price=150, available_seats=50),
+        ])
+        db.commit()
+        listed = get_movie_shows(7, 1, day, None, db)
+        assert [(s.id, s.theater_id) for s in listed] == [(2, 1), (1, 1)]  # Time order from the index
+
+        _take_available_seats(1, 5, db)  # Core UPDATE path used by bookings
+        db.commit()
+        _return_available_seats(1, 2, db)
+        db.get(Show, 2).base_price = 175
+        db.commit()
+        db.expire_all()
+        assert [(s.available_seats, float(s.base_price)) for s in get_movie_shows(7, 1, day, None, db)] == [(50, 175.0), (47, 200.0)]
+
+        db.get(Theater, 1).is_active = False
+        db.commit()
+        assert get_movie_shows(7, 1, day, None, db) == []
+        db.get(Theater, 1).is_active = True
+        db.delete(db.get(Show, 2))
+        db.commit()
+        assert [s.id for s in get_movie_shows(7, 1, day, None, db)] == [1]
+
+        # Moving the screen to a theater in another city moves its listings along
+        db.add_all([City(id=2, name="Mumbai", country="IN"), Theater(id=2, name="U", address="B", city_id=2, is_active=True)])
+        db.commit()
+        db.get(Screen, 1).theater_id = 2
+        db.commit()
+        assert get_movie_shows(7, 1, day, None, db) == []
+        assert [(s.id, s.theater_id) for s in get_movie_shows(7, 2, day, None, db)] == [(1, 2)]
+
+
+def test_showtime_matrix_groups_days_theaters_and_screens():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base, CityNowPlaying, ShowListing
+
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[
+        City.__table__, Theater.__table__, Screen.__table__, Show.__table__, CityNowPlaying.__table__, ShowListing.__table__,
+    ])
+    day = dt_date(2030, 1, 1)
+    with Session(engine) as db:
+        db.add_all([
+            City(id=1, name="Pune", country="IN"),
+            Theater(id=1, name="Alpha", address="A", city_id=1, is_active=True),
+            Theater(id=2, name="Beta", address="B", city_id=1, is_active=True),
+            Screen(id=1, theater_id=1, name="Audi 1", total_seats=100, layout_config={}),
+            Screen(id=2, theater_id=2, name="Audi 1", screen_type="IMAX", total_seats=10, layout_config={}),
+        ])
+        db.commit()
+        db.add_all([
+            Show(id=1, movie_id=7, screen_id=1, show_date=day, show_time=dt_time(21), base_price=200, available_seats=100),
+            Show(id=2, movie_id=7, screen_id=2, show_date=day, show_time=dt_time(10), base_price=300, available_seats=0),
+            Show(id=3, movie_id=7, screen_id=1, show_date=day, show_time=dt_time(12), base_price=200, available_seats=35),
+            Show(id=4, movie_id=7, screen_id=1, show_date=day + timedelta(days=2), show_time=dt_time(12), base_price=200, available_seats=100),
+            Show(id=5, movie_id=7, screen_id=1, show_date=day + timedelta(days=5), show_time=dt_time(12), base_price=200, available_seats=100),
+            Show(id=6, movie_id=8, screen_id=1, show_date=day, show_time=dt_time(15), base_price=200, available_seats=100),
+        ])
+        db.commit()
+
+    app = FastAPI()
+    app.dependency_overrides[get_db] = lambda: sessionmaker(bind=engine)()
+    app.include_router(shows.router)
+    with TestClient(app) as client:
+        r = client.get("/movies/7/showtimes", params={"city_id": 1, "start_date": day.isoformat(), "days": 3})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [d["date"] for d in body["days"]] == ["2030-01-01", "2030-01-02", "2030-01-03"]
+    first = body["days"][0]["theaters"]
+    assert [(t["name"], [s["screen_id"] for s in t["screens"]]) for t in first] == [("Beta", [2]), ("Alpha", [1])]
+    assert first[0]["screens"][0]["shows"][0]["availability"] == "sold_out"
+    alpha_shows = first[1]["screens"][0]["shows"]
+    assert [(s["id"], s["fill_ratio"], s["availability"]) for s in alpha_shows] == [(3, 0.65, "filling_fast"), (1, 0.0, "available")]
+    assert body["days"][1]["theaters"] == []
+    assert [s["id"] for s in body["days"][2]["theaters"][0]["screens"][0]["shows"]] == [4]
@@ -151,3 +151,57 @@ def test_list_theaters_filtered_by_movie_id(test_app_client: TestClient):
     data = r.json()
     assert [t["id"] for t in data] == [10, 20]
     assert {t["name"] for t in data} == {"Alpha", "Beta"}
+
+
+def test_list_theaters_nearest_first_from_city_grid():
+    from datetime import date, time
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.catalog_versions import catalog_versions
+    from app.db import get_db
+    from app.models import Base, City, CityNowPlaying, Screen, Show, ShowListing, Theater
+    from useage.theater_geo_service import reset_theater_grids
+
+    reset_theater_grids()
+    engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[
+        City.__table__, Theater.__table__, Screen.__table__, Show.__table__, CityNowPlaying.__table__, ShowListing.__table__,
+    ])
+    with Session(engine) as db:
+        db.add_all([
+            City(id=1, name="Pune", country="IN"),
+            Theater(id=1, name="Far", address="A", city_id=1, latitude=18.60, longitude=73.90),
+            Theater(id=2, name="Near", address="B", city_id=1, latitude=18.521, longitude=73.857),
+            Theater(id=3, name="Mid", address="C", city_id=1, latitude=18.55, longitude=73.80),
+            Theater(id=4, name="Closed", address="D", city_id=1, latitude=18.52, longitude=73.856, is_active=False),
+            Theater(id=5, name="Unmapped", address="E", city_id=1),
+            ShowListing(id=1, movie_id=9, city_id=1, theater_id=1, screen_id=1, show_date=date(2030, 1, 1),
+                        show_time=time(18), base_price=100, available_seats=10),
+        ])
+        db.commit()
+
+    app = FastAPI()
+    app.dependency_overrides[get_db] = lambda: sessionmaker(bind=engine)()
+    app.include_router(theaters.router)
+    here = {"city_id": 1, "latitude": 18.5204, "longitude": 73.8567}
+    with TestClient(app) as client:
+        r = client.get("/theaters", params={**here, "limit": 2})
+        assert r.status_code == 200, r.text
+        assert [t["name"] for t in r.json()] == ["Near", "Mid"]
+        assert r.json()[0]["distance_km"] < 0.2
+
+        r = client.get("/theaters", params={**here, "movie_id": 9})
+        assert [t["name"] for t in r.json()] == ["Far"]
+
+        with Session(engine) as db:
+            db.get(Theater, 2).is_active = False
+            db.commit()  # Moves the theaters version, so the grid is rebuilt
+        r = client.get("/theaters", params={**here, "limit": 2})
+        assert [t["name"] for t in r.json()] == ["Mid", "Far"]
+
+        r = client.get("/theaters", params={"city_id": 1, "latitude": 18.5204})
+        assert r.status_code == 422  # Half a location can't be ranked
+    assert catalog_versions.get("theaters") > 0
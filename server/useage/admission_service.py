@@ -0,0 +1,131 @@
+import math
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models import Show
+from useage.booking_errors import ShowNotFoundError
+
+
+class AdmissionRequiredError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class QueueTicket:
+    token: str
+    queue_key: str
+    admit_at: float  # Epoch seconds when the holder may enter
+    expires_at: float  # Admission lapses after this
+
+
+class AdmissionQueue:
+    """Virtual waiting room: per-queue FIFO admission at a fixed rate.
+
+    Joining reserves the next admission slot, `1 / rate` seconds after the previous one,
+    so position and wait are known up front and nothing has to tick in the background.
+    Tickets are kept in an LRU-capped TTL cache and checked without touching the database.
+    A queue whose next slot has already passed is forgotten: it would admit at once anyway.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}  # queue key -> time the next joiner is admitted
+        self._tickets = TTLCache(maxsize=settings.admission_max_tickets, ttl_seconds=0)
+
+    def join(self, queue_key: str, now: float) -> QueueTicket:
+        interval = 1.0 / settings.admission_rate_per_second
+        with self._lock:
+            for key in [k for k, slot in self._next_slot.items() if slot <= now]:
+                del self._next_slot[key]
+            admit_at = max(now, self._next_slot.get(queue_key, now))
+            if (admit_at - now) / interval >= settings.admission_max_queue:
+                raise QueueFullError("Waiting room is full; try again shortly")
+            self._next_slot[queue_key] = admit_at + interval
+        ticket = QueueTicket(
+            token=secrets.token_urlsafe(16),
+            queue_key=queue_key,
+            admit_at=admit_at,
+            expires_at=admit_at + settings.admission_pass_ttl_seconds,
+        )
+        self._tickets.set(ticket.token, ticket, ttl_seconds=ticket.expires_at - now)
+        return ticket
+
+    def get(self, token: str) -> QueueTicket | None:
+        return self._tickets.get(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._next_slot.clear()
+        self._tickets.clear()
+
+
+admission_queue = AdmissionQueue()
+_show_movies: dict[int, int] = {}  # show_id -> movie_id of shows that exist; misses are not cached
+
+
+def _show_movie(show_id: int, db: Session) -> int:
+    movie_id = _show_movies.get(show_id)
+    if movie_id is None:
+        show = db.get(Show, show_id)
+        if not show:
+            raise ShowNotFoundError("Show not found")
+        movie_id = _show_movies[show_id] = show.movie_id
+    return movie_id
+
+
+def queue_key_for(show_id: int, db: Session) -> str:
+    """Waiting room of a show, or of its movie when admission is scoped per movie."""
+    movie_id = _show_movie(show_id, db)
+    return f"movie:{movie_id}" if settings.admission_scope == "movie" else f"show:{show_id}"
+
+
+def join_queue(show_id: int, db: Session, now: float | None = None) -> dict:
+    """Take a place in the show's (or its movie's) waiting room."""
+    if not settings.admission_enabled:
+        return {"token": None, "admitted": True, "position": 0, "estimated_wait_seconds": 0}
+    now = time.time() if now is None else now
+    ticket = admission_queue.join(queue_key_for(show_id, db), now)  # Unknown shows raise before a slot is taken
+    return ticket_status(ticket, now)
+
+
+def ticket_status(ticket: QueueTicket, now: float) -> dict:
+    wait = max(0.0, ticket.admit_at - now)
+    return {
+        "token": ticket.token,
+        "admitted": wait == 0,
+        "position": math.ceil(wait * settings.admission_rate_per_second),
+        "estimated_wait_seconds": math.ceil(wait),
+    }
+
+
+def get_ticket_status(token: str, now: float | None = None) -> dict | None:
+    ticket = admission_queue.get(token)
+    if ticket is None:
+        return None
+    return ticket_status(ticket, time.time() if now is None else now)
+
+
+def require_admission(show_id: int, token: str | None, db: Session, now: float | None = None) -> None:
+    """Let a request into the seat selection / checkout paths only with an admitted ticket."""
+    if not settings.admission_enabled:
+        return
+    ticket = admission_queue.get(token) if token else None
+    if ticket is None:
+        raise AdmissionRequiredError("Join the waiting room for this show first", retry_after=0)
+    if ticket.queue_key != queue_key_for(show_id, db):
+        raise AdmissionRequiredError("Admission token is for a different show", retry_after=0)
+    wait = ticket.admit_at - (time.time() if now is None else now)
+    if wait > 0:
+        raise AdmissionRequiredError("Still waiting for admission", retry_after=math.ceil(wait))
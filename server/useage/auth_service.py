@@ -1,11 +1,20 @@
 import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from app import schemas
 
+from app.cache import TTLCache
+from app.config import settings
 from app.models import TheaterUserMembership, User
 from app.security import (
-    hash_password,
-    verify_password,
+    PasswordHashBusyError,
+    password_hash_pool,
     create_access_token,
     decode_access_token,
 )
@@ -30,31 +39,140 @@ class UserNotFoundError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Immutable snapshot of the token's user; safe to share across requests and sessions."""
+
+    id: int
+    email: str
+    phone: str | None
+    first_name: str
+    last_name: str
+    created_at: datetime | None = None
+    # Theater ids the user administers, from current token claims; None means unknown
+    # (no claims, or claims older than the user's claims_version) and callers must query
+    admin_theaters: frozenset[int] | None = None
+
+    @classmethod
+    def from_user(cls, user: User, token_data: dict | None = None) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            phone=user.phone,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            created_at=user.created_at,
+            admin_theaters=_admin_theaters_from_claims(token_data or {}, user.claims_version),
+        )
+
+
+def _admin_theaters_from_claims(token_data: dict, claims_version: int) -> frozenset[int] | None:
+    claims = token_data.get("adm")
+    if token_data.get("cv") != claims_version or not isinstance(claims, list):
+        return None  # Missing or stale: memberships changed since the token was issued
+    return frozenset(int(theater_id) for theater_id, _role in claims)
+
+
+class TokenUserCache:
+    """Verified token -> user snapshot, so authenticated requests skip decode and the user query.
+
+    Entries live until the token's `exp` or the cache TTL, whichever comes first. Changing
+    a user bumps their version, which invalidates every cached token of theirs in O(1).
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> AuthenticatedUser | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        version, user = entry
+        if self._versions.get(user.id, 0) != version:
+            self._entries.pop(token)
+            return None
+        return user
+
+    def set(self, token: str, user: AuthenticatedUser, expires_at: float | None) -> None:
+        ttl = self._entries.ttl_seconds
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        self._entries.set(token, (self._versions.get(user.id, 0), user), ttl_seconds=ttl)
+
+    def forget_user(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        with self._lock:
+            self._versions.clear()
+
+    def stats(self) -> dict[str, float]:
+        return self._entries.stats()
+
+
+token_user_cache = TokenUserCache(
+    maxsize=settings.auth_token_cache_max_entries,
+    ttl_seconds=settings.auth_token_cache_ttl_seconds,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, user: User) -> None:
+    token_user_cache.forget_user(user.id)
+
+
 def is_user_theater_admin(user_id: int, db: Session) -> bool:
     """
     Returns True if the user has any active theater membership (any role), else False.
     """
-    membership = (
-        db.query(TheaterUserMembership)
+    return bool(theater_admin_claims(user_id, db))
+
+
+def theater_admin_claims(user_id: int, db: Session) -> list[list]:
+    """Compact [[theater_id, role], ...] for the user's active memberships, for token claims."""
+    rows = (
+        db.query(TheaterUserMembership.theater_id, TheaterUserMembership.role)
         .filter(
             TheaterUserMembership.user_id == user_id,
             TheaterUserMembership.is_active == True,
         )
-        .first()
+        .all()
     )
-    return membership is not None
+    return [[theater_id, role] for theater_id, role in rows]
+
+
+def bump_claims_version(user_id: int, db: Session) -> None:
+    """Invalidate the theater-admin claims in the user's existing tokens; the caller commits."""
+    user = db.get(User, user_id)
+    if user is not None:
+        user.claims_version = (user.claims_version or 0) + 1
 
 
-def register_user(user_in: schemas.UserCreate, db: Session) -> User:
+# register_user and login_user are async so no request thread is held while bcrypt runs in
+# the hashing pool; their short database steps still run on the threadpool.
+async def register_user(user_in: schemas.UserCreate, db: Session) -> User:
     """Create and return a new user. Raises 400 if email already exists."""
-    existing = db.query(User).filter(User.email == user_in.email).first()
-    if existing:
+    if await run_in_threadpool(_find_user_by_email, user_in.email, db):
         raise EmailAlreadyRegisteredError("Email already registered")
 
+    password_hash = await password_hash_pool.hash(user_in.password)
+    return await run_in_threadpool(_create_user, user_in, password_hash, db)
+
+
+def _find_user_by_email(email: str, db: Session) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(user_in: schemas.UserCreate, password_hash: str, db: Session) -> User:
     user = User(
         email=user_in.email,
         phone=user_in.phone,
-        password_hash=hash_password(user_in.password),
+        password_hash=password_hash,
         first_name=user_in.first_name,
         last_name=user_in.last_name,
     )
@@ -64,24 +182,38 @@ def register_user(user_in: schemas.UserCreate, db: Session) -> User:
     return user
 
 
-def login_user(credentials: schemas.UserLogin, db: Session) -> schemas.Token:
+async def login_user(credentials: schemas.UserLogin, db: Session) -> schemas.Token:
     """Authenticate user and return Token with is_theater_admin flag. Raises 401 on failure."""
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await run_in_threadpool(_find_user_by_email, credentials.email, db)
     if not user:
         logger.info(f"Login failed: email not found: {credentials.email}")
         raise InvalidCredentialsError("Invalid credentials")
 
-    if not verify_password(credentials.password, user.password_hash):
+    if not await password_hash_pool.verify(credentials.password, user.password_hash):
         logger.info(f"Login failed: password mismatch for user_id={user.id} email={user.email}")
         raise InvalidCredentialsError("Invalid credentials")
 
-    token = create_access_token(subject=user.id)
-    is_admin = is_user_theater_admin(user.id, db)
-    return schemas.Token(access_token=token, is_theater_admin=is_admin)
+    return await run_in_threadpool(_issue_token, user, db)
+
+
+def _issue_token(user: User, db: Session) -> schemas.Token:
+    admin_claims = theater_admin_claims(user.id, db)
+    token = create_access_token(
+        subject=user.id,
+        claims={"adm": admin_claims, "cv": user.claims_version or 0},  # Lets show admin checks skip the membership query
+    )
+    return schemas.Token(access_token=token, is_theater_admin=bool(admin_claims))
 
 
-def get_current_user_from_token(token: str, db: Session) -> User:
-    """Decode token and return the corresponding user or raise 401."""
+def get_current_user_from_token(token: str, db: Session) -> AuthenticatedUser:
+    """Decode token and return a snapshot of the corresponding user or raise 401.
+
+    Verified tokens are cached, so repeat calls cost one dict lookup and no query.
+    """
+    cached = token_user_cache.get(token)
+    if cached is not None:
+        return cached
+
     data = decode_access_token(token)
     if not data or "sub" not in data:
         raise InvalidTokenError("Invalid token")
@@ -89,4 +221,7 @@ def get_current_user_from_token(token: str, db: Session) -> User:
     user = db.get(User, user_id)
     if not user:
         raise UserNotFoundError("User not found")
-    return user
\ No newline at end of file
+    snapshot = AuthenticatedUser.from_user(user, data)
+    exp = data.get("exp")
+    token_user_cache.set(token, snapshot, expires_at=exp if isinstance(exp, int) else None)
+    return snapshot
\ No newline at end of file
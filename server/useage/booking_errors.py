@@ -0,0 +1,17 @@
+"""Domain exceptions shared by the booking and seat hold services."""
+
+
+class ShowNotFoundError(Exception):
+    pass
+
+
+class InvalidSeatNumbersError(Exception):
+    pass
+
+
+class HoldNotFoundError(Exception):
+    pass
+
+
+class NotEnoughFreeSeatsError(Exception):
+    pass
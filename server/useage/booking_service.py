@@ -1,66 +1,227 @@
+import asyncio
+import base64
+import json
 import logging
 import random
 import string
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import schemas
-from app.models import Show, Booking, BookingSeat
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Show, Screen, Booking, BookingSeat, SeatReservation, TheaterUserMembership
+from useage.auth_service import AuthenticatedUser
+from useage.seat_map_service import get_seat_map, peek_seat_map, mark_seats_booked, out_of_range_message, release_seats, show_lock
+from useage.hold_service import expire_holds, release_hold, hold_store
+from useage.seat_events import SeatSubscriber
+from useage.show_listing_service import adjust_available_seats
+from useage.booking_errors import ShowNotFoundError, InvalidSeatNumbersError, HoldNotFoundError
 
 logger = logging.getLogger(__name__)
 
 
-# Domain exceptions
-class ShowNotFoundError(Exception):
+# Domain exceptions (shared ones live in useage.booking_errors)
+class BookingNotFoundError(Exception):
     pass
 
 
-class BookingNotFoundError(Exception):
+class InvalidSeatIdListError(Exception):
     pass
 
 
-class InvalidSeatNumbersError(Exception):
+class SeatsUnavailableError(Exception):
+    def __init__(self, seat_numbers: list[int]):
+        self.seat_numbers = sorted(seat_numbers)
+        super().__init__(f"Seats not available: {', '.join(map(str, self.seat_numbers))}")
+
+
+class NotEnoughSeatsError(Exception):
     pass
 
 
-class InvalidSeatIdListError(Exception):
+class InvalidCursorError(Exception):
     pass
 
 
-def create_booking(payload: schemas.BookingCreate, db: Session) -> Booking:
-    """Create a booking for a show after minimal validations."""
-    show = db.get(Show, payload.show_id)
-    if not show:
-        raise ShowNotFoundError("Show not found")
+class BookingAccessDeniedError(Exception):
+    pass
+
+
+class BookingNotPendingError(Exception):
+    pass
 
-    if not payload.seat_numbers or any(n <= 0 for n in payload.seat_numbers):
-        raise InvalidSeatNumbersError("Invalid seat numbers")
 
-    seat_count = len(set(payload.seat_numbers))
-    final_amount = float(show.base_price) * seat_count
+def _lock_show_row(show_id: int, db: Session) -> None:
+    """Row-lock the show for the rest of the transaction (cross-process seat write guard).
 
+    show_lock() only serializes writers inside this process; SELECT ... FOR UPDATE makes
+    writers in other processes queue on the same show too. No-op on SQLite.
+    """
+    db.execute(select(Show.id).where(Show.id == show_id).with_for_update())
+
+
+def _take_available_seats(show_id: int, count: int, db: Session) -> None:
+    """Decrement the show's seat counter in the current transaction, refusing to go negative."""
+    result = db.execute(
+        update(Show)
+        .where(Show.id == show_id, Show.available_seats >= count)
+        .values(available_seats=Show.available_seats - count)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise NotEnoughSeatsError("Not enough seats available for this show")
+    adjust_available_seats(db.connection(), show_id, -count)
+
+
+def _return_available_seats(show_id: int, count: int, db: Session) -> None:
+    db.execute(
+        update(Show)
+        .where(Show.id == show_id)
+        .values(available_seats=Show.available_seats + count)
+        .execution_options(synchronize_session=False)
+    )
+    adjust_available_seats(db.connection(), show_id, count)
+
+
+def _new_booking_reference() -> str:
     rand = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    booking_ref = f"BMS-{rand}"
+    return f"BMS-{rand}"
+
 
-    booking = Booking(
-        user_id=payload.user_id,
+def _new_booking(show: Show, user_id: int, seat_count: int) -> Booking:
+    return Booking(
+        user_id=user_id,
         booking_type="movie",
         show_id=show.id,
         event_id=None,
-        booking_reference=booking_ref,
-        final_amount=final_amount,
+        booking_reference=_new_booking_reference(),
+        final_amount=float(show.base_price) * seat_count,
         booking_status="pending_payment",
     )
+
+
+def create_booking(payload: schemas.BookingCreate, db: Session) -> Booking:
+    """Create a booking for a show after minimal validations."""
+    show = db.get(Show, payload.show_id)
+    if not show:
+        raise ShowNotFoundError("Show not found")
+
+    if not payload.seat_numbers or any(n <= 0 for n in payload.seat_numbers):
+        raise InvalidSeatNumbersError("Invalid seat numbers")
+    out_of_range = out_of_range_message(show, payload.seat_numbers, db)
+    if out_of_range:
+        raise InvalidSeatNumbersError(out_of_range)
+
+    booking = _new_booking(show, payload.user_id, len(set(payload.seat_numbers)))
     db.add(booking)
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def list_bookings(user_id: int | None, db: Session) -> list[Booking]:
+def _encode_cursor(booking: Booking) -> str:
+    raw = json.dumps([booking.created_at.isoformat(), booking.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, booking_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+
+
+def list_bookings(user_id: int | None, db: Session, limit: int, cursor: str | None = None) -> tuple[list[Booking], str | None]:
+    """Return one page of bookings, newest first, and the cursor for the next page (or None).
+
+    Keyset pagination on (created_at, id) keeps every page an index range scan, however
+    deep the client pages.
+    """
     query = db.query(Booking)
     if user_id is not None:
         query = query.filter(Booking.user_id == user_id)
-    return query.all()
+    if cursor is not None:
+        created_at, booking_id = _decode_cursor(cursor)
+        # Row-value comparison: one range condition on the (created_at, id) index
+        query = query.filter(tuple_(Booking.created_at, Booking.id) < tuple_(created_at, booking_id))
+    rows = query.order_by(Booking.created_at.desc(), Booking.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], _encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def _reserve_seats(show: Show, booking: Booking, seat_numbers: list[int], hold_id: str | None, db: Session) -> BookingSeat:
+    """Reserve seats for a booking and commit, all or nothing.
+
+    `booking` may be new (still pending in the session); it is then written in the same
+    transaction as its seats. Converts the hold `hold_id` if given.
+    """
+    def held_by_other(seat: int) -> bool:
+        holder = hold_store.holder_of(show.id, seat)
+        return holder is not None and holder != hold_id
+
+    expire_holds()
+    seat_map = get_seat_map(show, db)
+    with show_lock(show.id):
+        # Cheap in-process check first: reject obvious conflicts without touching the DB
+        conflicts = [n for n in seat_numbers if n in seat_map.booked or held_by_other(n)]
+        if conflicts:
+            db.rollback()
+            raise SeatsUnavailableError(conflicts)
+
+        if booking.id is not None:
+            # Booking row before show row, as cancel and the sweeper take them. Seats added to
+            # an expired or cancelled booking would never be released again
+            status = db.execute(
+                select(Booking.booking_status).where(Booking.id == booking.id).with_for_update(key_share=True)
+            ).scalar_one()
+            if status != "pending_payment":
+                db.rollback()
+                raise BookingNotPendingError(f"Booking is {status}; seats can only be added while payment is pending")
+        _lock_show_row(show.id, db)
+        db.add(booking)
+        db.flush()  # Assigns booking.id for new bookings
+        booking_seats = BookingSeat(
+            booking_id=booking.id,
+            show_id=show.id,
+            seat_id=seat_numbers,
+        )
+        db.add(booking_seats)
+        db.add_all(
+            SeatReservation(show_id=show.id, seat_number=n, booking_id=booking.id)
+            for n in seat_numbers
+        )
+        try:
+            _take_available_seats(show.id, len(seat_numbers), db)
+        except NotEnoughSeatsError:
+            db.rollback()
+            raise
+        try:
+            db.commit()
+        except IntegrityError:
+            # The unique (show_id, seat_number) index caught a write from another process
+            db.rollback()
+            conflicts = _reserved_among(show.id, seat_numbers, db)
+            if not conflicts:
+                raise  # Some other constraint failed (e.g. a dangling booking reference)
+            mark_seats_booked(show.id, conflicts)  # Catch the map up with what the DB knows
+            raise SeatsUnavailableError(conflicts)
+        mark_seats_booked(show.id, seat_numbers)  # Keep the in-process seat map in sync
+
+    db.refresh(booking_seats)
+    if hold_id:
+        try:
+            release_hold(hold_id)  # Seats are booked now; the hold has served its purpose
+        except HoldNotFoundError:
+            pass
+    return booking_seats
 
 
 def create_booking_seats(payload: schemas.BookingSeatCreate, db: Session) -> BookingSeat:
@@ -74,31 +235,290 @@ def create_booking_seats(payload: schemas.BookingSeatCreate, db: Session) -> Boo
 
     if not payload.seat_id or any((not isinstance(x, int)) or x <= 0 for x in payload.seat_id):
         raise InvalidSeatIdListError("Invalid seat_id list")
+    out_of_range = out_of_range_message(show, payload.seat_id, db)
+    if out_of_range:
+        raise InvalidSeatIdListError(out_of_range)
 
-    booking_seats = BookingSeat(
-        booking_id=payload.booking_id,
-        show_id=payload.show_id,
-        seat_id=list(dict.fromkeys(payload.seat_id)),
-    )
-    db.add(booking_seats)
-    db.commit()
-    db.refresh(booking_seats)
-    return booking_seats
+    return _reserve_seats(show, booking, list(dict.fromkeys(payload.seat_id)), payload.hold_id, db)
 
 
-def get_booking_seats_status(show_id: int, db: Session) -> schemas.BookingSeatsStatusResponse:
-    show = db.get(Show, show_id)
+def checkout(payload: schemas.CheckoutRequest, db: Session) -> schemas.CheckoutOut:
+    """Create a booking and reserve its seats in one transaction.
+
+    Either the booking exists with all its seats, or nothing was written.
+    """
+    show = db.get(Show, payload.show_id)
     if not show:
         raise ShowNotFoundError("Show not found")
 
-    rows = db.query(BookingSeat).filter(BookingSeat.show_id == show_id).all()
-    unavailable: list[int] = []
-    for r in rows:
-        if isinstance(r.seat_id, list):
-            unavailable.extend([n for n in r.seat_id if isinstance(n, int)])
+    if not payload.seat_numbers or any(n <= 0 for n in payload.seat_numbers):
+        raise InvalidSeatNumbersError("Invalid seat numbers")
+    out_of_range = out_of_range_message(show, payload.seat_numbers, db)
+    if out_of_range:
+        raise InvalidSeatNumbersError(out_of_range)
+
+    seat_numbers = list(dict.fromkeys(payload.seat_numbers))
+    booking = _new_booking(show, payload.user_id, len(seat_numbers))
+    booking_seats = _reserve_seats(show, booking, seat_numbers, payload.hold_id, db)
+    db.refresh(booking)
+    return schemas.CheckoutOut(
+        booking=schemas.BookingOut.model_validate(booking),
+        seat_numbers=sorted(booking_seats.seat_id),
+    )
+
+
+def _ensure_can_cancel(booking: Booking, current_user: AuthenticatedUser, db: Session) -> None:
+    """Only the booking's owner, or an admin of the show's theater, may cancel it."""
+    if booking.user_id is not None and booking.user_id == current_user.id:
+        return
+    theater_id = None
+    if booking.show_id is not None:
+        theater_id = (
+            db.query(Screen.theater_id)
+            .join(Show, Show.screen_id == Screen.id)
+            .filter(Show.id == booking.show_id)
+            .scalar()
+        )
+    if theater_id is not None:
+        if current_user.admin_theaters is not None:
+            # Current signed claims from the token: no query needed
+            if theater_id in current_user.admin_theaters:
+                return
+        elif (
+            db.query(TheaterUserMembership.id)
+            .filter(
+                TheaterUserMembership.user_id == current_user.id,
+                TheaterUserMembership.theater_id == theater_id,
+                TheaterUserMembership.is_active == True,
+            )
+            .first()
+        ):
+            return
+    raise BookingAccessDeniedError("Not authorized to cancel this booking")
+
+
+def cancel_booking(booking_id: int, current_user: AuthenticatedUser, db: Session) -> Booking:
+    """Cancel a booking and give its seats back to the show in one transaction."""
+    booking = db.get(Booking, booking_id)
+    if not booking:
+        raise BookingNotFoundError("Booking not found")
+    _ensure_can_cancel(booking, current_user, db)
+    if booking.booking_status in ("cancelled", "expired"):
+        return booking
+
+    if booking.show_id is None:
+        booking.booking_status = "cancelled"
+        db.commit()
+        db.refresh(booking)
+        return booking
+
+    with show_lock(booking.show_id):
+        # Booking row before show row: the same order the pending-booking sweeper uses
+        db.execute(select(Booking.id).where(Booking.id == booking.id).with_for_update(key_share=True))
+        _lock_show_row(booking.show_id, db)
+        released = release_booking_seats(booking, db)
+        booking.booking_status = "cancelled"
+        db.commit()
+        release_seats(booking.show_id, released)
+    db.refresh(booking)
+    return booking
+
+
+def release_booking_seats(booking: Booking, db: Session) -> list[int]:
+    """Delete a booking's seat rows and credit the show counter; the caller commits.
+
+    Returns the released seat numbers so the caller can update the seat map after commit.
+    """
+    seat_numbers = [
+        n for (n,) in db.query(SeatReservation.seat_number).filter(SeatReservation.booking_id == booking.id).all()
+    ]
+    if not seat_numbers:
+        return []
+    db.query(SeatReservation).filter(SeatReservation.booking_id == booking.id).delete(synchronize_session=False)
+    db.query(BookingSeat).filter(BookingSeat.booking_id == booking.id).delete(synchronize_session=False)
+    _return_available_seats(booking.show_id, len(seat_numbers), db)
+    return seat_numbers
+
+
+def expire_pending_bookings(db: Session, now: datetime | None = None, batch_size: int | None = None) -> int:
+    """Expire unpaid bookings older than the pending TTL and release their seats.
+
+    Works in batches of `batch_size` bookings, one short transaction each. Rows already
+    locked by another sweeper are skipped rather than waited on. Seat releases reach the
+    seat maps (and their live streams) after each commit. Returns the number expired.
+    """
+    batch_size = batch_size or settings.pending_booking_sweep_batch_size
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)  # created_at is naive UTC
+    cutoff = now - timedelta(seconds=settings.pending_booking_ttl_seconds)
+    expired = 0
+    while True:
+        bookings = (
+            db.query(Booking.id, Booking.show_id)
+            .filter(Booking.booking_status == "pending_payment", Booking.created_at < cutoff)  # Partial index
+            .order_by(Booking.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True, key_share=True)  # FOR NO KEY UPDATE: seat inserts may still reference them
+            .all()
+        )
+        if not bookings:
+            db.rollback()
+            break
+        released = _expire_batch([booking_id for booking_id, _ in bookings], db)
+        db.commit()
+        for show_id, seat_numbers in released.items():
+            release_seats(show_id, seat_numbers)
+        expired += len(bookings)
+        if len(bookings) < batch_size:
+            break
+    if expired:
+        logger.info("Expired %d unpaid bookings", expired)
+    return expired
+
+
+def _expire_batch(booking_ids: list[int], db: Session) -> dict[int, list[int]]:
+    """Mark bookings expired and free their seats in bulk; the caller commits."""
+    released: dict[int, list[int]] = defaultdict(list)
+    rows = (
+        db.query(SeatReservation.show_id, SeatReservation.seat_number)
+        .filter(SeatReservation.booking_id.in_(booking_ids))
+        .all()
+    )
+    for show_id, seat_number in rows:
+        released[show_id].append(seat_number)
+    if rows:
+        db.query(SeatReservation).filter(SeatReservation.booking_id.in_(booking_ids)).delete(synchronize_session=False)
+        db.query(BookingSeat).filter(BookingSeat.booking_id.in_(booking_ids)).delete(synchronize_session=False)
+        for show_id, seat_numbers in released.items():
+            _return_available_seats(show_id, len(seat_numbers), db)
+    db.execute(
+        update(Booking)
+        .where(Booking.id.in_(booking_ids))
+        .values(booking_status="expired")
+        .execution_options(synchronize_session=False)
+    )
+    return released
+
+
+def _sweep_loop(stop: threading.Event) -> None:
+    while not stop.wait(settings.pending_booking_sweep_interval_seconds):
+        try:
+            with SessionLocal() as db:
+                expire_pending_bookings(db)
+        except Exception:  # pragma: no cover - keep the sweeper alive
+            logger.exception("Pending booking sweep failed")
+
+
+_sweeper: threading.Thread | None = None
+_sweeper_stop = threading.Event()
+
+
+def start_pending_booking_sweeper() -> None:
+    """Start the background sweeper that expires unpaid bookings, if enabled in settings."""
+    global _sweeper
+    if not settings.pending_booking_sweeper_enabled or (_sweeper is not None and _sweeper.is_alive()):
+        return
+    _sweeper_stop.clear()
+    _sweeper = threading.Thread(target=_sweep_loop, args=(_sweeper_stop,), name="pending-booking-sweeper", daemon=True)
+    _sweeper.start()
+
+
+def stop_pending_booking_sweeper() -> None:
+    _sweeper_stop.set()
+
+
+def reconcile_available_seats(db: Session, batch_size: int = 500) -> int:
+    """Recompute drifted `shows.available_seats` counters from seat_reservations.
+
+    An explicit maintenance job (`python -m app.migrations reconcile-seats`), not run on
+    startup. Each show is fixed in its own short transaction under its show lock and a
+    `SELECT ... FOR UPDATE` on its row, so seat writes in this process or any other cannot
+    interleave with the recount. Returns the number of corrected shows.
+    """
+    corrected = 0
+    last_id = 0
+    while True:
+        show_ids = [
+            show_id
+            for (show_id,) in db.query(Show.id).filter(Show.id > last_id).order_by(Show.id).limit(batch_size)
+        ]
+        db.rollback()  # Don't keep a snapshot open across the per-show transactions
+        if not show_ids:
+            break
+        corrected += sum(_reconcile_show(show_id, db) for show_id in show_ids)
+        last_id = show_ids[-1]
+    if corrected:
+        logger.info("Reconciled available_seats for %d shows", corrected)
+    return corrected
+
+
+def _reconcile_show(show_id: int, db: Session) -> bool:
+    with show_lock(show_id):
+        # Seat writers update this row in the same transaction as their reservations, so
+        # once the lock is ours every committed reservation is visible and no new one lands
+        show = (
+            db.query(Show)
+            .filter(Show.id == show_id)
+            .with_for_update()
+            .populate_existing()
+            .one_or_none()
+        )
+        capacity = db.query(Screen.total_seats).filter(Screen.id == show.screen_id).scalar() if show else None
+        if capacity is None:
+            db.rollback()
+            return False
+        reserved = db.query(func.count(SeatReservation.id)).filter(SeatReservation.show_id == show_id).scalar()
+        expected = capacity - reserved
+        if expected < 0:
+            # More seats reserved than the screen now has (e.g. its layout shrank): the
+            # counter can't go below zero, and the overbooking needs a human to resolve
+            logger.warning(
+                "Show %d has %d reserved seats but capacity %d; clamping available_seats to 0",
+                show_id, reserved, capacity,
+            )
+            expected = 0
+        if show.available_seats == expected:
+            db.rollback()
+            return False
+        show.available_seats = expected
+        db.commit()
+        return True
+
+
+def _reserved_among(show_id: int, seat_numbers: list[int], db: Session) -> list[int]:
+    rows = (
+        db.query(SeatReservation.seat_number)
+        .filter(SeatReservation.show_id == show_id, SeatReservation.seat_number.in_(seat_numbers))
+        .all()
+    )
+    return [seat_number for (seat_number,) in rows]
+
+
+def get_booking_seats_status(show_id: int, db: Session) -> schemas.BookingSeatsStatusResponse:
+    """Return unavailable seats from the per-show seat map; the DB is only read on first load."""
+    expire_holds()
+    seat_map = peek_seat_map(show_id)
+    if seat_map is None:
+        show = db.get(Show, show_id)
+        if not show:
+            raise ShowNotFoundError("Show not found")
+        seat_map = get_seat_map(show, db)
 
-    dedup_sorted = sorted(set(unavailable))
     return schemas.BookingSeatsStatusResponse(
         show_id=show_id,
-        unavailable_seat_numbers=dedup_sorted,
+        unavailable_seat_numbers=seat_map.unavailable(),
     )
+
+
+def open_seat_stream(show_id: int, db: Session, loop: asyncio.AbstractEventLoop) -> SeatSubscriber:
+    """Subscribe to live seat changes for a show; the first frame is the full snapshot."""
+    expire_holds()
+    seat_map = peek_seat_map(show_id)
+    if seat_map is None:
+        show = db.get(Show, show_id)
+        if not show:
+            raise ShowNotFoundError("Show not found")
+        seat_map = get_seat_map(show, db)
+
+    subscriber = SeatSubscriber(show_id, loop)
+    seat_map.subscribe(subscriber)
+    return subscriber
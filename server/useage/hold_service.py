@@ -0,0 +1,243 @@
+import heapq
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.config import settings
+from app.models import Show
+from useage.booking_errors import ShowNotFoundError, InvalidSeatNumbersError, HoldNotFoundError, NotEnoughFreeSeatsError
+from useage.layout_service import best_available
+from useage.seat_map_service import get_seat_map, mark_seats_held, out_of_range_message, release_held_seats, show_layout, show_lock
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SeatHold:
+    hold_id: str
+    show_id: int
+    seat_numbers: list[int]
+    expires_at: float  # Epoch seconds
+
+
+class HoldStore:
+    """Live seat holds with heap-ordered expiry.
+
+    Expiring pops only the due entries off the heap, so a tick costs O(k log n) for k
+    expired holds instead of a sweep over every hold. Released holds leave stale heap
+    entries behind; they are skipped when popped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds: dict[str, SeatHold] = {}
+        self._seat_owner: dict[int, dict[int, str]] = {}  # show_id -> seat -> hold_id
+        self._expiry_heap: list[tuple[float, str]] = []
+
+    def hold(self, show_id: int, seat_numbers: list[int], is_free, ttl_seconds: float, now: float) -> tuple[SeatHold | None, list[int]]:
+        """Hold every requested seat that is free; returns the hold and the unavailable seats."""
+        with self._lock:
+            owners = self._seat_owner.setdefault(show_id, {})
+            held: list[int] = []
+            unavailable: list[int] = []
+            for seat in seat_numbers:
+                if seat in owners or not is_free(seat):
+                    unavailable.append(seat)
+                else:
+                    held.append(seat)
+            if not held:
+                return None, unavailable
+
+            hold = SeatHold(
+                hold_id=secrets.token_urlsafe(12),
+                show_id=show_id,
+                seat_numbers=held,
+                expires_at=now + ttl_seconds,
+            )
+            for seat in held:
+                owners[seat] = hold.hold_id
+            self._holds[hold.hold_id] = hold
+            heapq.heappush(self._expiry_heap, (hold.expires_at, hold.hold_id))
+            return hold, unavailable
+
+    def get(self, hold_id: str) -> SeatHold | None:
+        return self._holds.get(hold_id)
+
+    def held_seats(self, show_id: int) -> list[int]:
+        with self._lock:
+            return list(self._seat_owner.get(show_id, {}))
+
+    def holder_of(self, show_id: int, seat: int) -> str | None:
+        return self._seat_owner.get(show_id, {}).get(seat)
+
+    def release(self, hold_id: str) -> SeatHold | None:
+        with self._lock:
+            return self._drop(hold_id)
+
+    def pop_expired(self, now: float) -> list[SeatHold]:
+        expired: list[SeatHold] = []
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, hold_id = heapq.heappop(self._expiry_heap)
+                hold = self._drop(hold_id)
+                if hold is not None:
+                    expired.append(hold)
+        return expired
+
+    def clear(self) -> None:
+        with self._lock:
+            self._holds.clear()
+            self._seat_owner.clear()
+            self._expiry_heap.clear()
+
+    def _drop(self, hold_id: str) -> SeatHold | None:
+        hold = self._holds.pop(hold_id, None)
+        if hold is None:
+            return None
+        owners = self._seat_owner.get(hold.show_id, {})
+        for seat in hold.seat_numbers:
+            if owners.get(seat) == hold_id:
+                del owners[seat]
+        if not owners:
+            self._seat_owner.pop(hold.show_id, None)
+        return hold
+
+
+hold_store = HoldStore()
+
+
+def expire_holds(now: float | None = None) -> int:
+    """Release holds whose TTL has passed; returns how many expired."""
+    expired = hold_store.pop_expired(time.time() if now is None else now)
+    for hold in expired:
+        release_held_seats(hold.show_id, hold.seat_numbers)
+    return len(expired)
+
+
+def hold_seats(payload: schemas.BookingSeatsHoldRequest, db: Session) -> schemas.BookingSeatsHoldResponse:
+    """Place a timed hold on the requested seats that are neither booked nor held."""
+    show = db.get(Show, payload.show_id)
+    if not show:
+        raise ShowNotFoundError("Show not found")
+
+    if not payload.seat_numbers or any(n <= 0 for n in payload.seat_numbers):
+        raise InvalidSeatNumbersError("Invalid seat numbers")
+    seat_numbers = list(dict.fromkeys(payload.seat_numbers))
+    if len(seat_numbers) > settings.seat_hold_max_seats:
+        raise InvalidSeatNumbersError(f"At most {settings.seat_hold_max_seats} seats can be held at once")
+    out_of_range = out_of_range_message(show, seat_numbers, db)
+    if out_of_range:
+        raise InvalidSeatNumbersError(out_of_range)
+
+    expire_holds()
+    seat_map = get_seat_map(show, db)
+    with show_lock(show.id):  # Serialize with seat bookings on the same show
+        hold, unavailable = hold_store.hold(
+            show.id,
+            seat_numbers,
+            is_free=lambda seat: seat not in seat_map.booked,
+            ttl_seconds=settings.seat_hold_ttl_seconds,
+            now=time.time(),
+        )
+        if hold is not None:
+            mark_seats_held(show.id, hold.seat_numbers)
+    if hold is None:
+        return schemas.BookingSeatsHoldResponse(
+            show_id=show.id,
+            held_seat_numbers=[],
+            unavailable_seat_numbers=sorted(unavailable),
+        )
+
+    return schemas.BookingSeatsHoldResponse(
+        show_id=show.id,
+        hold_id=hold.hold_id,
+        expires_at=datetime.fromtimestamp(hold.expires_at, tz=timezone.utc),
+        held_seat_numbers=sorted(hold.seat_numbers),
+        unavailable_seat_numbers=sorted(unavailable),
+    )
+
+
+def hold_best_available(payload: schemas.BestAvailableHoldRequest, db: Session) -> schemas.BookingSeatsHoldResponse:
+    """Pick the best free seats for a group from the screen layout and hold them."""
+    show = db.get(Show, payload.show_id)
+    if not show:
+        raise ShowNotFoundError("Show not found")
+    if not 1 <= payload.count <= settings.seat_hold_max_seats:
+        raise InvalidSeatNumbersError(f"Seat count must be between 1 and {settings.seat_hold_max_seats}")
+
+    layout = show_layout(show, db)
+
+    expire_holds()
+    seat_map = get_seat_map(show, db)
+    with show_lock(show.id):  # Pick and hold atomically with respect to other seat writers
+        seats = best_available(
+            layout,
+            seat_map.unavailable(),
+            payload.count,
+            section=payload.section,
+            preferred_row=payload.preferred_row,
+            allow_split=payload.allow_split,
+        )
+        if seats is None:
+            raise NotEnoughFreeSeatsError("Not enough free seats for this request")
+        hold, unavailable = hold_store.hold(
+            show.id,
+            seats,
+            is_free=lambda seat: seat not in seat_map.booked,
+            ttl_seconds=settings.seat_hold_ttl_seconds,
+            now=time.time(),
+        )
+        if hold is None or unavailable:
+            # The seat map and hold store disagreed on a picked seat: the group gets all of
+            # its seats or none, never a silently smaller hold
+            if hold is not None:
+                hold_store.release(hold.hold_id)
+            raise NotEnoughFreeSeatsError("Not enough free seats for this request")
+        mark_seats_held(show.id, hold.seat_numbers)
+
+    return schemas.BookingSeatsHoldResponse(
+        show_id=show.id,
+        hold_id=hold.hold_id,
+        expires_at=datetime.fromtimestamp(hold.expires_at, tz=timezone.utc),
+        held_seat_numbers=sorted(hold.seat_numbers),
+        unavailable_seat_numbers=[],
+    )
+
+
+def release_hold(hold_id: str) -> None:
+    hold = hold_store.release(hold_id)
+    if hold is None:
+        raise HoldNotFoundError("Hold not found")
+    release_held_seats(hold.show_id, hold.seat_numbers)
+
+
+def _expiry_loop(stop: threading.Event) -> None:
+    while not stop.wait(settings.seat_hold_sweep_interval_seconds):
+        try:
+            expire_holds()
+        except Exception:  # pragma: no cover - keep the ticker alive
+            logger.exception("Seat hold expiry tick failed")
+
+
+_worker: threading.Thread | None = None
+_worker_stop = threading.Event()
+
+
+def start_hold_expiry_worker() -> None:
+    """Start the background ticker that expires holds even when nobody reads seat status."""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    _worker_stop.clear()
+    _worker = threading.Thread(target=_expiry_loop, args=(_worker_stop,), name="seat-hold-expiry", daemon=True)
+    _worker.start()
+
+
+def stop_hold_expiry_worker() -> None:
+    _worker_stop.set()
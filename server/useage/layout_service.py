@@ -0,0 +1,244 @@
+import logging
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import event
+
+from app.models import Screen
+
+logger = logging.getLogger(__name__)
+
+_COLS_KEYS = ("cols", "columns", "columns_count", "num_columns")
+_ROWS_KEYS = ("rows", "rows_count", "num_rows")
+
+
+class InvalidLayoutError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class LayoutRow:
+    section: str
+    row: int  # 1-based within its section, front to back
+    first_seat: int
+    last_seat: int  # Inclusive
+    category: str = "standard"
+
+    @property
+    def center(self) -> float:
+        return (self.first_seat + self.last_seat) / 2
+
+
+@dataclass(frozen=True)
+class SeatLocation:
+    section: str
+    row: int
+    column: int  # 1-based within the row
+    category: str
+
+
+class ScreenLayout:
+    """A screen's layout compiled to rows of consecutive seat numbers.
+
+    Seats are numbered row-major from the front row, as the seat picker draws them, and
+    never exceed `total_seats`. Valid seats are exactly 1..capacity; `_seat_row` maps each
+    one to its row so locating a seat is two array lookups.
+    """
+
+    def __init__(self, screen_id: int, total_seats: int, rows: list[LayoutRow]):
+        self.screen_id = screen_id
+        self.total_seats = total_seats
+        self.rows = rows
+        self.capacity = rows[-1].last_seat if rows else 0
+        self.sections: dict[str, list[int]] = {}  # Section name -> indexes into rows
+        self._seat_row = array("I", bytes(4 * self.capacity))  # seat - 1 -> index into rows
+        for i, row in enumerate(rows):
+            self.sections.setdefault(row.section, []).append(i)
+            self._seat_row[row.first_seat - 1:row.last_seat] = array("I", [i]) * (row.last_seat - row.first_seat + 1)
+
+    def is_valid(self, seat: int) -> bool:
+        return 1 <= seat <= self.capacity
+
+    def invalid_seats(self, seats: Iterable[int]) -> list[int]:
+        return [n for n in seats if not 1 <= n <= self.capacity]
+
+    def locate(self, seat: int) -> SeatLocation | None:
+        if not 1 <= seat <= self.capacity:
+            return None
+        row = self.rows[self._seat_row[seat - 1]]
+        return SeatLocation(row.section, row.row, seat - row.first_seat + 1, row.category)
+
+
+def _first_int(cfg: dict, keys: tuple[str, ...]) -> int | None:
+    for key in keys:
+        value = cfg.get(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def _section_category(section: dict) -> str:
+    category = section.get("category")
+    return str(category) if category else "standard"
+
+
+def _section_rows(section: dict) -> list[int]:
+    """Seats per row for one section: {"rows": 3, "cols": 10} or {"rows": [8, 10, 10]}."""
+    rows = section.get("rows")
+    if isinstance(rows, list):
+        if not all(isinstance(n, int) and n > 0 for n in rows):
+            raise InvalidLayoutError("Section rows must be positive seat counts")
+        return rows
+    count, cols = _first_int(section, _ROWS_KEYS), _first_int(section, _COLS_KEYS)
+    if not count or not cols or count < 0 or cols < 0:
+        raise InvalidLayoutError("Section needs rows and cols")
+    return [cols] * count
+
+
+def compile_layout(screen_id: int, total_seats: int, layout_config: dict | None) -> ScreenLayout:
+    """Compile `layout_config` into rows of seat numbers.
+
+    Accepted shapes: {"rows": R, "cols": C} (and the key aliases the seat picker reads),
+    {"sections": [{"name": ..., "rows": R, "cols": C} | {"name": ..., "rows": [n, ...]}]},
+    or anything else, which falls back to a near-square grid like the seat picker does.
+    """
+    cfg = layout_config if isinstance(layout_config, dict) else {}
+    sections = cfg.get("sections")
+    if isinstance(sections, list) and sections:
+        plan = [
+            (str(section.get("name") or f"section-{i + 1}"), _section_category(section), _section_rows(section))
+            for i, section in enumerate(sections)
+            if isinstance(section, dict)
+        ]
+    else:
+        count, cols = _first_int(cfg, _ROWS_KEYS), _first_int(cfg, _COLS_KEYS)
+        if not count or not cols or count < 0 or cols < 0:
+            count = cols = math.ceil(math.sqrt(max(total_seats, 0)))
+        plan = [("main", "standard", [cols] * count)]
+
+    rows: list[LayoutRow] = []
+    next_seat = 1
+    for name, category, widths in plan:
+        for row_no, width in enumerate(widths, start=1):
+            if next_seat > total_seats:
+                break
+            last = min(next_seat + width - 1, total_seats)
+            rows.append(LayoutRow(section=name, row=row_no, first_seat=next_seat, last_seat=last, category=category))
+            next_seat = last + 1
+    return ScreenLayout(screen_id, total_seats, rows)
+
+
+# Compiled layouts per screen id. Screens are few and change rarely; entries are dropped
+# whenever a Screen row is updated or deleted through the ORM in this process.
+_layouts: dict[int, ScreenLayout] = {}
+_layouts_lock = threading.Lock()
+
+
+def get_layout(screen: Screen) -> ScreenLayout:
+    """Return the compiled layout for a screen, compiling it on first use."""
+    layout = _layouts.get(screen.id)
+    if layout is None:
+        try:
+            layout = compile_layout(screen.id, screen.total_seats, screen.layout_config)
+        except InvalidLayoutError as e:
+            logger.warning("Screen %s has an invalid layout_config (%s); using a square grid", screen.id, e)
+            layout = compile_layout(screen.id, screen.total_seats, None)
+        with _layouts_lock:
+            _layouts[screen.id] = layout
+    return layout
+
+
+def forget_layout(screen_id: int) -> None:
+    with _layouts_lock:
+        _layouts.pop(screen_id, None)
+
+
+def reset_layouts() -> None:
+    with _layouts_lock:
+        _layouts.clear()
+
+
+@event.listens_for(Screen, "after_update")
+@event.listens_for(Screen, "after_delete")
+def _screen_changed(mapper, connection, screen: Screen) -> None:
+    forget_layout(screen.id)
+
+
+def _free_runs(row: LayoutRow, unavailable: list[int]) -> list[tuple[int, int]]:
+    """Maximal runs of free seats in a row as (first, last), from the sorted unavailable list."""
+    lo = bisect_left(unavailable, row.first_seat)
+    hi = bisect_right(unavailable, row.last_seat, lo)
+    runs: list[tuple[int, int]] = []
+    start = row.first_seat
+    for taken in unavailable[lo:hi]:
+        if taken > start:
+            runs.append((start, taken - 1))
+        start = taken + 1
+    if start <= row.last_seat:
+        runs.append((start, row.last_seat))
+    return runs
+
+
+def _centered_block(row: LayoutRow, run: tuple[int, int], size: int) -> tuple[float, int]:
+    """Best start for `size` seats inside `run`, as close to the row center as it allows."""
+    start = round(row.center - (size - 1) / 2)
+    start = max(run[0], min(start, run[1] - size + 1))
+    return abs(start + (size - 1) / 2 - row.center), start
+
+
+def _ranked_rows(layout: ScreenLayout, section: str | None, preferred_row: int | None) -> list[LayoutRow]:
+    indexes = layout.sections[section] if section is not None else range(len(layout.rows))
+    rows = [layout.rows[i] for i in indexes]
+    if not rows:
+        return []
+    if preferred_row is not None:
+        target = preferred_row - 1
+    else:
+        target = round((len(rows) - 1) * 2 / 3)  # Two thirds back is the usual sweet spot
+    order = sorted(range(len(rows)), key=lambda i: (abs(i - target), -i))
+    return [rows[i] for i in order]
+
+
+def best_available(
+    layout: ScreenLayout,
+    unavailable: list[int],
+    count: int,
+    section: str | None = None,
+    preferred_row: int | None = None,
+    allow_split: bool = True,
+) -> list[int] | None:
+    """Pick `count` free seats: one contiguous block in the best-ranked row that fits,
+    otherwise (if allowed) the largest central blocks across rows in rank order.
+
+    `unavailable` is the sorted list of booked or held seats. Rows are ranked by distance
+    from `preferred_row` (1-based, within `section` if given) or from the sweet spot.
+    Returns None when the request cannot be met.
+    """
+    if section is not None and section not in layout.sections:
+        raise InvalidLayoutError(f"Unknown section: {section}")
+    ranked = _ranked_rows(layout, section, preferred_row)
+
+    for row in ranked:
+        fits = [_centered_block(row, run, count) for run in _free_runs(row, unavailable) if run[1] - run[0] + 1 >= count]
+        if fits:
+            _, start = min(fits)
+            return list(range(start, start + count))
+
+    if not allow_split:
+        return None
+    seats: list[int] = []
+    for row in ranked:
+        runs = _free_runs(row, unavailable)
+        while runs and len(seats) < count:
+            run = max(runs, key=lambda r: (r[1] - r[0], -abs((r[0] + r[1]) / 2 - row.center)))
+            runs.remove(run)
+            size = min(count - len(seats), run[1] - run[0] + 1)
+            _, start = _centered_block(row, run, size)
+            seats.extend(range(start, start + size))
+        if len(seats) == count:
+            return sorted(seats)
+    return None
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator
+
+
+class LockSlot:
+    """State for one key: its writer lock, optional attached state and wait statistics."""
+
+    __slots__ = ("lock", "users", "state", "acquisitions", "contended", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0  # Threads inside hold(); the slot cannot be evicted while > 0
+        self.state: Any = None  # Whatever the owner keeps per key (e.g. a seat map)
+        self.acquisitions = 0
+        self.contended = 0  # Acquisitions that had to wait
+        self.wait_total = 0.0  # Seconds
+        self.wait_max = 0.0
+
+
+class _Shard:
+    __slots__ = ("mutex", "slots")
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.slots: "OrderedDict[Hashable, LockSlot]" = OrderedDict()
+
+
+class ShardedLockManager:
+    """Per-key locks spread over independent shards.
+
+    Each shard has its own mutex and LRU of slots, so looking up the lock of one key never
+    waits on bookkeeping for keys in other shards. A slot (lock, state and stats together)
+    is evicted once its shard holds more than `max_keys / shards` slots, unless a thread
+    is inside `hold()` for it or `pinned(key)` says to keep it.
+    """
+
+    def __init__(self, shards: int, max_keys: Callable[[], int], pinned: Callable[[Hashable], bool] = lambda key: False):
+        self._shards = [_Shard() for _ in range(max(shards, 1))]
+        self._max_keys = max_keys
+        self._pinned = pinned
+        self._totals_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _slot(self, shard: _Shard, key: Hashable) -> LockSlot:
+        """Get or create the slot for key and mark it recently used; hold shard.mutex."""
+        slot = shard.slots.get(key)
+        if slot is None:
+            slot = shard.slots[key] = LockSlot()
+            self._evict(shard)
+        else:
+            shard.slots.move_to_end(key)
+        return slot
+
+    def _evict(self, shard: _Shard) -> None:
+        excess = len(shard.slots) - max(self._max_keys() // len(self._shards), 1)
+        if excess <= 0:
+            return
+        idle = [k for k, s in shard.slots.items() if s.users == 0 and not self._pinned(k)]
+        for key in idle[:excess]:
+            del shard.slots[key]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[LockSlot]:
+        """Hold the lock for key, recording how long the caller queued for it."""
+        shard = self._shard(key)
+        with shard.mutex:
+            slot = self._slot(shard, key)
+            slot.users += 1
+        try:
+            contended = not slot.lock.acquire(blocking=False)
+            waited = 0.0
+            if contended:
+                started = time.perf_counter()
+                slot.lock.acquire()
+                waited = time.perf_counter() - started
+            try:
+                self._record(slot, contended, waited)
+                yield slot
+            finally:
+                slot.lock.release()
+        finally:
+            with shard.mutex:
+                slot.users -= 1
+
+    def _record(self, slot: LockSlot, contended: bool, waited: float) -> None:
+        # Slot counters are only written while its lock is held
+        slot.acquisitions += 1
+        slot.wait_total += waited
+        if contended:
+            slot.contended += 1
+            slot.wait_max = max(slot.wait_max, waited)
+        with self._totals_lock:
+            self.acquisitions += 1
+            self.wait_total += waited
+            self.contended += contended
+
+    def get_or_create_state(self, key: Hashable, factory: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return the state attached to key, creating it atomically if missing.
+
+        `factory` runs under the shard mutex, blocking every key in the shard: it must be
+        cheap and must not do I/O. Load what it needs before calling.
+        """
+        shard = self._shard(key)
+        with shard.mutex:
+            slot = self._slot(shard, key)
+            if slot.state is None:
+                slot.state = factory()
+                return slot.state, True
+            return slot.state, False
+
+    def peek_state(self, key: Hashable) -> Any:
+        slot = self._shard(key).slots.get(key)
+        return slot.state if slot is not None else None
+
+    def clear_state(self, key: Hashable, expected: Any = None) -> None:
+        """Detach key's state (only if it is still `expected`, when given)."""
+        shard = self._shard(key)
+        with shard.mutex:
+            slot = shard.slots.get(key)
+            if slot is not None and (expected is None or slot.state is expected):
+                slot.state = None
+
+    def clear_states(self, predicate: Callable[[Any], bool]) -> None:
+        for shard in self._shards:
+            with shard.mutex:
+                for slot in shard.slots.values():
+                    if slot.state is not None and slot.users == 0 and predicate(slot.state):
+                        slot.state = None
+
+    def discard(self, key: Hashable) -> None:
+        """Drop key's slot, unless a thread is inside hold() for it right now."""
+        shard = self._shard(key)
+        with shard.mutex:
+            slot = shard.slots.get(key)
+            if slot is not None and slot.users == 0:
+                del shard.slots[key]
+
+    def keys(self) -> list[Hashable]:
+        out: list[Hashable] = []
+        for shard in self._shards:
+            with shard.mutex:
+                out.extend(shard.slots)
+        return out
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.mutex:
+                shard.slots.clear()
+        with self._totals_lock:
+            self.acquisitions = 0
+            self.contended = 0
+            self.wait_total = 0.0
+
+    def stats(self, top: int = 10) -> dict:
+        """Totals plus the `top` keys by accumulated wait (the hot ones)."""
+        per_key = []
+        for shard in self._shards:
+            with shard.mutex:
+                per_key.extend((key, slot) for key, slot in shard.slots.items() if slot.acquisitions)
+        per_key.sort(key=lambda item: item[1].wait_total, reverse=True)
+        with self._totals_lock:
+            totals = {
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_avg": round(self.wait_total / self.acquisitions, 6) if self.acquisitions else 0.0,
+            }
+        return {
+            **totals,
+            "keys": sum(len(shard.slots) for shard in self._shards),
+            "hottest": [
+                {
+                    "key": key,
+                    "acquisitions": slot.acquisitions,
+                    "contended": slot.contended,
+                    "wait_seconds_total": round(slot.wait_total, 6),
+                    "wait_seconds_max": round(slot.wait_max, 6),
+                }
+                for key, slot in per_key[:top]
+            ],
+        }
@@ -1,8 +1,11 @@
+from datetime import date as dt_date
+from typing import Optional
+
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app import schemas
-from app.models import Movie, Theater, Screen, Show
+from app.models import Movie
+from useage.now_playing_service import playing_movies
 
 
 class MovieNotFoundError(Exception):
@@ -21,15 +24,8 @@ def list_movies(db: Session) -> list[Movie]:
     return db.query(Movie).all()
 
 
-def list_playing_movies(city_id: int, db: Session) -> list[Movie]:
-    q = (
-        db.query(Movie)
-        .join(Show, Show.movie_id == Movie.id)
-        .join(Screen, Screen.id == Show.screen_id)
-        .join(Theater, Theater.id == Screen.theater_id)
-        .filter(Theater.city_id == city_id, Theater.is_active == True)
-    )
-    return q.distinct(Movie.id).all()
+def list_playing_movies(city_id: int, db: Session, today: Optional[dt_date] = None) -> list[Movie]:
+    return playing_movies(city_id, db, today)
 
 
 def get_movie(movie_id: int, db: Session) -> Movie:
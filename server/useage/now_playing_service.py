@@ -0,0 +1,79 @@
+from datetime import date as dt_date
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import CityNowPlaying, Movie, ShowListing
+
+_now_playing = CityNowPlaying.__table__
+_listings = ShowListing.__table__
+_COLUMNS = ["city_id", "movie_id", "last_show_date"]
+
+
+def playing_movies(city_id: int, db: Session, today: Optional[dt_date] = None) -> list[Movie]:
+    """Movies with a show today or later at an active theater in the city: one index range scan."""
+    today = today or dt_date.today()
+    return (
+        db.query(Movie)
+        .join(CityNowPlaying, CityNowPlaying.movie_id == Movie.id)
+        .filter(CityNowPlaying.city_id == city_id, CityNowPlaying.last_show_date >= today)
+        .all()
+    )
+
+
+def _insert(connection: Connection):
+    return (pg_insert if connection.dialect.name == "postgresql" else sqlite_insert)(_now_playing)
+
+
+def _upsert(stmt):
+    """ON CONFLICT (city_id, movie_id): take the recomputed date."""
+    return stmt.on_conflict_do_update(
+        index_elements=[_now_playing.c.city_id, _now_playing.c.movie_id],
+        set_={"last_show_date": stmt.excluded.last_show_date},
+    )
+
+
+def _playing_select(city_id: Optional[int] = None, movie_id: Optional[int] = None):
+    # show_listings already holds only shows at active theaters, with their city; the
+    # (movie_id, city_id, ...) index answers one pair's max(show_date) directly
+    q = select(_listings.c.city_id, _listings.c.movie_id, func.max(_listings.c.show_date)).group_by(
+        _listings.c.city_id, _listings.c.movie_id
+    )
+    if city_id is not None:
+        q = q.where(_listings.c.city_id == city_id)
+    if movie_id is not None:
+        q = q.where(_listings.c.movie_id == movie_id)
+    return q
+
+
+def refresh_pair(connection: Connection, city_id: int, movie_id: int) -> None:
+    """Recompute one (city, movie) row from its listings; removes it when none are left."""
+    connection.execute(
+        delete(_now_playing).where(_now_playing.c.city_id == city_id, _now_playing.c.movie_id == movie_id)
+    )
+    fresh = _insert(connection).from_select(_COLUMNS, _playing_select(city_id, movie_id))
+    connection.execute(_upsert(fresh))
+
+
+def refresh_pairs(connection: Connection, pairs: Iterable[tuple[int, int]]) -> None:
+    """Recompute the given (city_id, movie_id) rows after their listings changed.
+
+    Called by useage.show_listing_service in the writer's transaction, so every Show,
+    Screen and Theater write that relists shows keeps this index current too.
+    """
+    for city_id, movie_id in pairs:
+        refresh_pair(connection, city_id, movie_id)
+
+
+def rebuild(connection: Connection, city_id: Optional[int] = None) -> None:
+    """Recompute every row of one city, or the whole index, from show_listings."""
+    stale = delete(_now_playing)
+    if city_id is not None:
+        stale = stale.where(_now_playing.c.city_id == city_id)
+    connection.execute(stale)
+    fresh = _insert(connection).from_select(_COLUMNS, _playing_select(city_id))
+    connection.execute(_upsert(fresh))
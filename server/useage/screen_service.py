@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.models import Screen
+from useage.layout_service import ScreenLayout, get_layout
 
 
 class ScreenNotFoundError(Exception):
@@ -17,3 +18,7 @@ def get_screen(screen_id: int, db: Session) -> Screen:
     if not screen:
         raise ScreenNotFoundError("Screen not found")
     return screen
+
+
+def get_screen_layout(screen_id: int, db: Session) -> ScreenLayout:
+    return get_layout(get_screen(screen_id, db))
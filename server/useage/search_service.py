@@ -1,13 +1,160 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict
+import heapq
+import threading
+from typing import Callable, Dict, List, Optional
 
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
 from app.models import Movie, Theater
 
+_PENDING_KEY = "search_index_pending"
 
-def unified_search(q: str, city_id: int | None, limit_movies: int, limit_theaters: int, db: Session) -> Dict[str, list]:
-    q_norm = q.strip().lower()
 
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to document ids, for substring search.
+
+    Every trigram of a query must occur in a match, so candidates are the intersection of
+    the query's posting lists (smallest first); each is then checked with a real substring
+    test. Documents are tuples of lowercased fields plus a rank key.
+    """
+
+    def __init__(self):
+        self.docs: dict[int, tuple[tuple[str, ...], tuple]] = {}  # id -> (fields, rank key)
+        self.postings: dict[str, set[int]] = {}
+
+    def put(self, doc_id: int, fields: tuple[str, ...], rank: tuple) -> None:
+        self.remove(doc_id)
+        self.docs[doc_id] = (fields, rank)
+        for gram in set().union(*(trigrams(f) for f in fields)):
+            self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for gram in set().union(*(trigrams(f) for f in doc[0])):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, q: str, limit: int) -> list[int]:
+        """Ids of the `limit` best-ranked documents with a field containing `q` (len(q) >= 3)."""
+        lists = sorted((self.postings.get(g, set()) for g in trigrams(q)), key=len)
+        if not lists or not lists[0]:
+            return []
+        candidates = lists[0].intersection(*lists[1:])
+        hits = ((self.docs[i][1], i) for i in candidates if any(q in f for f in self.docs[i][0]))
+        return [i for _, i in heapq.nsmallest(limit, hits)]
+
+
+class SearchIndex:
+    """Movie titles, plus theater names and addresses per city (active theaters only).
+
+    Built from the database on first use and then kept current from committed ORM writes.
+    Writes committed while a build is loading are buffered and replayed onto the new index,
+    so a build never installs data older than what has already been committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.movies: Optional[TrigramIndex] = None
+        self.theaters: dict[int, TrigramIndex] = {}  # city_id -> index
+        self._theater_city: dict[int, int] = {}  # theater_id -> city it is indexed under
+        self._buffer: Optional[list[tuple]] = None  # Non-None while a build is loading
+
+    def ensure_built(self, db: Session) -> bool:
+        """Build the index if nobody has; False while another thread's build is still loading."""
+        with self._lock:
+            if self.movies is not None:
+                return True
+            if self._buffer is not None:
+                return False
+            self._buffer = []
+        try:
+            movies = db.query(Movie.id, Movie.title).all()
+            theaters = (
+                db.query(Theater.id, Theater.city_id, Theater.name, Theater.address)
+                .filter(Theater.is_active == True)  # noqa: E712
+                .all()
+            )
+        except Exception:
+            with self._lock:
+                self._buffer = None
+            raise
+        with self._lock:
+            self.movies, self.theaters, self._theater_city = TrigramIndex(), {}, {}
+            for movie_id, title in movies:
+                self._put_movie(movie_id, title)
+            for theater_id, city_id, name, address in theaters:
+                self._put_theater(theater_id, city_id, name, address, True)
+            for change in self._buffer:
+                self._apply(change)
+            self._buffer = None
+        return True
+
+    def _put_movie(self, movie_id: int, title: Optional[str]) -> None:
+        if title is None:
+            self.movies.remove(movie_id)
+        else:
+            title = title.lower()
+            self.movies.put(movie_id, (title,), (len(title), movie_id))
+
+    def _put_theater(self, theater_id: int, city_id, name, address, is_active) -> None:
+        old_city = self._theater_city.pop(theater_id, None)
+        if old_city is not None:
+            self.theaters[old_city].remove(theater_id)
+        if name is None or not is_active:
+            return
+        name, address = name.lower(), (address or "").lower()
+        self.theaters.setdefault(city_id, TrigramIndex()).put(theater_id, (name, address), (len(name), theater_id))
+        self._theater_city[theater_id] = city_id
+
+    def _apply(self, change: tuple) -> None:
+        if change[0] == "movie":
+            self._put_movie(*change[1:])
+        else:
+            self._put_theater(*change[1:])
+
+    def apply(self, changes: list[tuple]) -> None:
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.extend(changes)
+            elif self.movies is not None:
+                for change in changes:
+                    self._apply(change)
+
+    def search_movies(self, q: str, limit: int) -> list[int]:
+        with self._lock:
+            return self.movies.search(q, limit)
+
+    def search_theaters(self, q: str, city_id: int, limit: int) -> list[int]:
+        with self._lock:
+            index = self.theaters.get(city_id)
+            return index.search(q, limit) if index is not None else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self.movies, self.theaters, self._theater_city = None, {}, {}
+
+
+search_index = SearchIndex()
+
+
+def _load_in_order(model, ids: list[int], db: Session) -> list:
+    if not ids:
+        return []
+    rows = {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()}
+    return [rows[i] for i in ids if i in rows]
+
+
+def _like_search(q_norm: str, city_id: int | None, limit_movies: int, limit_theaters: int, db: Session) -> Dict[str, list]:
     m_query = (
         db.query(Movie)
         .filter(func.lower(Movie.title).like(f"%{q_norm}%"))
@@ -34,3 +181,53 @@ def unified_search(q: str, city_id: int | None, limit_movies: int, limit_theater
         theaters = t_query.all()
 
     return {"movies": movies, "theaters": theaters}
+
+
+def unified_search(q: str, city_id: int | None, limit_movies: int, limit_theaters: int, db: Session) -> Dict[str, list]:
+    q_norm = q.strip().lower()
+    if len(q_norm) < 3 or not settings.search_index_enabled or not search_index.ensure_built(db):
+        # One or two characters have no trigram to look up, and the first build may still
+        # be loading in another request; the database answers those
+        return _like_search(q_norm, city_id, limit_movies, limit_theaters, db)
+
+    movie_ids = search_index.search_movies(q_norm, limit_movies)
+    theater_ids = search_index.search_theaters(q_norm, city_id, limit_theaters) if city_id is not None else []
+    return {
+        "movies": _load_in_order(Movie, movie_ids, db),
+        "theaters": _load_in_order(Theater, theater_ids, db),
+    }
+
+
+# Changes are collected per session at flush and applied only once the commit succeeds.
+def _movie_change(movie: Movie, deleted: bool) -> tuple:
+    return ("movie", movie.id, None if deleted else movie.title)
+
+
+def _theater_change(theater: Theater, deleted: bool) -> tuple:
+    return ("theater", theater.id, theater.city_id, None if deleted else theater.name, theater.address, theater.is_active)
+
+
+def _recorder(to_change: Callable, deleted: bool):
+    def record(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_PENDING_KEY, []).append(to_change(target, deleted))
+    return record
+
+
+for _model, _to_change in ((Movie, _movie_change), (Theater, _theater_change)):
+    event.listen(_model, "after_insert", _recorder(_to_change, False))
+    event.listen(_model, "after_update", _recorder(_to_change, False))
+    event.listen(_model, "after_delete", _recorder(_to_change, True))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        search_index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
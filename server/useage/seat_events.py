@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Callable
+
+from app.config import settings
+
+
+def sse_frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class SeatSubscriber:
+    """One live seat stream: a bounded queue of pre-encoded SSE frames.
+
+    Frames are pushed from any thread and consumed on the subscriber's event loop. A
+    client that falls `seat_stream_queue_size` frames behind is disconnected; EventSource
+    reconnects and starts again from a fresh snapshot.
+    """
+
+    def __init__(self, show_id: int, loop: asyncio.AbstractEventLoop):
+        self.show_id = show_id
+        self._loop = loop
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=settings.seat_stream_queue_size)
+        self._closed = False
+
+    def push(self, frame: str | None) -> None:
+        self._loop.call_soon_threadsafe(self._put, frame)
+
+    def _put(self, frame: str | None) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._closed = True
+            broker.unsubscribe(self)
+            self._queue.get_nowait()  # Make room for the end-of-stream marker
+            self._queue.put_nowait(None)
+
+    async def next_frame(self, timeout: float) -> str | None:
+        """Return the next frame, "" when `timeout` passes quietly, or None at end of stream."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return ""
+
+    async def frames(self, is_disconnected: Callable) -> AsyncIterator[str]:
+        try:
+            while True:
+                frame = await self.next_frame(settings.seat_stream_keepalive_seconds)
+                if frame is None:
+                    break
+                if frame == "":
+                    if await is_disconnected():
+                        break
+                    frame = ": keepalive\n\n"  # Comment line keeps proxies from timing out
+                yield frame
+        finally:
+            broker.unsubscribe(self)
+
+
+class SeatEventBroker:
+    """In-process fan-out of seat changes: one publisher per show, shared by its subscribers.
+
+    Each change is encoded once and the same frame is handed to every subscriber.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[SeatSubscriber]] = {}
+
+    def subscribe(self, subscriber: SeatSubscriber) -> None:
+        with self._lock:
+            self._subscribers.setdefault(subscriber.show_id, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: SeatSubscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.show_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.show_id]
+
+    def has_subscribers(self, show_id: int) -> bool:
+        return show_id in self._subscribers
+
+    def publish(self, show_id: int, unavailable: list[int], available: list[int]) -> None:
+        """Send one delta to every subscriber of the show; a no-op when nobody listens."""
+        if show_id not in self._subscribers or not (unavailable or available):
+            return
+        frame = sse_frame("delta", {"unavailable": sorted(unavailable), "available": sorted(available)})
+        with self._lock:
+            subscribers = list(self._subscribers.get(show_id, ()))
+        for subscriber in subscribers:
+            subscriber.push(frame)
+
+    def clear(self) -> None:
+        with self._lock:
+            subscribers = [s for subs in self._subscribers.values() for s in subs]
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.push(None)
+
+
+broker = SeatEventBroker()
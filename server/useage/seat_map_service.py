@@ -0,0 +1,295 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import SeatReservation, Screen, Show
+from useage import seat_events
+from useage.lock_manager import ShardedLockManager
+from useage.layout_service import ScreenLayout, compile_layout, get_layout
+
+logger = logging.getLogger(__name__)
+
+
+class SeatBitset:
+    """Compact one-bit-per-seat set over 1-based seat numbers.
+
+    Sized from the screen capacity up front and never grows: callers validate seat
+    numbers against the capacity, and setting a seat outside it raises IndexError.
+    """
+
+    __slots__ = ("capacity", "_bits")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 0)
+        self._bits = bytearray((self.capacity + 7) // 8)
+
+    def _locate(self, seat: int) -> tuple[int, int]:
+        idx = seat - 1
+        return idx >> 3, 1 << (idx & 7)
+
+    def add(self, seat: int) -> bool:
+        """Set the bit for seat; returns True if it was previously clear."""
+        if not 1 <= seat <= self.capacity:
+            raise IndexError(f"Seat {seat} is outside 1..{self.capacity}")
+        byte, mask = self._locate(seat)
+        if self._bits[byte] & mask:
+            return False
+        self._bits[byte] |= mask
+        return True
+
+    def discard(self, seat: int) -> bool:
+        """Clear the bit for seat; returns True if it was previously set."""
+        if not 1 <= seat <= self.capacity:
+            return False
+        byte, mask = self._locate(seat)
+        if not self._bits[byte] & mask:
+            return False
+        self._bits[byte] &= ~mask
+        return True
+
+    def __or__(self, other: "SeatBitset") -> "SeatBitset":
+        longer, shorter = (self, other) if self.capacity >= other.capacity else (other, self)
+        merged = SeatBitset(0)
+        merged.capacity = longer.capacity
+        merged._bits = bytearray(longer._bits)
+        for i, value in enumerate(shorter._bits):
+            merged._bits[i] |= value
+        return merged
+
+    def __contains__(self, seat: int) -> bool:
+        if not 1 <= seat <= self.capacity:
+            return False
+        byte, mask = self._locate(seat)
+        return bool(self._bits[byte] & mask)
+
+    def seats(self) -> list[int]:
+        """Return set seat numbers in ascending order (skips empty bytes)."""
+        out: list[int] = []
+        for byte, value in enumerate(self._bits):
+            if not value:
+                continue
+            base = byte << 3
+            for bit in range(8):
+                if value & (1 << bit):
+                    out.append(base + bit + 1)
+        return out
+
+
+class SeatMap:
+    """Per-show seat state kept in sync with seat writes in this process.
+
+    Two layers: `booked` mirrors persisted booking seats, `held` mirrors live timed holds.
+    """
+
+    def __init__(self, show_id: int, capacity: int, screen_id: int | None = None):
+        self.show_id = show_id
+        self.screen_id = screen_id
+        self.capacity = capacity
+        self.booked = SeatBitset(capacity)
+        self.held = SeatBitset(capacity)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._unavailable: list[int] | None = None  # Cached sorted snapshot; reset on change
+
+    def mark_booked(self, seats: Iterable[int]) -> list[int]:
+        with self._lock:
+            changed = [s for s in seats if self.booked.add(s)]
+            self._changed(unavailable=[s for s in changed if s not in self.held])
+        return changed
+
+    def release(self, seats: Iterable[int]) -> list[int]:
+        with self._lock:
+            changed = [s for s in seats if self.booked.discard(s)]
+            self._changed(available=[s for s in changed if s not in self.held])
+        return changed
+
+    def mark_held(self, seats: Iterable[int]) -> list[int]:
+        with self._lock:
+            changed = [s for s in seats if self.held.add(s)]
+            self._changed(unavailable=[s for s in changed if s not in self.booked])
+        return changed
+
+    def release_held(self, seats: Iterable[int]) -> list[int]:
+        with self._lock:
+            changed = [s for s in seats if self.held.discard(s)]
+            self._changed(available=[s for s in changed if s not in self.booked])
+        return changed
+
+    def _changed(self, unavailable: list[int] = (), available: list[int] = ()) -> None:
+        # Called under self._lock, so deltas reach subscribers in the order they happened
+        if unavailable or available:
+            self._unavailable = None
+            seat_events.broker.publish(self.show_id, unavailable, available)
+
+    def subscribe(self, subscriber: "seat_events.SeatSubscriber") -> None:
+        """Start streaming changes to subscriber, beginning with a snapshot of the map."""
+        with self._lock:
+            subscriber.push(seat_events.sse_frame("snapshot", {
+                "show_id": self.show_id,
+                "unavailable": self._unavailable_locked(),
+            }))
+            seat_events.broker.subscribe(subscriber)
+
+    def out_of_range(self, seats: Iterable[int]) -> list[int]:
+        return [s for s in seats if not 1 <= s <= self.capacity]
+
+    def is_free(self, seat: int) -> bool:
+        return seat not in self.booked and seat not in self.held
+
+    def unavailable(self) -> list[int]:
+        """Sorted seats that are booked or held; cached until the next change."""
+        with self._lock:
+            return self._unavailable_locked()
+
+    def _unavailable_locked(self) -> list[int]:
+        if self._unavailable is None:
+            self._unavailable = (self.booked | self.held).seats()
+        return self._unavailable
+
+
+# Per-show process state: the writer lock and the seat map (once loaded) share one slot
+# in a sharded LRU capped at settings.seat_map_max_shows. A map and its lock are evicted
+# together (never while a writer holds the lock or a client streams the show); an evicted
+# show is rebuilt from the database on next use.
+show_locks = ShardedLockManager(
+    shards=settings.show_lock_shards,
+    max_keys=lambda: settings.seat_map_max_shows,
+    pinned=seat_events.broker.has_subscribers,
+)
+
+
+@contextmanager
+def show_lock(show_id: int) -> Iterator[None]:
+    """Serialize seat writers on one show; other shows are unaffected."""
+    with show_locks.hold(show_id):
+        yield
+
+
+def show_layout(show: Show, db: Session) -> ScreenLayout:
+    """The compiled seat layout of the show's screen (cached per screen)."""
+    screen = db.get(Screen, show.screen_id)
+    if screen is None:
+        return compile_layout(show.screen_id, show.available_seats, None)
+    return get_layout(screen)
+
+
+def seat_capacity(show: Show, db: Session) -> int:
+    """Highest valid seat number for a show, per its screen layout."""
+    return show_layout(show, db).capacity
+
+
+def out_of_range_message(show: Show, seat_numbers: Iterable[int], db: Session) -> str | None:
+    """Describe seat numbers outside the show's layout, or None when all are valid."""
+    layout = show_layout(show, db)
+    invalid = sorted(set(layout.invalid_seats(seat_numbers)))
+    if not invalid:
+        return None
+    return f"Seat numbers out of range 1-{layout.capacity}: {', '.join(map(str, invalid))}"
+
+
+def load_booked_seats(show_id: int, db: Session) -> list[int]:
+    """Return every seat persisted as booked for a show, straight from the database."""
+    # Served by the (show_id, seat_number) unique index alone
+    rows = db.query(SeatReservation.seat_number).filter(SeatReservation.show_id == show_id).all()
+    return [seat_number for (seat_number,) in rows]
+
+
+def get_seat_map(show: Show, db: Session) -> SeatMap:
+    """Return the seat map for a show, building it from the database on first use.
+
+    The map is registered before the read so that writes committed while it loads are
+    applied to it as well; readers wait until the initial read finishes.
+    """
+    seat_map = show_locks.peek_state(show.id)
+    if seat_map is not None:
+        seat_map._ready.wait()
+        return seat_map
+
+    # The factory runs under the shard mutex, so the query and layout compile happen first
+    capacity = seat_capacity(show, db)
+    seat_map, owner = show_locks.get_or_create_state(
+        show.id, lambda: SeatMap(show.id, capacity, show.screen_id)
+    )
+
+    if not owner:
+        seat_map._ready.wait()
+        return seat_map
+
+    try:
+        booked = load_booked_seats(show.id, db)
+        stray = seat_map.out_of_range(booked)
+        if stray:
+            logger.warning("Show %s has reservations outside its %d seats: %s", show.id, seat_map.capacity, stray)
+        seat_map.mark_booked(s for s in booked if 1 <= s <= seat_map.capacity)
+        # Live holds survive an eviction of the map; put them back
+        from useage.hold_service import hold_store
+        seat_map.mark_held(s for s in hold_store.held_seats(show.id) if 1 <= s <= seat_map.capacity)
+    except Exception:
+        show_locks.clear_state(show.id, expected=seat_map)
+        raise
+    finally:
+        seat_map._ready.set()
+    return seat_map
+
+
+def _loaded_map(show_id: int) -> SeatMap | None:
+    return show_locks.peek_state(show_id)
+
+
+def peek_seat_map(show_id: int) -> SeatMap | None:
+    """Return the loaded seat map for a show without touching the database."""
+    seat_map = _loaded_map(show_id)
+    if seat_map is None or not seat_map._ready.is_set():
+        return None
+    return seat_map
+
+
+def _in_range(seat_map: SeatMap, seats: Iterable[int]) -> list[int]:
+    return [s for s in seats if 1 <= s <= seat_map.capacity]
+
+
+def mark_seats_booked(show_id: int, seats: Iterable[int]) -> None:
+    """Apply committed seat bookings to the in-process map, if it is loaded."""
+    seat_map = _loaded_map(show_id)
+    if seat_map is not None:
+        seat_map.mark_booked(_in_range(seat_map, seats))
+
+
+def release_seats(show_id: int, seats: Iterable[int]) -> None:
+    """Apply committed seat releases to the in-process map, if it is loaded."""
+    seat_map = _loaded_map(show_id)
+    if seat_map is not None:
+        seat_map.release(seats)
+
+
+def mark_seats_held(show_id: int, seats: Iterable[int]) -> None:
+    seat_map = _loaded_map(show_id)
+    if seat_map is not None:
+        seat_map.mark_held(_in_range(seat_map, seats))
+
+
+def release_held_seats(show_id: int, seats: Iterable[int]) -> None:
+    seat_map = _loaded_map(show_id)
+    if seat_map is not None:
+        seat_map.release_held(seats)
+
+
+def forget_seat_map(show_id: int) -> None:
+    """Drop a show's map and lock, unless a writer is inside show_lock() right now."""
+    show_locks.discard(show_id)
+
+
+@event.listens_for(Screen, "after_update")
+def _screen_changed(mapper, connection, screen: Screen) -> None:
+    # Seat maps are sized from the layout; rebuild them for shows on a changed screen
+    show_locks.clear_states(lambda seat_map: seat_map.screen_id == screen.id)
+
+
+def reset_seat_maps() -> None:
+    """Drop all cached seat maps (used by tests and after bulk data changes)."""
+    show_locks.clear()
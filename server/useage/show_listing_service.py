@@ -0,0 +1,123 @@
+from typing import Optional
+
+from sqlalchemy import delete, event, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+
+from app.models import Screen, Show, ShowListing, Theater
+from useage import now_playing_service
+
+_listings = ShowListing.__table__
+_COLUMNS = [
+    "id", "movie_id", "city_id", "theater_id", "screen_id",
+    "show_date", "show_time", "base_price", "available_seats",
+]
+# Fields copied from Show whose change means re-listing the show
+_LISTED = ("movie_id", "screen_id", "show_date", "show_time", "base_price")
+
+
+def _listing_select(show_id: Optional[int] = None, theater_id: Optional[int] = None, screen_id: Optional[int] = None):
+    q = (
+        select(
+            Show.id, Show.movie_id, Theater.city_id, Theater.id, Show.screen_id,
+            Show.show_date, Show.show_time, Show.base_price, Show.available_seats,
+        )
+        .join(Screen, Screen.id == Show.screen_id)
+        .join(Theater, Theater.id == Screen.theater_id)
+        .where(Theater.is_active == True)
+    )
+    if show_id is not None:
+        q = q.where(Show.id == show_id)
+    if theater_id is not None:
+        q = q.where(Theater.id == theater_id)
+    if screen_id is not None:
+        q = q.where(Show.screen_id == screen_id)
+    return q
+
+
+def _relist(connection: Connection, listed, fresh) -> None:
+    """Replace the listings matching `listed` with the rows of `fresh`, then refresh the
+    city_now_playing rows of every (city, movie) they covered before or after."""
+    pairs = _pairs(connection, listed)
+    connection.execute(delete(_listings).where(listed))
+    connection.execute(insert(_listings).from_select(_COLUMNS, fresh))
+    now_playing_service.refresh_pairs(connection, pairs | _pairs(connection, listed))
+
+
+def _pairs(connection: Connection, listed) -> set[tuple[int, int]]:
+    return {
+        (city_id, movie_id)
+        for city_id, movie_id in connection.execute(
+            select(_listings.c.city_id, _listings.c.movie_id).where(listed).distinct()
+        )
+    }
+
+
+def relist_show(connection: Connection, show_id: int) -> None:
+    _relist(connection, _listings.c.id == show_id, _listing_select(show_id=show_id))
+
+
+def relist_theater(connection: Connection, theater_id: int) -> None:
+    _relist(connection, _listings.c.theater_id == theater_id, _listing_select(theater_id=theater_id))
+
+
+def relist_screen(connection: Connection, screen_id: int) -> None:
+    shows = select(Show.id).where(Show.screen_id == screen_id)  # Through the shows.screen_id index
+    _relist(connection, _listings.c.id.in_(shows), _listing_select(screen_id=screen_id))
+
+
+def rebuild(connection: Connection) -> None:
+    """Recompute every listing; rebuild city_now_playing afterwards, it is derived from these."""
+    connection.execute(delete(_listings))
+    connection.execute(insert(_listings).from_select(_COLUMNS, _listing_select()))
+
+
+def adjust_available_seats(connection: Connection, show_id: int, delta: int) -> None:
+    """Mirror a seat counter change made with a Core UPDATE on shows (ORM events don't see those)."""
+    connection.execute(
+        update(_listings)
+        .where(_listings.c.id == show_id)
+        .values(available_seats=_listings.c.available_seats + delta)
+    )
+
+
+# Kept in step from ORM flushes, in the writer's transaction; city_now_playing follows along.
+@event.listens_for(Show, "after_insert")
+def _show_added(mapper, connection: Connection, show: Show) -> None:
+    relist_show(connection, show.id)
+
+
+@event.listens_for(Show, "after_delete")
+def _show_removed(mapper, connection: Connection, show: Show) -> None:
+    # On Postgres the FK has already cascaded the listing away; SQLite test databases don't
+    # enforce it. The (city, movie) pair comes from the show's screen instead of the listing
+    city_id = connection.execute(
+        select(Theater.city_id).join(Screen, Screen.theater_id == Theater.id).where(Screen.id == show.screen_id)
+    ).scalar()
+    connection.execute(delete(_listings).where(_listings.c.id == show.id))
+    if city_id is not None:
+        now_playing_service.refresh_pairs(connection, {(city_id, show.movie_id)})
+
+
+@event.listens_for(Show, "after_update")
+def _show_changed(mapper, connection: Connection, show: Show) -> None:
+    state = inspect(show)
+    if any(state.attrs[name].history.has_changes() for name in _LISTED):
+        relist_show(connection, show.id)
+    elif state.attrs.available_seats.history.has_changes():
+        connection.execute(
+            update(_listings).where(_listings.c.id == show.id).values(available_seats=show.available_seats)
+        )
+
+
+@event.listens_for(Theater, "after_update")
+def _theater_changed(mapper, connection: Connection, theater: Theater) -> None:
+    state = inspect(theater)
+    if state.attrs.is_active.history.has_changes() or state.attrs.city_id.history.has_changes():
+        relist_theater(connection, theater.id)
+
+
+@event.listens_for(Screen, "after_update")
+def _screen_changed(mapper, connection: Connection, screen: Screen) -> None:
+    # A screen moved to another theater takes its shows along (new theater, maybe new city)
+    if inspect(screen).attrs.theater_id.history.has_changes():
+        relist_screen(connection, screen.id)
@@ -1,11 +1,15 @@
-from datetime import date as dt_date
+from datetime import date as dt_date, timedelta
 from typing import Optional
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import schemas
-from app.models import Show, Screen, Theater, TheaterUserMembership, User
+from app.models import Show, ShowListing, Screen, Theater, TheaterUserMembership
+from useage.auth_service import AuthenticatedUser
+from useage.seat_map_service import forget_seat_map
+# Its ORM listeners keep show_listings, and city_now_playing derived from it, in step with show writes
+from useage import show_listing_service  # noqa: F401
 
 
 class ShowNotFoundError(Exception):
@@ -27,24 +31,84 @@ class DuplicateShowError(Exception):
 def get_movie_shows(movie_id: int, city_id: int, date: Optional[dt_date], theater_id: Optional[int], db: Session):
     target_date = date or dt_date.today()
 
-    q = (
-        db.query(Show)
-        .join(Screen, Screen.id == Show.screen_id)
-        .join(Theater, Theater.id == Screen.theater_id)
-        .filter(
-            Show.movie_id == movie_id,
-            Show.show_date == target_date,
-            Theater.city_id == city_id,
-            Theater.is_active == True,
-        )
+    # show_listings only holds shows at active theaters; one (movie, city, date, time) range scan
+    q = db.query(ShowListing).filter(
+        ShowListing.movie_id == movie_id,
+        ShowListing.city_id == city_id,
+        ShowListing.show_date == target_date,
     )
     if theater_id is not None:
-        q = q.filter(Theater.id == theater_id)
+        q = q.filter(ShowListing.theater_id == theater_id)
 
-    q = q.order_by(Show.show_time.asc())
+    q = q.order_by(ShowListing.show_time.asc())
     return q.all()
 
 
+def _availability(fill_ratio: float, available_seats: int) -> str:
+    if available_seats <= 0:
+        return "sold_out"
+    if fill_ratio >= 0.9:
+        return "almost_full"
+    if fill_ratio >= 0.6:
+        return "filling_fast"
+    return "available"
+
+
+def get_showtime_matrix(movie_id: int, city_id: int, start_date: Optional[dt_date], days: int, db: Session) -> dict:
+    """Showtimes for `days` consecutive days, grouped by day, theater and screen.
+
+    One range scan on show_listings' (movie_id, city_id, show_date, show_time) index, with
+    theater and screen names joined by primary key; grouping happens here, not in SQL.
+    """
+    start_date = start_date or dt_date.today()
+    end_date = start_date + timedelta(days=days - 1)
+    rows = (
+        db.query(ShowListing, Theater.name, Screen.name, Screen.screen_type, Screen.total_seats)
+        .join(Theater, Theater.id == ShowListing.theater_id)
+        .join(Screen, Screen.id == ShowListing.screen_id)
+        .filter(
+            ShowListing.movie_id == movie_id,
+            ShowListing.city_id == city_id,
+            ShowListing.show_date >= start_date,
+            ShowListing.show_date <= end_date,
+        )
+        .order_by(ShowListing.show_date, ShowListing.show_time)
+        .all()
+    )
+
+    # date -> theater_id -> screen_id -> shows; dicts keep first-seen (earliest show) order
+    grid: dict[dt_date, dict[int, dict]] = {start_date + timedelta(days=i): {} for i in range(days)}
+    for listing, theater_name, screen_name, screen_type, total_seats in rows:
+        theater = grid[listing.show_date].setdefault(
+            listing.theater_id, {"theater_id": listing.theater_id, "name": theater_name, "screens": {}}
+        )
+        screen = theater["screens"].setdefault(
+            listing.screen_id,
+            {"screen_id": listing.screen_id, "name": screen_name, "screen_type": screen_type, "shows": []},
+        )
+        fill_ratio = round(1 - listing.available_seats / total_seats, 3) if total_seats else 1.0
+        screen["shows"].append({
+            "id": listing.id,
+            "show_time": listing.show_time,
+            "base_price": listing.base_price,
+            "available_seats": listing.available_seats,
+            "fill_ratio": max(fill_ratio, 0.0),
+            "availability": _availability(fill_ratio, listing.available_seats),
+        })
+
+    return {
+        "movie_id": movie_id,
+        "city_id": city_id,
+        "days": [
+            {
+                "date": day,
+                "theaters": [{**t, "screens": list(t["screens"].values())} for t in theaters.values()],
+            }
+            for day, theaters in grid.items()
+        ],
+    }
+
+
 def get_show(show_id: int, db: Session) -> Show:
     show = db.get(Show, show_id)
     if not show:
@@ -52,7 +116,13 @@ def get_show(show_id: int, db: Session) -> Show:
     return show
 
 
-def _ensure_membership_for_screen(screen: Screen, current_user: User, db: Session):
+def _ensure_membership_for_screen(screen: Screen, current_user: AuthenticatedUser, db: Session):
+    if current_user.admin_theaters is not None:
+        # Current signed claims from the token: no query needed
+        if screen.theater_id not in current_user.admin_theaters:
+            raise NotAuthorizedError("Not authorized to manage shows for this theater")
+        return
+
     membership = (
         db.query(TheaterUserMembership)
         .filter(
@@ -66,7 +136,7 @@ def _ensure_membership_for_screen(screen: Screen, current_user: User, db: Sessio
         raise NotAuthorizedError("Not authorized to manage shows for this theater")
 
 
-def create_show(payload: schemas.ShowCreate, current_user: User, db: Session) -> Show:
+def create_show(payload: schemas.ShowCreate, current_user: AuthenticatedUser, db: Session) -> Show:
     screen = db.get(Screen, payload.screen_id)
     if not screen:
         raise ScreenNotFoundError("Screen not found")
@@ -92,7 +162,7 @@ def create_show(payload: schemas.ShowCreate, current_user: User, db: Session) ->
     return show
 
 
-def delete_show(show_id: int, current_user: User, db: Session) -> None:
+def delete_show(show_id: int, current_user: AuthenticatedUser, db: Session) -> None:
     show = db.get(Show, show_id)
     if not show:
         raise ShowNotFoundError("Show not found")
@@ -105,4 +175,5 @@ def delete_show(show_id: int, current_user: User, db: Session) -> None:
 
     db.delete(show)
     db.commit()
+    forget_seat_map(show_id)
     return None
@@ -0,0 +1,150 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.catalog_versions import catalog_versions
+from app.config import settings
+from app.models import ShowListing, Theater
+
+_EARTH_RADIUS_KM = 6371.0
+_KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class CityGrid:
+    """Active theaters of one city bucketed into square lat/lon cells.
+
+    A nearest-k query walks rings of cells outwards from the caller's cell and stops once
+    the next ring cannot hold anything closer than the k-th theater found so far.
+    """
+
+    def __init__(self, points: Iterable[tuple[int, float, float]], cell_degrees: float):
+        self.cell = cell_degrees
+        self.cells: dict[tuple[int, int], list[tuple[int, float, float]]] = defaultdict(list)
+        for theater_id, lat, lon in points:
+            self.cells[self._cell_of(lat, lon)].append((theater_id, lat, lon))
+        self.cells = dict(self.cells)
+        self.size = sum(len(c) for c in self.cells.values())
+        # Bounding box in cell coordinates, so a query knows its last ring without a scan
+        rows, cols = [i for i, _ in self.cells], [j for _, j in self.cells]
+        self.bounds = (min(rows), max(rows), min(cols), max(cols)) if self.cells else None
+
+    def _cell_of(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterable[tuple[int, int]]:
+        if r == 0:
+            yield ci, cj
+            return
+        for dj in range(-r, r + 1):
+            yield ci - r, cj + dj
+            yield ci + r, cj + dj
+        for di in range(-r + 1, r):
+            yield ci + di, cj - r
+            yield ci + di, cj + r
+
+    def nearest(self, lat: float, lon: float, k: int, allowed: Optional[set[int]] = None) -> list[tuple[float, int]]:
+        """Up to k (distance_km, theater_id) pairs, closest first, restricted to `allowed` ids."""
+        if not self.cells or k <= 0:
+            return []
+        ci, cj = self._cell_of(lat, lon)
+        min_i, max_i, min_j, max_j = self.bounds
+        max_r = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj)  # Ring reaching the farthest corner
+        # Smallest width of one cell in km around here (meridians converge towards the poles)
+        cell_km = self.cell * _KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + self.cell, 90.0))), 1e-6)
+        best: list[tuple[float, int]] = []  # Max-heap of the k closest, as (-distance, id)
+        for r in range(max_r + 1):
+            for key in self._ring(ci, cj, r):
+                for theater_id, t_lat, t_lon in self.cells.get(key, ()):
+                    if allowed is not None and theater_id not in allowed:
+                        continue
+                    item = (-haversine_km(lat, lon, t_lat, t_lon), theater_id)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+            # Anything in ring r + 1 is at least r whole cells away
+            if len(best) == k and -best[0][0] <= r * cell_km:
+                break
+        return sorted((-d, theater_id) for d, theater_id in best)
+
+
+# city_id -> (theaters catalog version it was built at, grid). A committed Theater write
+# moves the version, and the city's grid is rebuilt on its next query.
+_grids: dict[int, tuple[int, CityGrid]] = {}
+_grids_lock = threading.Lock()
+
+
+def _load_points(db: Session, city_id: Optional[int] = None):
+    q = db.query(Theater.city_id, Theater.id, Theater.latitude, Theater.longitude).filter(
+        Theater.is_active == True,
+        Theater.latitude.isnot(None),
+        Theater.longitude.isnot(None),
+    )
+    if city_id is not None:
+        q = q.filter(Theater.city_id == city_id)
+    return q.all()
+
+
+def get_city_grid(city_id: int, db: Session) -> CityGrid:
+    version = catalog_versions.get("theaters")
+    cached = _grids.get(city_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    grid = CityGrid(((tid, lat, lon) for _, tid, lat, lon in _load_points(db, city_id)), settings.theater_grid_cell_degrees)
+    with _grids_lock:
+        _grids[city_id] = (version, grid)
+    return grid
+
+
+def warm_theater_grids(db: Session) -> int:
+    """Build every city's grid from one query (startup); returns the number of cities."""
+    version = catalog_versions.get("theaters")
+    by_city: dict[int, list[tuple[int, float, float]]] = defaultdict(list)
+    for city_id, tid, lat, lon in _load_points(db):
+        by_city[city_id].append((tid, lat, lon))
+    with _grids_lock:
+        for city_id, points in by_city.items():
+            _grids[city_id] = (version, CityGrid(points, settings.theater_grid_cell_degrees))
+    return len(by_city)
+
+
+def reset_theater_grids() -> None:
+    with _grids_lock:
+        _grids.clear()
+
+
+def nearest_theaters(
+    city_id: int, latitude: float, longitude: float, limit: int, movie_id: Optional[int], db: Session
+) -> list[schemas.TheaterOut]:
+    """The `limit` nearest active theaters in the city (optionally only those playing a movie)."""
+    allowed = None
+    if movie_id is not None:
+        allowed = {
+            tid
+            for (tid,) in db.query(ShowListing.theater_id)
+            .filter(ShowListing.movie_id == movie_id, ShowListing.city_id == city_id)
+            .distinct()
+        }
+        if not allowed:
+            return []
+    ranked = get_city_grid(city_id, db).nearest(latitude, longitude, limit, allowed)
+    if not ranked:
+        return []
+    theaters = {t.id: t for t in db.query(Theater).filter(Theater.id.in_([tid for _, tid in ranked])).all()}
+    return [
+        schemas.TheaterOut.model_validate(theaters[tid]).model_copy(update={"distance_km": round(distance, 3)})
+        for distance, tid in ranked
+        if tid in theaters
+    ]
@@ -0,0 +1,68 @@
+const API_BASE_URL =
+  import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
+
+export type AdmissionTicket = {
+  token?: string | null; // null when the waiting room is disabled
+  admitted: boolean;
+  position: number;
+  estimated_wait_seconds: number;
+};
+
+const storageKey = (showId: number) => `admission:${showId}`;
+
+/**
+ * Header carrying the waiting room pass for a show, if one was issued.
+ */
+export function admissionHeaders(showId: number): Record<string, string> {
+  const token = sessionStorage.getItem(storageKey(showId));
+  return token ? { "X-Admission-Token": token } : {};
+}
+
+async function readTicket(res: Response, fallback: string): Promise<AdmissionTicket> {
+  let data: unknown = null;
+  try {
+    data = await res.json();
+  } catch {}
+  if (!res.ok) {
+    throw new Error(String((data as any)?.detail || fallback));
+  }
+  return data as AdmissionTicket;
+}
+
+/**
+ * POST /shows/{show_id}/admission, then poll GET /admission/{token} until admitted.
+ * onUpdate receives the queue position and estimated wait while waiting.
+ */
+export async function waitForAdmission(
+  showId: number,
+  onUpdate?: (ticket: AdmissionTicket) => void
+): Promise<void> {
+  const existing = sessionStorage.getItem(storageKey(showId));
+  let ticket: AdmissionTicket | null = null;
+  if (existing) {
+    const res = await fetch(`${API_BASE_URL}/admission/${encodeURIComponent(existing)}`);
+    if (res.ok) ticket = await readTicket(res, "Failed to check admission");
+  }
+  if (!ticket) {
+    ticket = await readTicket(
+      await fetch(`${API_BASE_URL}/shows/${showId}/admission`, { method: "POST" }),
+      "Failed to join the waiting room"
+    );
+  }
+  if (!ticket.token) {
+    sessionStorage.removeItem(storageKey(showId));
+    return; // Waiting room disabled
+  }
+  sessionStorage.setItem(storageKey(showId), ticket.token);
+
+  while (!ticket.admitted) {
+    onUpdate?.(ticket);
+    const delay = Math.min(Math.max(ticket.estimated_wait_seconds, 1), 10) * 1000;
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    ticket = await readTicket(
+      await fetch(`${API_BASE_URL}/admission/${encodeURIComponent(ticket.token!)}`),
+      "Failed to check admission"
+    );
+  }
+  onUpdate?.(ticket);
+}
@@ -1,3 +1,5 @@
+import { admissionHeaders } from "./AdmissionAPI";
+
 const API_BASE_URL =
   import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
 
@@ -27,6 +29,8 @@ export type BookingSeatsHoldRequest = {
 
 export type BookingSeatsHoldResponse = {
   show_id: number;
+  hold_id?: string | null;
+  expires_at?: string | null;
   held_seat_numbers: number[];
   unavailable_seat_numbers: number[];
 };
@@ -53,6 +57,7 @@ export type BookingSeatCreateReq = {
   show_id: number;
   booking_id: number;
   seat_id: number[];
+  hold_id?: string | null;
 };
 
 export type BookingSeatOut = {
@@ -63,14 +68,14 @@ export type BookingSeatOut = {
 };
 
 /**
- * POST /booking_seats to hold seats for a show.
+ * POST /booking_seats/hold to hold seats for a show.
  */
 export async function holdBookingSeats(
   req: BookingSeatsHoldRequest
 ): Promise<BookingSeatsHoldResponse> {
-  const res = await fetch(`${API_BASE_URL}/booking_seats`, {
+  const res = await fetch(`${API_BASE_URL}/booking_seats/hold`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...admissionHeaders(req.show_id) },
     body: JSON.stringify(req),
   });
 
@@ -95,7 +100,7 @@ export async function createBookingSeats(
 ): Promise<BookingSeatOut> {
   const res = await fetch(`${API_BASE_URL}/booking_seats`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...admissionHeaders(req.show_id) },
     body: JSON.stringify(req),
   });
 
@@ -133,6 +138,33 @@ export async function getBookingSeatsStatus(
   return data as BookingSeatsStatusResponse;
 }
 
+/**
+ * Subscribe to GET /shows/{show_id}/booking_seats/stream (Server-Sent Events).
+ * Calls onChange with the full unavailable list on connect and after every delta.
+ * EventSource reconnects on its own and the server resends a snapshot.
+ * Returns a function that closes the stream.
+ */
+export function subscribeBookingSeats(
+  show_id: number,
+  onChange: (unavailable: number[]) => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/shows/${show_id}/booking_seats/stream`);
+  let unavailable = new Set<number>();
+
+  source.addEventListener('snapshot', (e) => {
+    unavailable = new Set<number>(JSON.parse((e as MessageEvent).data).unavailable);
+    onChange([...unavailable].sort((a, b) => a - b));
+  });
+  source.addEventListener('delta', (e) => {
+    const delta = JSON.parse((e as MessageEvent).data) as { unavailable: number[]; available: number[] };
+    delta.unavailable.forEach((n) => unavailable.add(n));
+    delta.available.forEach((n) => unavailable.delete(n));
+    onChange([...unavailable].sort((a, b) => a - b));
+  });
+
+  return () => source.close();
+}
+
 /**
  * Calls POST /bookings with { show_id, seat_numbers }
  */
@@ -141,6 +173,7 @@ export async function createBooking(req: BookingCreateReq): Promise<BookingOut>
     method: "POST",
     headers: {
       "Content-Type": "application/json",
+      ...admissionHeaders(req.show_id),
     },
     body: JSON.stringify(req),
   });
@@ -161,12 +194,27 @@ export async function createBooking(req: BookingCreateReq): Promise<BookingOut>
   return data as BookingOut;
 }
 
+export type CheckoutReq = {
+  show_id: number;
+  seat_numbers: number[];
+  user_id: number;
+  hold_id?: string | null;
+};
+
+export type CheckoutOut = {
+  booking: BookingOut;
+  seat_numbers: number[];
+};
+
 /**
- * GET /bookings with optional user_id filter
+ * POST /checkout: creates the booking and reserves its seats in one call
  */
-export async function listBookings(params?: { user_id?: number }): Promise<BookingOut[]> {
-  const qs = params?.user_id != null ? `?user_id=${encodeURIComponent(params.user_id)}` : '';
-  const res = await fetch(`${API_BASE_URL}/bookings${qs}`);
+export async function checkout(req: CheckoutReq): Promise<CheckoutOut> {
+  const res = await fetch(`${API_BASE_URL}/checkout`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...admissionHeaders(req.show_id) },
+    body: JSON.stringify(req),
+  });
 
   let data: unknown = null;
   try {
@@ -174,9 +222,42 @@ export async function listBookings(params?: { user_id?: number }): Promise<Booki
   } catch {}
 
   if (!res.ok) {
-    const message = (data as any)?.detail || 'Failed to fetch bookings';
+    const message = (data as any)?.detail || "Failed to create booking";
     throw new ApiError(String(message), res.status, data);
   }
 
-  return (data as BookingOut[]) ?? [];
+  return data as CheckoutOut;
+}
+
+/**
+ * GET /bookings with optional user_id filter.
+ * The server pages results (newest first) and returns the next cursor in the
+ * X-Next-Cursor header; this follows it until the history is complete.
+ */
+export async function listBookings(params?: { user_id?: number }): Promise<BookingOut[]> {
+  const all: BookingOut[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const qs = new URLSearchParams();
+    if (params?.user_id != null) qs.set('user_id', String(params.user_id));
+    if (cursor) qs.set('cursor', cursor);
+    const query = qs.toString();
+    const res = await fetch(`${API_BASE_URL}/bookings${query ? `?${query}` : ''}`);
+
+    let data: unknown = null;
+    try {
+      data = await res.json();
+    } catch {}
+
+    if (!res.ok) {
+      const message = (data as any)?.detail || 'Failed to fetch bookings';
+      throw new ApiError(String(message), res.status, data);
+    }
+
+    all.push(...((data as BookingOut[]) ?? []));
+    cursor = res.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return all;
 }
@@ -82,6 +82,66 @@ export async function getMovieShows(
 }
 
 
+export type Showtime = {
+  id: number;
+  show_time: string; // HH:MM:SS
+  base_price: number;
+  available_seats: number;
+  fill_ratio: number; // 0..1 share of seats taken
+  availability: "available" | "filling_fast" | "almost_full" | "sold_out";
+};
+
+export type ShowtimeMatrix = {
+  movie_id: number;
+  city_id: number;
+  days: {
+    date: string; // YYYY-MM-DD; every requested day is present
+    theaters: {
+      theater_id: number;
+      name: string;
+      screens: { screen_id: number; name: string; screen_type: string | null; shows: Showtime[] }[];
+    }[];
+  }[];
+};
+
+/**
+ * Calls GET /movies/{movie_id}/showtimes?city_id=...&start_date=...&days=...
+ * One request for every date tab of the movie page, grouped by theater and screen.
+ */
+export async function getShowtimeMatrix(
+  movieId: number,
+  params: { city_id?: number; start_date?: string; days?: number } = {}
+): Promise<ShowtimeMatrix> {
+  const city_id = params.city_id ?? useAppStore.getState().selectedCity?.id;
+  if (!city_id) {
+    throw new ApiError("City not selected", 400);
+  }
+
+  const query = new URLSearchParams();
+  query.set("city_id", String(city_id));
+  if (params.start_date) query.set("start_date", params.start_date);
+  if (params.days != null) query.set("days", String(params.days));
+
+  const res = await fetch(`${API_BASE_URL}/movies/${movieId}/showtimes?${query.toString()}`, {
+    method: "GET",
+    headers: { Accept: "application/json" },
+  });
+
+  let data: unknown = null;
+  try { data = await res.json(); } catch {}
+
+  if (!res.ok) {
+    const message = (data as any)?.detail || "Failed to load showtimes";
+    throw new ApiError(String(message), res.status, data);
+  }
+  if (!data || !Array.isArray((data as any).days)) {
+    throw new ApiError("Malformed showtimes response", res.status, data);
+  }
+
+  return data as ShowtimeMatrix;
+}
+
+
 /**
  * Calls GET /shows/{show_id}
  * Returns Show
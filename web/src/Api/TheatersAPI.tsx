@@ -8,17 +8,19 @@ export type Theater = {
   id: number;
   name: string;
   address: string;
+  distance_km?: number | null; // present when latitude/longitude were sent
 };
 
 export type GetTheatersParams = {
   city_id?: number; // if omitted, taken from store
   movie_id?: number; // optional filter by movie
-  latitude?: number; // accepted by backend but currently unused
-  longitude?: number; // accepted by backend but currently unused
+  latitude?: number; // with longitude: nearest theaters first
+  longitude?: number;
+  limit?: number; // how many nearest theaters (default 20)
 };
 
 /**
- * Calls GET /theaters?city_id=...&movie_id=...&latitude=...&longitude=...
+ * Calls GET /theaters?city_id=...&movie_id=...&latitude=...&longitude=...&limit=...
  * Returns Theater[]
  */
 export async function getTheaters(
@@ -36,6 +38,7 @@ export async function getTheaters(
   if (params.movie_id != null) query.set("movie_id", String(params.movie_id));
   if (params.latitude != null) query.set("latitude", String(params.latitude));
   if (params.longitude != null) query.set("longitude", String(params.longitude));
+  if (params.limit != null) query.set("limit", String(params.limit));
 
   const res = await fetch(`${API_BASE_URL}/theaters?${query.toString()}`, {
     method: "GET",
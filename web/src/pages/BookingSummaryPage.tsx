@@ -5,7 +5,7 @@ import { useAppStore } from "../store";
 import { getShow, type Show } from "../Api/ShowAPI";
 import { getScreen, type Screen } from "../Api/ScreensAPI";
 import { getMovie, type MovieOut } from "../Api/MoviesApi";
-import { createBooking, createBookingSeats } from "../Api/BookingsAPI";
+import { checkout } from "../Api/BookingsAPI";
 
 export default function BookingSummaryPage() {
   const location = useLocation();
@@ -147,18 +147,8 @@ export default function BookingSummaryPage() {
                       setSubmitting(true);
                       setError(null);
                       try {
-                        const booking = await createBooking({ show_id: showId, seat_numbers: selectedSeats, user_id: user.id });
-                        // Lock the seats against the created booking
-                        try {
-                          await createBookingSeats({
-                            show_id: showId,
-                            booking_id: booking.id,
-                            seat_id: selectedSeats,
-                          });
-                        } catch (e: any) {
-                          // If locking fails, surface error and stop further flow
-                          throw new Error(e?.message || "Failed to lock seats for booking");
-                        }
+                        // Booking and seat lock happen atomically server-side
+                        await checkout({ show_id: showId, seat_numbers: selectedSeats, user_id: user.id });
                         // Navigate home with a success toast
                         navigate('/', {
                           state: {
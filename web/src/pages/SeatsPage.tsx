@@ -3,7 +3,8 @@ import { useLocation, useNavigate } from "react-router-dom";
 import Header from "../components/header";
 import { getShow, type Show } from "../Api/ShowAPI";
 import { getScreen, type Screen } from "../Api/ScreensAPI";
-import { getBookingSeatsStatus } from "../Api/BookingsAPI";
+import { getBookingSeatsStatus, subscribeBookingSeats } from "../Api/BookingsAPI";
+import { waitForAdmission, type AdmissionTicket } from "../Api/AdmissionAPI";
 import { useAppStore } from "../store";
 
 export default function SeatsPage() {
@@ -24,6 +25,7 @@ export default function SeatsPage() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [unavailableSeats, setUnavailableSeats] = useState<number[]>([]);
+  const [queue, setQueue] = useState<AdmissionTicket | null>(null);
 
   useEffect(() => { 
     let active = true;
@@ -36,6 +38,9 @@ export default function SeatsPage() {
       setLoading(true);
       setError(null);
       try {
+        // Hot on-sales: wait in the virtual queue before seat selection (no-op when disabled)
+        await waitForAdmission(showId, (ticket) => active && setQueue(ticket));
+        if (!active) return;
         const s = await getShow(showId);
         if (!active) return;
         setShow(s);
@@ -65,6 +70,12 @@ export default function SeatsPage() {
     };
   }, [showId]);
 
+  // Live seat updates: bookings, holds and releases by other users arrive as they happen
+  useEffect(() => {
+    if (!showId) return;
+    return subscribeBookingSeats(showId, setUnavailableSeats);
+  }, [showId]);
+
   // Render seats using rows/columns from layout_config when available; fallback to square
   const grid = useMemo(() => {
     if (!screen) return { rows: 0, cols: 0, total: 0 };
@@ -116,7 +127,12 @@ export default function SeatsPage() {
         )}
 
         <div className="mt-4">
-          {loading && <div className="text-gray-600">Loading seats…</div>}
+          {loading && queue && !queue.admitted && (
+            <div className="text-gray-600">
+              You're in the queue: {queue.position} ahead of you, about {queue.estimated_wait_seconds}s to go.
+            </div>
+          )}
+          {loading && !(queue && !queue.admitted) && <div className="text-gray-600">Loading seats…</div>}
           {error && <div className="text-red-600">{error}</div>}
           {!loading && !error && screen && (
             <div className="border rounded-md p-4 bg-white">